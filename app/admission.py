@@ -0,0 +1,179 @@
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from config_manager import DEFAULT_CONFIG, load_config
+from logger import write_log
+
+# First and largest wait between load checks while a job is deferred.
+INITIAL_BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 300
+# Window over which the Frigate storage device's busy time is measured.
+DISK_SAMPLE_SECONDS = 1.0
+
+# Thresholds, deadline and jitter (config keys, defaults in DEFAULT_CONFIG).
+SETTINGS = (
+    "ADMISSION_MAX_LOAD_PER_CPU",  # 1-minute load average / CPU count
+    "ADMISSION_MAX_IO_PRESSURE",  # /proc/pressure/io "some avg10", % of time stalled
+    "ADMISSION_MAX_DISK_BUSY",  # % of wall time the Frigate storage device was busy
+    "ADMISSION_DEADLINE_MINUTES",
+    "SCHEDULE_JITTER_SECONDS",
+)
+
+_stop = threading.Event()
+
+
+def _setting(cfg: dict, key: str) -> float:
+    try:
+        return float(cfg.get(key, DEFAULT_CONFIG[key]))
+    except (TypeError, ValueError):
+        return float(DEFAULT_CONFIG[key])
+
+
+def _load_per_cpu() -> float | None:
+    try:
+        with open("/proc/loadavg", "r") as f:
+            load1 = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return load1 / (os.cpu_count() or 1)
+
+
+def _io_pressure() -> float | None:
+    """'some avg10' from /proc/pressure/io, or None without PSI support."""
+    try:
+        with open("/proc/pressure/io", "r") as f:
+            for line in f:
+                if line.startswith("some "):
+                    for field in line.split()[1:]:
+                        key, _, value = field.partition("=")
+                        if key == "avg10":
+                            return float(value)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _device_io_ticks(path: str) -> Tuple[str, int] | None:
+    """(device name, ms spent doing I/O) for the block device holding path."""
+    try:
+        dev = os.stat(path).st_dev
+    except OSError:
+        return None
+    major, minor = os.major(dev), os.minor(dev)
+    try:
+        with open("/proc/diskstats", "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 13 and int(parts[0]) == major and int(parts[1]) == minor:
+                    return parts[2], int(parts[12])
+    except (OSError, ValueError):
+        pass
+    # Not a block device (overlay, tmpfs, network share, ...).
+    return None
+
+
+def _disk_busy(path: str) -> Tuple[str, float] | None:
+    first = _device_io_ticks(path)
+    if first is None:
+        return None
+    started = time.monotonic()
+    if _stop.wait(DISK_SAMPLE_SECONDS):
+        return None
+    second = _device_io_ticks(path)
+    if second is None:
+        return None
+    elapsed_ms = (time.monotonic() - started) * 1000
+    return first[0], min(100.0, max(0, second[1] - first[1]) * 100.0 / elapsed_ms)
+
+
+def check_load(cfg: dict | None = None) -> List[str]:
+    """
+    Reasons the host is too busy right now (empty when a job may start).
+    Signals the host does not provide are ignored.
+    """
+    if cfg is None:
+        cfg = load_config()
+    reasons = []
+
+    load = _load_per_cpu()
+    limit = _setting(cfg, "ADMISSION_MAX_LOAD_PER_CPU")
+    if load is not None and load > limit:
+        reasons.append(f"load {load:.2f}/CPU > {limit:g}")
+
+    pressure = _io_pressure()
+    limit = _setting(cfg, "ADMISSION_MAX_IO_PRESSURE")
+    if pressure is not None and pressure > limit:
+        reasons.append(f"I/O pressure {pressure:.1f}% > {limit:g}%")
+
+    busy = _disk_busy(cfg.get("FRIGATE_STORAGE_PATH") or "/media/frigate")
+    limit = _setting(cfg, "ADMISSION_MAX_DISK_BUSY")
+    if busy is not None and busy[1] > limit:
+        reasons.append(f"{busy[0]} busy {busy[1]:.0f}% > {limit:g}%")
+
+    return reasons
+
+
+def status() -> Dict[str, float | None]:
+    """Current readings, for the API."""
+    cfg = load_config()
+    busy = _disk_busy(cfg.get("FRIGATE_STORAGE_PATH") or "/media/frigate")
+    return {
+        "load_per_cpu": _load_per_cpu(),
+        "io_pressure": _io_pressure(),
+        "frigate_device": busy[0] if busy else None,
+        "frigate_disk_busy": round(busy[1], 1) if busy else None,
+        "settings": {key: _setting(cfg, key) for key in SETTINGS},
+    }
+
+
+def wait_for_admission(job: str, jitter: bool = True) -> bool:
+    """
+    Hold a scheduled job until the host is quiet enough: a random jitter
+    (skipped for jobs triggered by an event rather than a cron time),
+    then load checks with exponential backoff until they pass or the
+    deadline is reached (the job then runs anyway). Returns False only when
+    the scheduler is shutting down and the job should be skipped.
+    """
+    cfg = load_config()
+    started = time.monotonic()
+
+    if jitter and _stop.wait(random.uniform(0, max(0.0, _setting(cfg, "SCHEDULE_JITTER_SECONDS")))):
+        return False
+
+    deadline = started + _setting(cfg, "ADMISSION_DEADLINE_MINUTES") * 60
+    backoff = INITIAL_BACKOFF_SECONDS
+    deferrals = 0
+    while True:
+        reasons = check_load(load_config())
+        if not reasons:
+            break
+        now = time.monotonic()
+        if now >= deadline:
+            write_log(
+                "Scheduler",
+                f"Job '{job}' deadline reached after {now - started:.0f}s; running despite: {', '.join(reasons)}",
+            )
+            return True
+        delay = min(backoff, deadline - now) * random.uniform(0.8, 1.2)
+        deferrals += 1
+        write_log("Scheduler", f"Deferring job '{job}' {delay:.0f}s: {', '.join(reasons)}")
+        if _stop.wait(delay):
+            return False
+        backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+
+    waited = time.monotonic() - started
+    if deferrals:
+        write_log("Scheduler", f"Job '{job}' admitted after {waited:.0f}s ({deferrals} deferrals)")
+    return True
+
+
+def stop():
+    """Release jobs waiting for admission (scheduler shutdown)."""
+    _stop.set()
+
+
+def reset():
+    _stop.clear()
@@ -1,12 +1,61 @@
+import hashlib
+import json
 import os
+import shutil
+import stat
 import tarfile
+import threading
+import time
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, NamedTuple
 
 from logger import write_log
-from config_manager import load_config
+from config_manager import DEFAULT_CONFIG, load_config, refresh_config, subscribe
+from tracing import span, current_span
+from events import publish, BACKUP_FINISHED, RESTORE_FINISHED
+from resource_locks import claim
+from jobs import start_job
+import retention
+from metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    DURATION_BUCKETS,
+    LAST_SUCCESS,
+    RESTORES,
+    RESTORE_DURATION,
+)
 
 BACKUP_DIR = "/backups"
+# Fingerprint of the tree in the newest archive, kept next to the archives.
+FINGERPRINT_FILE = ".last_backup.json"
+# Read/written bytes and duration of recent backups, for size and time estimates.
+STATS_FILE = ".backup_stats.json"
+STATS_RUNS = 20
+# A retention change is applied once no other change followed for this long,
+# from a fresh read of the config, and only if it deletes at most this share
+# of the archives.
+RETENTION_SETTLE_SECONDS = 5
+CONFIG_CHANGE_MAX_DELETE_FRACTION = 0.5
+# Estimates are padded by this factor; tar adds a 512-byte header per entry.
+ESTIMATE_MARGIN = 1.1
+TAR_HEADER_BYTES = 512
+
+BACKUP_RUNS = Counter("fbm_backups_total", "Backup runs by outcome.", ["outcome"])
+BACKUP_DURATION = Histogram(
+    "fbm_backup_duration_seconds", "Time taken by run_backup.", buckets=DURATION_BUCKETS
+)
+BACKUP_BYTES_READ = Counter("fbm_backup_read_bytes_total", "Uncompressed bytes archived.")
+BACKUP_BYTES_WRITTEN = Counter("fbm_backup_written_bytes_total", "Compressed archive bytes written.")
+BACKUP_FILES = Counter("fbm_backup_files_total", "Regular files archived.")
+BACKUP_RATIO = Gauge(
+    "fbm_backup_last_compression_ratio", "Uncompressed / compressed size of the last backup."
+)
+BACKUP_COUNT = Gauge("fbm_backups", "Local backup archives in BACKUP_DIR.")
+BACKUP_SIZE = Gauge("fbm_backups_size_bytes", "Total size of local backup archives.")
+BACKUP_FS = Gauge(
+    "fbm_backup_filesystem_bytes", "Size and free space of the BACKUP_DIR filesystem.", ["kind"]
+)
 
 
 def _ensure_backup_dir():
@@ -49,6 +98,11 @@ def _parse_backup_filename(filename: str) -> Dict:
     }
 
 
+catalog = retention.BackupCatalog(
+    lambda: BACKUP_DIR, lambda filename: _parse_backup_filename(filename)["timestamp"]
+)
+
+
 def list_backups() -> List[Dict]:
     """
     Return a list of backup metadata dicts:
@@ -58,69 +112,399 @@ def list_backups() -> List[Dict]:
         "timestamp": "2025-11-12 21:46:20",
         "size_bytes": 1234567
       }
-    Sorted newest first.
+    Sorted newest first. Served from the in-memory catalog.
     """
     _ensure_backup_dir()
     files = []
-    for entry in os.listdir(BACKUP_DIR):
-        if not entry.endswith(".tar.gz"):
-            continue
-        full_path = os.path.join(BACKUP_DIR, entry)
-        if not os.path.isfile(full_path):
-            continue
-
-        stats = os.stat(full_path)
-        size_bytes = stats.st_size
-        meta = _parse_backup_filename(entry)
+    for entry in catalog.entries():
+        meta = _parse_backup_filename(entry.filename)
         files.append({
-            "filename": entry,
+            "filename": entry.filename,
             "name": meta["name"],
             "timestamp": meta["timestamp_str"],
-            "size_bytes": size_bytes,
+            "size_bytes": entry.size_bytes,
         })
+    return files
 
-    # Sort by timestamp descending where possible, fallback to filename
-    def sort_key(item):
-        meta = _parse_backup_filename(item["filename"])
-        dt = meta["timestamp"]
-        if dt:
-            return dt
-        return datetime.min
 
-    files.sort(key=sort_key, reverse=True)
-    return files
+def retention_plan(overrides: Dict | None = None, reserve_bytes: int = 0) -> dict:
+    """
+    What the retention policy (the config, with `overrides` applied) would
+    keep and delete right now. Nothing is removed.
+    """
+    cfg = dict(load_config())
+    cfg.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return retention.plan(catalog.entries(), retention.policy_from_config(cfg), reserve_bytes)
 
 
-def _cleanup_old_backups():
+def _cleanup_old_backups(reserve_bytes: int = 0, max_delete_fraction: float | None = None) -> int:
     """
-    Enforce BACKUP_RETENTION by oldest-first removal.
+    Apply the retention tiers and size cap (see retention.plan), leaving
+    room under the cap for reserve_bytes more. With max_delete_fraction,
+    a plan deleting more than that share of the archives is not applied.
+    Returns the bytes freed.
+    """
+    _ensure_backup_dir()
+    with span("cleanup_old_backups") as s:
+        result = retention_plan(reserve_bytes=reserve_bytes)
+        total = len(result["keep"]) + len(result["delete"])
+        s.set("backups", total)
+        if max_delete_fraction is not None and len(result["delete"]) > max(1, total * max_delete_fraction):
+            s.set("refused", True)
+            write_log(
+                "Backup",
+                f"Retention change would delete {len(result['delete'])} of {total} backups; not pruning now. "
+                "Preview it at /api/backups/retention; the next backup applies the policy.",
+            )
+            return 0
+        for item in result["delete"]:
+            path = os.path.join(BACKUP_DIR, item["filename"])
+            try:
+                os.remove(path)
+                catalog.removed(item["filename"])
+                s.add("deleted", 1)
+                s.add("bytes_freed", item["size_bytes"])
+                why = f" ({', '.join(item['reasons'])})" if item["reasons"] else ""
+                write_log("Backup", f"Removed old backup: {item['filename']}{why}")
+            except Exception as e:
+                write_log("Backup", f"Failed to remove {item['filename']}: {e}")
+        return s.attributes.get("bytes_freed", 0)
+
+
+# Pending prune after a retention change; restarted by every change, so a
+# burst of edits is applied once, RETENTION_SETTLE_SECONDS after the last.
+_retention_timer = None
+_retention_lock = threading.Lock()
+
+
+def _cleanup_after_config_change():
+    # Re-read the file rather than trust the change events that started us.
+    refresh_config()
+    with claim("cleanup"):
+        _cleanup_old_backups(max_delete_fraction=CONFIG_CHANGE_MAX_DELETE_FRACTION)
+
+
+def _on_retention_change(changes):
+    """
+    Prune soon after the retention policy changes; when it was relaxed the
+    plan simply deletes nothing. A change that would delete most archives
+    is left to the next backup's cleanup rather than applied at once.
+    """
+    global _retention_timer
+    summary = ", ".join(f"{c.key} {c.old} -> {c.new}" for c in changes)
+    write_log("Backup", f"Retention changed ({summary}); applying it in {RETENTION_SETTLE_SECONDS}s.")
+    with _retention_lock:
+        if _retention_timer is not None:
+            _retention_timer.cancel()
+        _retention_timer = threading.Timer(RETENTION_SETTLE_SECONDS, _cleanup_after_config_change)
+        _retention_timer.name = "retention"
+        _retention_timer.daemon = True
+        _retention_timer.start()
+
+
+subscribe(_on_retention_change, keys=list(retention.SETTINGS))
+
+
+def _backup_filesystem_bytes():
+    usage = shutil.disk_usage(BACKUP_DIR)
+    return {"total": usage.total, "free": usage.free, "used": usage.used}
+
+
+# Computed only when /metrics is scraped.
+BACKUP_COUNT.set_function(lambda: len(catalog.entries()))
+BACKUP_SIZE.set_function(lambda: sum(e.size_bytes for e in catalog.entries()))
+BACKUP_FS.set_function(_backup_filesystem_bytes)
+
+
+class _TimedFile:
+    """
+    File wrapper that adds the time spent in read()/write() to an attribute
+    of the current span, so archive time can be split into read, compress
+    and write phases.
     """
-    cfg = load_config()
-    retention = int(cfg.get("BACKUP_RETENTION", 10) or 10)
 
-    backups = list_backups()
-    if len(backups) <= retention:
+    def __init__(self, f, attribute: str):
+        self._f = f
+        self._attribute = attribute
+
+    def read(self, size=-1):
+        started = time.perf_counter()
+        data = self._f.read(size)
+        current_span().add(self._attribute, time.perf_counter() - started)
+        return data
+
+    def write(self, data):
+        started = time.perf_counter()
+        n = self._f.write(data)
+        current_span().add(self._attribute, time.perf_counter() - started)
+        return n
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+
+def _raise_walk_error(error: OSError):
+    raise error
+
+
+def is_excluded(path: str) -> bool:
+    """True for BACKUP_DIR and anything below it, which is never backed up."""
+    backups = os.path.abspath(BACKUP_DIR)
+    path = os.path.abspath(path)
+    return path == backups or path.startswith(backups + os.sep)
+
+
+def _add_path(tar: tarfile.TarFile, path: str, arcname: str, totals: dict, on_file=None):
+    """
+    Archive one BACKUP_PATHS entry, equivalent to tar.add(path, arcname),
+    recording walk / read / compress / write time on the current span.
+    Like tar.add, the archive being written is skipped, and so is BACKUP_DIR.
+    """
+    s = current_span()
+    archive = os.path.abspath(tar.name) if tar.name else None
+
+    def _skipped(full: str) -> bool:
+        return is_excluded(full) or os.path.abspath(full) == archive
+
+    def _add(full: str, name: str):
+        started = time.perf_counter()
+        tarinfo = tar.gettarinfo(full, arcname=name)
+        s.add("walk_seconds", time.perf_counter() - started)
+        if tarinfo is None:
+            # Sockets and other unsupported types; tar.add skips them too.
+            return
+        started = time.perf_counter()
+        if tarinfo.isreg():
+            with open(full, "rb") as f:
+                tar.addfile(tarinfo, _TimedFile(f, "read_seconds"))
+            totals["files"] += 1
+            totals["bytes"] += tarinfo.size
+            s.add("files", 1)
+            s.add("bytes_read", tarinfo.size)
+            if on_file:
+                on_file()
+        else:
+            tar.addfile(tarinfo)
+        s.add("archive_seconds", time.perf_counter() - started)
+
+    if _skipped(path):
+        return
+    _add(path, arcname)
+    if not os.path.isdir(path) or os.path.islink(path):
         return
 
-    to_delete = backups[retention:]
-    for item in to_delete:
-        path = os.path.join(BACKUP_DIR, item["filename"])
+    walker = os.walk(path, onerror=_raise_walk_error)
+    while True:
+        started = time.perf_counter()
+        entry = next(walker, None)
+        s.add("walk_seconds", time.perf_counter() - started)
+        if entry is None:
+            break
+        root, dirs, files = entry
+        dirs[:] = sorted(d for d in dirs if not _skipped(os.path.join(root, d)))
+        files = [f for f in files if not _skipped(os.path.join(root, f))]
+        rel = os.path.relpath(root, path)
+        base = arcname if rel == "." else os.path.join(arcname, rel)
+        for name in sorted(dirs + files):
+            _add(os.path.join(root, name), os.path.join(base, name))
+
+
+# Per-path phase timings recorded on "backup.path" spans.
+PHASES = ("walk_seconds", "read_seconds", "compress_seconds", "write_seconds")
+
+
+def _finish_phase_times(s):
+    # archive_seconds covers read + gzip + write; the remainder is compression.
+    attrs = s.attributes
+    archive = attrs.pop("archive_seconds", 0.0)
+    attrs["compress_seconds"] = max(0.0, archive - attrs.get("read_seconds", 0.0) - attrs.get("write_seconds", 0.0))
+    for key in PHASES:
+        attrs[key] = round(attrs.get(key, 0.0), 6)
+
+
+def backup_paths(cfg: dict) -> List[str]:
+    paths = cfg.get("BACKUP_PATHS", ["/config"])
+    if not isinstance(paths, (list, tuple)):
+        paths = [paths]
+    return [str(p) for p in paths]
+
+
+class InsufficientSpace(Exception):
+    """Raised by the preflight check before any archive bytes are written."""
+
+
+class BackupResult(NamedTuple):
+    # The new archive; when skipped, the previous archive the tree still
+    # matches; None on failure. refused: not attempted for lack of space.
+    path: str | None
+    skipped: bool = False
+    error: str | None = None
+    refused: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.path is not None
+
+
+def tree_fingerprint(paths) -> dict:
+    """
+    Hash of (path, type, size, mtime) for everything under `paths`, walked
+    the way _add_path archives it (symlinks are not followed, BACKUP_DIR is
+    left out). Cheap next to archiving: one stat per entry, no file
+    contents read.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    files = total = 0
+    for path in paths:
+        path = str(path)
+        h.update(os.fsencode(path) + b"\0")
         try:
-            os.remove(path)
-            write_log("Backup", f"Removed old backup: {item['filename']}")
-        except Exception as e:
-            write_log("Backup", f"Failed to remove {item['filename']}: {e}")
+            st = os.lstat(path)
+        except FileNotFoundError:
+            h.update(b"missing\n")
+            continue
+        stack = [] if is_excluded(path) else [(path, st)]
+        while stack:
+            full, st = stack.pop()
+            h.update(b"%s\0%o\0%d\0%d\n" % (os.fsencode(full), stat.S_IFMT(st.st_mode), st.st_size, st.st_mtime_ns))
+            if stat.S_ISREG(st.st_mode):
+                files += 1
+                total += st.st_size
+            elif stat.S_ISDIR(st.st_mode):
+                with os.scandir(full) as it:
+                    entries = sorted(it, key=lambda e: e.name, reverse=True)
+                stack.extend((e.path, e.stat(follow_symlinks=False)) for e in entries if not is_excluded(e.path))
+    return {"digest": h.hexdigest(), "files": files, "bytes": total}
+
+
+def _load_fingerprint() -> dict | None:
+    try:
+        with open(os.path.join(BACKUP_DIR, FINGERPRINT_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_fingerprint(archive: str, fingerprint: dict):
+    path = os.path.join(BACKUP_DIR, FINGERPRINT_FILE)
+    try:
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(dict(fingerprint, archive=archive), f)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        write_log("Backup", f"Failed to save backup fingerprint: {e}")
+
+
+def _load_stats() -> List[dict]:
+    try:
+        with open(os.path.join(BACKUP_DIR, STATS_FILE), "r", encoding="utf-8") as f:
+            runs = json.load(f)
+        return [r for r in runs if r.get("read", 0) > 0 and r.get("seconds", 0) > 0]
+    except (OSError, ValueError, TypeError, AttributeError):
+        return []
+
+
+def _record_stats(read: int, written: int, seconds: float):
+    runs = (_load_stats() + [{"read": read, "written": written, "seconds": round(seconds, 3)}])[-STATS_RUNS:]
+    path = os.path.join(BACKUP_DIR, STATS_FILE)
+    try:
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(runs, f)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        write_log("Backup", f"Failed to save backup stats: {e}")
 
 
-def run_backup() -> str | None:
+def estimate_backup(source_bytes: int, files: int) -> dict:
     """
-    Create a new backup tarball of BACKUP_PATHS.
-    Returns full path to backup file or None on failure.
+    Expected archive size and duration for a tree of source_bytes in
+    `files` files, from the least compressible and the average throughput
+    of recent runs. Without history, assume no compression and no ETA.
     """
-    cfg = load_config()
-    paths = cfg.get("BACKUP_PATHS", ["/config"])
-    if not isinstance(paths, list):
-        paths = [str(paths)]
+    runs = _load_stats()
+    ratio = max((r["written"] / r["read"] for r in runs), default=1.0)
+    estimate = int((source_bytes + files * TAR_HEADER_BYTES) * min(1.0, ratio) * ESTIMATE_MARGIN)
+    rate = sum(r["read"] for r in runs) / sum(r["seconds"] for r in runs) if runs else None
+    return {
+        "source_bytes": source_bytes,
+        "estimated_bytes": estimate,
+        "compression_ratio": round(ratio, 4),
+        "eta_seconds": round(source_bytes / rate, 1) if rate else None,
+        "history_runs": len(runs),
+    }
+
+
+def _free_bytes(path: str) -> int | None:
+    try:
+        st = os.statvfs(path)
+    except OSError:
+        return None
+    return st.f_bavail * st.f_frsize
+
+
+def _same_filesystem(a: str, b: str) -> bool:
+    try:
+        return os.stat(a).st_dev == os.stat(b).st_dev
+    except OSError:
+        return False
+
+
+def _setting_mb(cfg: dict, key: str) -> int:
+    try:
+        return max(0, int(float(cfg.get(key, DEFAULT_CONFIG[key])) * 1024 * 1024))
+    except (TypeError, ValueError):
+        return DEFAULT_CONFIG[key] * 1024 * 1024
+
+
+def preflight(estimated_bytes: int, cfg: dict | None = None) -> str | None:
+    """
+    Check there is room for an archive of estimated_bytes while keeping
+    BACKUP_MIN_FREE_MB free on the backups filesystem, and
+    FRIGATE_MIN_FREE_MB free on Frigate's storage when it is the same
+    filesystem. When short, prune what the retention policy allows (its
+    size cap counting the new archive) and check again. Returns the reason
+    to refuse the backup, or None.
+    """
+    if cfg is None:
+        cfg = load_config()
+    reserve = _setting_mb(cfg, "BACKUP_MIN_FREE_MB")
+    frigate = cfg.get("FRIGATE_STORAGE_PATH") or "/media/frigate"
+    shared = _same_filesystem(BACKUP_DIR, frigate)
+    if shared:
+        reserve = max(reserve, _setting_mb(cfg, "FRIGATE_MIN_FREE_MB"))
+    needed = estimated_bytes + reserve
+
+    free = _free_bytes(BACKUP_DIR)
+    if free is None or free >= needed:
+        return None
+
+    write_log("Backup", f"Low space: {_mb(free)} free, need {_mb(needed)}; pruning under the retention policy.")
+    if _cleanup_old_backups(reserve_bytes=estimated_bytes):
+        free = _free_bytes(BACKUP_DIR) or 0
+        if free >= needed:
+            return None
+
+    where = f"{BACKUP_DIR} (shared with Frigate storage {frigate})" if shared else BACKUP_DIR
+    return (
+        f"Not enough space on {where}: {_mb(free)} free, need {_mb(estimated_bytes)} "
+        f"for the archive plus {_mb(reserve)} reserve"
+    )
+
+
+def _mb(n: int) -> str:
+    return f"{n / (1024 * 1024):.0f} MB"
+
+
+def run_backup(force: bool = False) -> BackupResult:
+    """
+    Create a new backup tarball of BACKUP_PATHS, unless the tree's
+    fingerprint matches the newest archive (and that archive still exists),
+    in which case nothing is written and the result is marked skipped.
+    force=True always writes a new archive. Before writing, the archive
+    size is estimated and checked against free space (see preflight).
+    Progress is reported as a "backup" job.
+    """
+    paths = backup_paths(load_config())
 
     _ensure_backup_dir()
 
@@ -128,29 +512,132 @@ def run_backup() -> str | None:
     filename = f"frigate_config_{timestamp}.tar.gz"
     dest_path = os.path.join(BACKUP_DIR, filename)
 
-    write_log("Backup", f"Starting backup -> {dest_path}")
-    try:
-        with tarfile.open(dest_path, "w:gz") as tar:
-            for path in paths:
-                path = str(path)
-                if not os.path.exists(path):
-                    write_log("Backup", f"Path not found, skipping: {path}")
-                    continue
-                arcname = os.path.basename(path.rstrip("/")) or path.strip("/")
-                write_log("Backup", f"Adding {path} as {arcname}")
-                tar.add(path, arcname=arcname)
-
-        write_log("Backup", f"Backup complete: {dest_path}")
-        _cleanup_old_backups()
-        return dest_path
-    except Exception as e:
-        write_log("Backup", f"Backup failed: {e}")
+    write_log("Backup", "Starting backup")
+    started = time.monotonic()
+    totals = {"files": 0, "bytes": 0}
+    job = start_job("backup", archive=filename)
+
+    with span("run_backup", archive=filename) as run:
         try:
-            if os.path.exists(dest_path):
-                os.remove(dest_path)
-        except Exception:
-            pass
-        return None
+            with span("backup.fingerprint") as s:
+                fingerprint = tree_fingerprint(paths)
+                s.set("files", fingerprint["files"])
+            previous = _load_fingerprint()
+            if (
+                not force
+                and previous
+                and previous.get("digest") == fingerprint["digest"]
+                and os.path.isfile(os.path.join(BACKUP_DIR, previous.get("archive", "")))
+            ):
+                archive = previous["archive"]
+                run.set("archive", archive)
+                run.set("outcome", "unchanged")
+                BACKUP_RUNS.labels("unchanged").inc()
+                write_log("Backup", f"No changes since {archive}; backup skipped.")
+                publish(
+                    BACKUP_FINISHED,
+                    archive=archive,
+                    ok=True,
+                    skipped=True,
+                    bytes=0,
+                    files=fingerprint["files"],
+                    duration_seconds=round(time.monotonic() - started, 3),
+                    error=None,
+                )
+                job.finish(True, message=f"No changes since {archive}")
+                return BackupResult(os.path.join(BACKUP_DIR, archive), skipped=True)
+
+            estimate = estimate_backup(fingerprint["bytes"], fingerprint["files"])
+            run.set("estimated_bytes", estimate["estimated_bytes"])
+            with span("backup.preflight", estimated_bytes=estimate["estimated_bytes"]):
+                refusal = preflight(estimate["estimated_bytes"])
+            if refusal:
+                raise InsufficientSpace(refusal)
+            eta = estimate["eta_seconds"]
+            job.update(
+                done=0,
+                total=fingerprint["bytes"],
+                eta_seconds=eta,
+                message=f"Writing {filename}",
+                estimated_bytes=estimate["estimated_bytes"],
+            )
+
+            eta_msg = f", about {eta:.0f}s" if eta is not None else ""
+            write_log("Backup", f"Writing {dest_path} (estimated {_mb(estimate['estimated_bytes'])}{eta_msg})")
+            with open(dest_path, "wb") as raw, tarfile.open(
+                fileobj=_TimedFile(raw, "write_seconds"), mode="w:gz"
+            ) as tar:
+                for path in paths:
+                    path = str(path)
+                    if not os.path.exists(path):
+                        write_log("Backup", f"Path not found, skipping: {path}")
+                        continue
+                    arcname = os.path.basename(path.rstrip("/")) or path.strip("/")
+                    write_log("Backup", f"Adding {path} as {arcname}")
+                    with span("backup.path", path=path, arcname=arcname) as s:
+                        _add_path(tar, path, arcname, totals, lambda: job.update(done=totals["bytes"]))
+                        _finish_phase_times(s)
+                    for key in PHASES:
+                        run.add(key, s.attributes[key])
+
+            written = os.path.getsize(dest_path)
+            for key in PHASES:
+                run.set(key, round(run.attributes.get(key, 0.0), 6))
+            run.set("files", totals["files"])
+            run.set("bytes_read", totals["bytes"])
+            run.set("bytes_written", written)
+            BACKUP_DURATION.observe(time.monotonic() - started)
+            BACKUP_RUNS.labels("success").inc()
+            BACKUP_FILES.inc(totals["files"])
+            BACKUP_BYTES_READ.inc(totals["bytes"])
+            BACKUP_BYTES_WRITTEN.inc(written)
+            if written:
+                BACKUP_RATIO.set(totals["bytes"] / written)
+            LAST_SUCCESS.labels("backup").set(time.time())
+            run.set("outcome", "success")
+
+            write_log("Backup", f"Backup complete: {dest_path}")
+            _record_stats(totals["bytes"], written, time.monotonic() - started)
+            _save_fingerprint(filename, fingerprint)
+            catalog.added(filename)
+            publish(
+                BACKUP_FINISHED,
+                archive=filename,
+                ok=True,
+                skipped=False,
+                bytes=written,
+                files=totals["files"],
+                duration_seconds=round(time.monotonic() - started, 3),
+                error=None,
+            )
+            job.update(done=totals["bytes"], bytes_written=written)
+            job.finish(True, message=f"Backup complete: {filename}")
+            _cleanup_old_backups()
+            return BackupResult(dest_path)
+        except Exception as e:
+            outcome = "refused" if isinstance(e, InsufficientSpace) else "failure"
+            BACKUP_DURATION.observe(time.monotonic() - started)
+            BACKUP_RUNS.labels(outcome).inc()
+            run.fail(e)
+            run.set("outcome", outcome)
+            write_log("Backup", f"Backup {'refused' if outcome == 'refused' else 'failed'}: {e}")
+            try:
+                if os.path.exists(dest_path):
+                    os.remove(dest_path)
+            except Exception:
+                pass
+            publish(
+                BACKUP_FINISHED,
+                archive=filename,
+                ok=False,
+                skipped=False,
+                bytes=0,
+                files=totals["files"],
+                duration_seconds=round(time.monotonic() - started, 3),
+                error=str(e),
+            )
+            job.finish(False, error=str(e))
+            return BackupResult(None, error=str(e), refused=outcome == "refused")
 
 
 def restore_backup(filename: str) -> bool:
@@ -160,7 +647,7 @@ def restore_backup(filename: str) -> bool:
     """
     cfg = load_config()
     paths = cfg.get("BACKUP_PATHS", ["/config"])
-    if not isinstance(paths, list):
+    if not isinstance(paths, (list, tuple)):
         paths = [str(paths)]
 
     if not paths:
@@ -175,11 +662,32 @@ def restore_backup(filename: str) -> bool:
         return False
 
     write_log("Backup", f"Restoring backup {backup_path} -> {target_root}")
-    try:
-        with tarfile.open(backup_path, "r:gz") as tar:
-            tar.extractall(target_root)
-        write_log("Backup", f"Restore complete from {backup_path}")
-        return True
-    except Exception as e:
-        write_log("Backup", f"Restore failed: {e}")
-        return False
+    started = time.monotonic()
+    with span("restore_backup", archive=filename, target=target_root) as run:
+        try:
+            extract_archive(backup_path, target_root)
+            RESTORE_DURATION.labels("local").observe(time.monotonic() - started)
+            RESTORES.labels("local", "success").inc()
+            LAST_SUCCESS.labels("restore").set(time.time())
+            write_log("Backup", f"Restore complete from {backup_path}")
+            publish(RESTORE_FINISHED, archive=filename, source="local", ok=True, message="Restore complete")
+            return True
+        except Exception as e:
+            RESTORES.labels("local", "failure").inc()
+            run.fail(e)
+            write_log("Backup", f"Restore failed: {e}")
+            publish(RESTORE_FINISHED, archive=filename, source="local", ok=False, message=str(e))
+            return False
+
+
+def extract_archive(archive_path: str, target_root: str):
+    """Extract a backup tarball, recording bytes and read/extract time in a span."""
+    with span("restore.extract", bytes_compressed=os.path.getsize(archive_path)) as s:
+        with open(archive_path, "rb") as raw, tarfile.open(
+            fileobj=_TimedFile(raw, "read_seconds"), mode="r:gz"
+        ) as tar:
+            members = tar.getmembers()
+            s.set("members", len(members))
+            s.set("bytes_extracted", sum(m.size for m in members if m.isreg()))
+            tar.extractall(target_root, members=members)
+        s.set("read_seconds", round(s.attributes.get("read_seconds", 0.0), 6))
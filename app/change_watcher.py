@@ -0,0 +1,257 @@
+import errno
+import os
+import threading
+import time
+
+import backup
+import scheduler
+from config_manager import DEFAULT_CONFIG, load_config, subscribe
+from logger import write_log
+from inotify import (
+    Inotify,
+    IN_ATTRIB,
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_DELETE,
+    IN_DELETE_SELF,
+    IN_IGNORED,
+    IN_ISDIR,
+    IN_MODIFY,
+    IN_MOVED_FROM,
+    IN_MOVED_TO,
+    IN_MOVE_SELF,
+    IN_ONLYDIR,
+    IN_Q_OVERFLOW,
+)
+
+# Without inotify (or when the watch limit is hit) the tree fingerprint is
+# compared this often instead.
+POLL_INTERVAL_SECONDS = 60.0
+# How quickly a stop or a config change is noticed while waiting for events.
+WAKE_SECONDS = 1.0
+
+_WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_CREATE
+    | IN_DELETE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+
+_WATCH_KEYS = ["BACKUP_PATHS", "BACKUP_WATCH_ENABLED", "BACKUP_WATCH_QUIET_SECONDS", "BACKUP_WATCH_MAX_DELAY_SECONDS"]
+
+_thread = None
+_stop = threading.Event()
+_reload = threading.Event()
+_subscribed = False
+
+
+class _Pending:
+    """Quiet-period debounce: due once nothing changed for `quiet` seconds,
+    or `max_delay` seconds after the first change of a burst."""
+
+    def __init__(self, quiet: float, max_delay: float):
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self.first = None
+        self.last = None
+
+    def changed(self):
+        self.last = time.monotonic()
+        if self.first is None:
+            self.first = self.last
+
+    def due(self) -> bool:
+        if self.first is None:
+            return False
+        now = time.monotonic()
+        return now - self.last >= self.quiet or now - self.first >= self.max_delay
+
+    def timeout(self, idle: float) -> float:
+        if self.first is None:
+            return idle
+        wait = min(self.last + self.quiet, self.first + self.max_delay) - time.monotonic()
+        return max(0.0, min(idle, wait))
+
+    def clear(self):
+        self.first = self.last = None
+
+
+def _setting(cfg: dict, key: str) -> float:
+    try:
+        return max(0.0, float(cfg.get(key, DEFAULT_CONFIG[key])))
+    except (TypeError, ValueError):
+        return float(DEFAULT_CONFIG[key])
+
+
+def _interrupted() -> bool:
+    return _stop.is_set() or _reload.is_set()
+
+
+def _trigger(pending: _Pending):
+    waited = time.monotonic() - pending.first
+    pending.clear()
+    try:
+        scheduler.run_job_now("backup", f"changes in BACKUP_PATHS (first {waited:.0f}s ago)")
+    except Exception as e:
+        write_log("Watch", f"Triggered backup failed: {e}")
+
+
+def _add_tree(notifier: Inotify, root: str):
+    """Watch root and every directory below it (symlinks are not followed)."""
+    for dirpath, dirnames, _ in os.walk(root):
+        if backup.is_excluded(dirpath):
+            dirnames[:] = []
+            continue
+        try:
+            notifier.add_watch(dirpath, _WATCH_MASK)
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                raise
+            # Removed while walking, or unreadable; not a reason to give up.
+            dirnames[:] = []
+
+
+def _setup_inotify(paths) -> tuple:
+    """
+    Inotify with watches for every directory under `paths`, plus
+    {parent dir: file names} for entries that are single files.
+    """
+    notifier = Inotify()
+    file_filters = {}
+    try:
+        for path in paths:
+            if os.path.isdir(path) and not os.path.islink(path):
+                _add_tree(notifier, path)
+            elif os.path.lexists(path):
+                parent = os.path.dirname(os.path.abspath(path))
+                file_filters.setdefault(parent, set()).add(os.path.basename(path))
+            else:
+                write_log("Watch", f"Path not found, not watched: {path}")
+        watched = set(notifier.watches.values())
+        for parent in list(file_filters):
+            if parent in watched:
+                # Already watched as part of a tree: every event counts there.
+                del file_filters[parent]
+            else:
+                notifier.add_watch(parent, _WATCH_MASK)
+    except OSError:
+        notifier.close()
+        raise
+    return notifier, file_filters
+
+
+def _watch_inotify(notifier: Inotify, file_filters: dict, pending: _Pending):
+    while not _interrupted():
+        events = notifier.read_events(timeout=pending.timeout(WAKE_SECONDS))
+        for e in events:
+            if e.mask & IN_Q_OVERFLOW:
+                # Events were dropped; assume something changed.
+                pending.changed()
+                continue
+            if e.mask & IN_IGNORED:
+                continue
+            parent = notifier.watches.get(e.wd)
+            if parent is None:
+                continue
+            names = file_filters.get(parent)
+            if names is not None and e.name not in names:
+                continue
+            full = os.path.join(parent, e.name) if e.name else parent
+            if backup.is_excluded(full):
+                continue
+            if names is None and e.mask & IN_ISDIR and e.mask & (IN_CREATE | IN_MOVED_TO):
+                _add_tree(notifier, full)
+            pending.changed()
+        if pending.due():
+            _trigger(pending)
+
+
+def _watch_polling(paths, pending: _Pending):
+    last = backup.tree_fingerprint(paths)["digest"]
+    next_poll = time.monotonic() + POLL_INTERVAL_SECONDS
+    while not _interrupted():
+        wait = min(pending.timeout(WAKE_SECONDS), max(0.0, next_poll - time.monotonic()))
+        if _stop.wait(wait):
+            return
+        if time.monotonic() >= next_poll:
+            next_poll = time.monotonic() + POLL_INTERVAL_SECONDS
+            try:
+                digest = backup.tree_fingerprint(paths)["digest"]
+            except OSError as e:
+                write_log("Watch", f"Fingerprint failed: {e}")
+                continue
+            if digest != last:
+                last = digest
+                pending.changed()
+        if pending.due():
+            _trigger(pending)
+
+
+def _run():
+    while not _stop.is_set():
+        _reload.clear()
+        cfg = load_config()
+        if not cfg.get("BACKUP_WATCH_ENABLED", False):
+            # Idle until the setting is switched on (or shutdown).
+            while not _interrupted():
+                _stop.wait(WAKE_SECONDS)
+            continue
+
+        paths = backup.backup_paths(cfg)
+        pending = _Pending(
+            _setting(cfg, "BACKUP_WATCH_QUIET_SECONDS"),
+            _setting(cfg, "BACKUP_WATCH_MAX_DELAY_SECONDS"),
+        )
+        try:
+            notifier, file_filters = _setup_inotify(paths)
+        except OSError as e:
+            write_log("Watch", f"inotify unavailable ({e}); checking BACKUP_PATHS every {POLL_INTERVAL_SECONDS:.0f}s.")
+            try:
+                _watch_polling(paths, pending)
+            except Exception as e:
+                write_log("Watch", f"Change watcher failed: {e}")
+                _stop.wait(POLL_INTERVAL_SECONDS)
+            continue
+
+        write_log(
+            "Watch",
+            f"Watching {len(notifier.watches)} directories under {', '.join(paths)}; "
+            f"backup after {pending.quiet:.0f}s quiet.",
+        )
+        try:
+            _watch_inotify(notifier, file_filters, pending)
+        except OSError as e:
+            # Typically the watch limit while following new directories.
+            write_log("Watch", f"Change watcher restarting: {e}")
+            _stop.wait(WAKE_SECONDS)
+        finally:
+            notifier.close()
+
+
+def _on_config_change(changes):
+    _reload.set()
+
+
+def start_change_watcher():
+    """Start the BACKUP_PATHS watcher thread (idempotent); it idles while watch mode is off."""
+    global _thread, _subscribed
+    if not _subscribed:
+        subscribe(_on_config_change, keys=_WATCH_KEYS)
+        _subscribed = True
+    if _thread and _thread.is_alive():
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_run, name="change-watcher", daemon=True)
+    _thread.start()
+
+
+def stop_change_watcher(timeout: float = 5.0):
+    _stop.set()
+    if _thread:
+        _thread.join(timeout)
@@ -0,0 +1,226 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+from collections import deque
+from typing import Callable, NamedTuple, Sequence
+
+from logger import write_log
+
+# Commands running at once; the rest wait their turn.
+MAX_CONCURRENT = 4
+DEFAULT_TIMEOUT = 600
+# Captured stdout/stderr keep at most this many bytes each (the tail).
+MAX_OUTPUT_BYTES = 256 * 1024
+# SIGTERM -> SIGKILL grace period when a command is stopped.
+KILL_GRACE_SECONDS = 5
+_STREAM_LIMIT = 1024 * 1024
+
+
+class CommandResult(NamedTuple):
+    returncode: int
+    stdout: str
+    stderr: str
+    timed_out: bool
+    truncated: bool
+    duration: float
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.timed_out
+
+
+class _Capture:
+    """Tail of one output stream, bounded by MAX_OUTPUT_BYTES."""
+
+    def __init__(self):
+        self.lines = deque()
+        self.size = 0
+        self.truncated = False
+
+    def add(self, line: str):
+        self.lines.append(line)
+        self.size += len(line) + 1
+        while self.size > MAX_OUTPUT_BYTES and len(self.lines) > 1:
+            self.size -= len(self.lines.popleft()) + 1
+            self.truncated = True
+
+    def text(self) -> str:
+        return "\n".join(self.lines).strip()
+
+
+class _Runner:
+    """
+    Owns a private event loop thread on which every command runs, so the
+    concurrency limit is shared by async handlers and worker threads alike.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._semaphore = None
+
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                ready = threading.Event()
+                threading.Thread(target=self._serve, args=(ready,), name="command-runner", daemon=True).start()
+                ready.wait()
+            return self._loop
+
+    def _serve(self, ready: threading.Event):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+        ready.set()
+        loop.run_forever()
+
+    async def execute(self, args, shell, timeout, component, on_line, env, cwd) -> CommandResult:
+        async with self._semaphore:
+            return await _execute(args, shell, timeout, component, on_line, env, cwd)
+
+
+_runner = _Runner()
+
+
+def _kill_group(proc, sig):
+    try:
+        os.killpg(proc.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _pump(stream, name: str, capture: _Capture, component, on_line):
+    while True:
+        try:
+            raw = await stream.readline()
+        except ValueError:
+            # Line longer than the stream limit: take what is buffered.
+            raw = await stream.read(_STREAM_LIMIT)
+        if not raw:
+            return
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        capture.add(line)
+        if component:
+            write_log(component, line)
+        if on_line:
+            try:
+                on_line(name, line)
+            except Exception:
+                pass
+
+
+async def _execute(args, shell, timeout, component, on_line, env, cwd) -> CommandResult:
+    started = time.monotonic()
+    kwargs = dict(
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,  # own process group, so kill reaches children
+        limit=_STREAM_LIMIT,
+        env=env,
+        cwd=cwd,
+    )
+    try:
+        if shell:
+            proc = await asyncio.create_subprocess_shell(args, **kwargs)
+        else:
+            proc = await asyncio.create_subprocess_exec(*args, **kwargs)
+    except OSError as e:
+        return CommandResult(127, "", str(e), False, False, time.monotonic() - started)
+
+    out, err = _Capture(), _Capture()
+    pumps = asyncio.gather(
+        _pump(proc.stdout, "stdout", out, component, on_line),
+        _pump(proc.stderr, "stderr", err, component, on_line),
+    )
+    timed_out = False
+    try:
+        # One deadline for the output and the exit: a child that closes its
+        # pipes must not outlive the timeout.
+        await asyncio.wait_for(asyncio.gather(asyncio.shield(pumps), proc.wait()), timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+        await _stop(proc)
+    except asyncio.CancelledError:
+        await _stop(proc)
+        raise
+    finally:
+        if not pumps.done():
+            # Pick up output still buffered in the pipes, then give up.
+            await asyncio.wait({pumps}, timeout=1)
+            pumps.cancel()
+
+    if timed_out:
+        err.add(f"Command timed out after {timeout}s")
+        if component:
+            write_log(component, f"Command timed out after {timeout}s; process group killed.")
+    return CommandResult(
+        proc.returncode if proc.returncode is not None else -1,
+        out.text(),
+        err.text(),
+        timed_out,
+        out.truncated or err.truncated,
+        time.monotonic() - started,
+    )
+
+
+async def _stop(proc):
+    _kill_group(proc, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(proc.wait(), KILL_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        _kill_group(proc, signal.SIGKILL)
+        await proc.wait()
+
+
+async def run(
+    args: Sequence[str] | str,
+    *,
+    shell: bool = False,
+    timeout: float | None = DEFAULT_TIMEOUT,
+    component: str | None = None,
+    on_line: Callable[[str, str], None] | None = None,
+    env: dict | None = None,
+    cwd: str | None = None,
+) -> CommandResult:
+    """
+    Run a command without blocking the event loop.
+
+    args is an argv list, or a command string with shell=True. Output lines
+    are written to the log under `component` (if given) and passed to
+    on_line(stream, line) as they arrive, e.g. for a progress feed. On
+    timeout or cancellation the whole process group is terminated.
+    """
+    future = asyncio.run_coroutine_threadsafe(
+        _runner.execute(args, shell, timeout, component, on_line, env, cwd), _runner.loop()
+    )
+    return await asyncio.wrap_future(future)
+
+
+def run_sync(
+    args: Sequence[str] | str,
+    *,
+    shell: bool = False,
+    timeout: float | None = DEFAULT_TIMEOUT,
+    component: str | None = None,
+    on_line: Callable[[str, str], None] | None = None,
+    env: dict | None = None,
+    cwd: str | None = None,
+) -> CommandResult:
+    """
+    Blocking form of run() for scheduler jobs and other worker threads.
+    Must not be called from the event loop thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        raise RuntimeError("run_sync() called from the event loop; use 'await commands.run()'")
+    future = asyncio.run_coroutine_threadsafe(
+        _runner.execute(args, shell, timeout, component, on_line, env, cwd), _runner.loop()
+    )
+    return future.result()
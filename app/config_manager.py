@@ -1,18 +1,64 @@
 import json
 import os
+import time
 from threading import Lock
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, List, Mapping, NamedTuple
+
+from logger import write_log
 
 CONFIG_PATH = "/data/config.json"
 
+# Within this window load_config() serves the cached config without even
+# stat()ing the file; after it, a stat of mtime/size decides whether to re-read.
+CACHE_TTL_SECONDS = 1.0
+
 _lock = Lock()
 
+# Parsed, frozen config plus the file signature it was read from.
+_cache = {
+    "config": None,
+    "signature": None,
+    "checked_at": 0.0,
+}
+
 DEFAULT_CONFIG = {
     # Backup settings
     "BACKUP_PATHS": ["/config"],
+    # Retention (see retention.py): the newest BACKUP_RETENTION backups, plus
+    # the newest of each of the last N hours/days/weeks/months, within an
+    # optional total size cap. 0 disables a tier or the cap (BACKUP_RETENTION
+    # 0 means the default, 10).
     "BACKUP_RETENTION": 10,
+    "BACKUP_KEEP_HOURLY": 0,
+    "BACKUP_KEEP_DAILY": 0,
+    "BACKUP_KEEP_WEEKLY": 0,
+    "BACKUP_KEEP_MONTHLY": 0,
+    "BACKUP_MAX_TOTAL_MB": 0,
 
     # Frigate integration
     "FRIGATE_RESTART_CMD": "systemctl restart frigate",
+    # Frigate recordings/clips storage, watched for free space
+    "FRIGATE_STORAGE_PATH": "/media/frigate",
+    # Space a backup must leave free on the backups filesystem, and on
+    # Frigate's storage when the backups live on the same filesystem.
+    "BACKUP_MIN_FREE_MB": 256,
+    "FRIGATE_MIN_FREE_MB": 2048,
+
+    # Scheduled jobs wait (with backoff, up to the deadline) while the host
+    # is busier than this; see admission.py.
+    "ADMISSION_MAX_LOAD_PER_CPU": 1.5,
+    "ADMISSION_MAX_IO_PRESSURE": 25.0,
+    "ADMISSION_MAX_DISK_BUSY": 80.0,
+    "ADMISSION_DEADLINE_MINUTES": 60,
+    # Random start delay so hosts sharing a cron expression spread out
+    "SCHEDULE_JITTER_SECONDS": 120,
+
+    # Watch mode: back up BACKUP_PATHS once they have been quiet this long
+    # after a change (and at most MAX_DELAY after the first change of a burst).
+    "BACKUP_WATCH_ENABLED": False,
+    "BACKUP_WATCH_QUIET_SECONDS": 300,
+    "BACKUP_WATCH_MAX_DELAY_SECONDS": 3600,
 
     # Google Drive
     "GDRIVE_ENABLED": False,
@@ -40,37 +86,189 @@ def _ensure_config_exists():
             json.dump(DEFAULT_CONFIG, f, indent=2)
 
 
-def load_config() -> dict:
+class ConfigChange(NamedTuple):
+    """
+    One key whose value differs between two config snapshots.
+    old/new are None when the key was added/removed.
+    """
+    key: str
+    old: Any
+    new: Any
+
+
+# (callback, frozenset of keys or None for all keys)
+_subscribers: List[tuple] = []
+
+
+def subscribe(callback: Callable[[List[ConfigChange]], None], keys: Iterable[str] | None = None) -> None:
+    """
+    Register `callback(changes)` to be called whenever the config changes,
+    either through save_config() or an edit to the file on disk.
+    With `keys`, the callback only sees (and only fires for) those keys.
+    Callbacks run on the thread that observed the change; keep them short.
+    """
+    _subscribers.append((callback, frozenset(keys) if keys is not None else None))
+
+
+def diff_configs(old: Mapping[str, Any], new: Mapping[str, Any]) -> List[ConfigChange]:
+    changes = []
+    for key in sorted(set(old) | set(new)):
+        before = old.get(key)
+        after = new.get(key)
+        if before != after:
+            changes.append(ConfigChange(key, before, after))
+    return changes
+
+
+def _publish(old: Mapping[str, Any], new: Mapping[str, Any]) -> None:
+    changes = diff_configs(old, new)
+    if not changes:
+        return
+    for callback, keys in list(_subscribers):
+        relevant = changes if keys is None else [c for c in changes if c.key in keys]
+        if not relevant:
+            continue
+        try:
+            callback(relevant)
+        except Exception as e:
+            name = getattr(callback, "__qualname__", repr(callback))
+            write_log("Config", f"Change handler {name} failed: {e}")
+
+
+def _freeze(value: Any) -> Any:
+    """
+    Return a read-only copy: dicts become mappingproxy, lists become tuples.
+    """
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
     """
-    Load configuration from disk, merging with DEFAULT_CONFIG for any missing keys.
+    Inverse of _freeze, producing plain JSON-serialisable dicts and lists.
+    """
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _file_signature():
+    try:
+        st = os.stat(CONFIG_PATH)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _read_from_disk() -> dict:
+    """
+    Read and merge the config file. Raises OSError or ValueError when it
+    cannot be read or parsed (e.g. caught mid-write by another editor).
+    """
+    _ensure_config_exists()
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        cfg = json.load(f)
+    if not isinstance(cfg, dict):
+        raise ValueError("top level is not an object")
+
+    # Merge defaults for any missing keys
+    for k, v in DEFAULT_CONFIG.items():
+        if k not in cfg:
+            cfg[k] = v
+    return cfg
+
+
+def _store_cache(cfg: dict, signature) -> Mapping[str, Any]:
+    frozen = _freeze(cfg)
+    _cache["config"] = frozen
+    _cache["signature"] = signature
+    _cache["checked_at"] = time.monotonic()
+    return frozen
+
+
+def load_config() -> Mapping[str, Any]:
+    """
+    Return the configuration, merged with DEFAULT_CONFIG for any missing keys.
+
+    The result is a cached, read-only view. To change settings, copy it
+    (`cfg = dict(load_config())`), modify the copy and pass it to save_config().
+    """
+    cached = _cache["config"]
+    if cached is not None and time.monotonic() - _cache["checked_at"] < CACHE_TTL_SECONDS:
+        return cached
+    return refresh_config()
+
+
+def refresh_config() -> Mapping[str, Any]:
+    """
+    Revalidate the cache against the file now, ignoring the TTL.
+    If the file changed, subscribers are notified of the differences.
     """
     with _lock:
-        _ensure_config_exists()
+        old = _cache["config"]
+        # Taken before reading, so an edit landing mid-read shows up as a
+        # changed signature next time instead of being cached as current.
+        signature = _file_signature()
+        if old is not None and signature is not None and signature == _cache["signature"]:
+            _cache["checked_at"] = time.monotonic()
+            return old
+
         try:
-            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-                cfg = json.load(f)
-        except Exception:
-            cfg = {}
+            cfg = _read_from_disk()
+        except (OSError, ValueError) as e:
+            if old is not None:
+                # Keep the last good config; subscribers see no change. The
+                # next write to the file changes the signature and retries.
+                write_log("Config", f"Ignoring unreadable {CONFIG_PATH}: {e}")
+                _cache["signature"] = signature
+                _cache["checked_at"] = time.monotonic()
+                return old
+            write_log("Config", f"Cannot read {CONFIG_PATH} ({e}); using defaults.")
+            cfg = dict(DEFAULT_CONFIG)
+            signature = None
+        new = _store_cache(cfg, signature)
 
-        # Merge defaults for any missing keys
-        for k, v in DEFAULT_CONFIG.items():
-            if k not in cfg:
-                cfg[k] = v
+    if old is not None:
+        _publish(old, new)
+    return new
 
-        return cfg
 
+def invalidate_config_cache() -> None:
+    """
+    Force the next load_config() to re-read the file.
+    """
+    with _lock:
+        _cache["config"] = None
+        _cache["signature"] = None
+        _cache["checked_at"] = 0.0
 
-def save_config(cfg: dict) -> None:
+
+def save_config(cfg: Mapping[str, Any]) -> None:
     """
     Save configuration to disk. Unknown keys are preserved.
     """
     with _lock:
+        old = _cache["config"]
+        if old is None:
+            try:
+                old = _freeze(_read_from_disk())
+            except (OSError, ValueError):
+                old = _freeze(dict(DEFAULT_CONFIG))
+
         # Ensure at least default keys exist
         merged = dict(DEFAULT_CONFIG)
-        merged.update(cfg)
+        merged.update(_thaw(cfg))
 
         os.makedirs(os.path.dirname(CONFIG_PATH), exist_ok=True)
         tmp_path = CONFIG_PATH + ".tmp"
         with open(tmp_path, "w", encoding="utf-8") as f:
             json.dump(merged, f, indent=2)
         os.replace(tmp_path, CONFIG_PATH)
+        new = _store_cache(merged, _file_signature())
+
+    _publish(old, new)
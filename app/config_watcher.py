@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+
+import config_manager
+from logger import write_log
+from inotify import (
+    Inotify,
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_DELETE,
+    IN_MOVED_TO,
+    IN_Q_OVERFLOW,
+)
+
+# Upper bound on how long an edit to config.json can go unnoticed:
+# with inotify, DEBOUNCE_SECONDS after the last write; when polling (or if an
+# inotify event is lost), at most POLL_INTERVAL_SECONDS.
+DEBOUNCE_SECONDS = 0.2
+POLL_INTERVAL_SECONDS = 2.0
+
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_thread = None
+_stop = threading.Event()
+
+
+def _refresh():
+    try:
+        config_manager.refresh_config()
+    except Exception as e:
+        write_log("Config", f"Config reload failed: {e}")
+
+
+def _watch_inotify(notifier: Inotify):
+    target = os.path.basename(config_manager.CONFIG_PATH)
+    while not _stop.is_set():
+        events = notifier.read_events(timeout=POLL_INTERVAL_SECONDS)
+        if not events:
+            # Periodic stat as a safety net; cheap when nothing changed.
+            _refresh()
+            continue
+        if not any(e.name == target or e.mask & IN_Q_OVERFLOW for e in events):
+            continue
+
+        # Let a burst of writes (editor save, tmp+rename) settle first.
+        deadline = time.monotonic() + DEBOUNCE_SECONDS
+        while not _stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if notifier.read_events(timeout=remaining):
+                deadline = time.monotonic() + DEBOUNCE_SECONDS
+        _refresh()
+
+
+def _watch_polling():
+    while not _stop.wait(POLL_INTERVAL_SECONDS):
+        _refresh()
+
+
+def _run():
+    config_dir = os.path.dirname(config_manager.CONFIG_PATH)
+    notifier = None
+    try:
+        os.makedirs(config_dir, exist_ok=True)
+        notifier = Inotify()
+        notifier.add_watch(config_dir, _WATCH_MASK)
+        write_log("Config", f"Watching {config_manager.CONFIG_PATH} with inotify.")
+    except OSError as e:
+        if notifier:
+            notifier.close()
+        notifier = None
+        write_log("Config", f"inotify unavailable ({e}); polling config every {POLL_INTERVAL_SECONDS}s.")
+
+    # Prime the cache so the first real edit produces a diff.
+    _refresh()
+    try:
+        if notifier:
+            _watch_inotify(notifier)
+        else:
+            _watch_polling()
+    finally:
+        if notifier:
+            notifier.close()
+
+
+def start_config_watcher():
+    """Start the background config watcher (idempotent)."""
+    global _thread
+    if _thread and _thread.is_alive():
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_run, name="config-watcher", daemon=True)
+    _thread.start()
+
+
+def stop_config_watcher(timeout: float = 5.0):
+    _stop.set()
+    if _thread:
+        _thread.join(timeout)
@@ -1,31 +1,40 @@
 import os
-import subprocess
+import time
+from typing import List
+
+import commands
+from hardware import inventory
+from jobs import Job, start_job
 from logger import write_log
-from update import run_command
+from resource_locks import claim
+
+APT_LISTS_DIR = "/var/lib/apt/lists"
+# Package lists younger than this are used as they are.
+APT_LISTS_MAX_AGE_SECONDS = 6 * 3600
+# Share of the install progress bar given to downloading packages.
+DOWNLOAD_SHARE = 0.3
+
+GPU_KEYS = ("intel_gpu", "nvidia_gpu", "amd_gpu")
 
 
 def detect_drivers():
-    """Detect presence of Coral TPU and common GPU devices."""
+    """Detect presence of Coral TPU and common GPU devices (from the hardware inventory)."""
     info = {}
+    coral = inventory.coral()
+    gpu_vendors = {g["vendor"] for g in inventory.gpus()}
 
     # Coral Edge TPU (PCI / M.2 / USB)
-    apex_detected = False
-    try:
-        out = subprocess.run("ls /dev/apex* 2>/dev/null", shell=True, capture_output=True, text=True)
-        if out.stdout.strip():
-            apex_detected = True
-    except Exception:
-        pass
     info["coral"] = {
-        "detected": apex_detected,
+        "detected": coral["detected"],
+        "pci": coral["pci"],
+        "usb": coral["usb"],
+        "dev_nodes": coral["dev_nodes"],
+        "driver_loaded": coral["driver_loaded"],
         "recommended_method": "community_installer",
     }
 
     # Intel GPU (VAAPI)
-    intel_gpu = False
-    lspci = subprocess.getoutput("lspci")
-    if "Intel Corporation" in lspci and "Graphics" in lspci:
-        intel_gpu = True
+    intel_gpu = "intel" in gpu_vendors
     info["intel_gpu"] = {
         "detected": intel_gpu,
         "recommended_packages": [
@@ -35,7 +44,7 @@ def detect_drivers():
     }
 
     # NVIDIA GPU
-    nvidia_gpu = "NVIDIA" in lspci
+    nvidia_gpu = "nvidia" in gpu_vendors
     info["nvidia_gpu"] = {
         "detected": nvidia_gpu,
         "recommended_packages": [
@@ -45,16 +54,12 @@ def detect_drivers():
     }
 
     # AMD GPU
-    amd_gpu = "AMD" in lspci or "ATI" in lspci
+    amd_gpu = "amd" in gpu_vendors
     info["amd_gpu"] = {
         "detected": amd_gpu,
         "recommended_packages": ["firmware-amd-graphics"],
     }
 
-    write_log(
-        "Drivers",
-        f"Detection result: coral={apex_detected}, intel={intel_gpu}, nvidia={nvidia_gpu}, amd={amd_gpu}",
-    )
     return info
 
 
@@ -67,22 +72,18 @@ def install_coral_drivers():
         local_script = "/tmp/coral_install.sh"
 
         # Retrieve and decode the script
-        subprocess.run(
-            f"curl -sL {script_url} | base64 -d > {local_script}",
-            shell=True,
-            check=True,
+        fetch = commands.run_sync(
+            ["bash", "-c", f"set -o pipefail; curl -sL '{script_url}' | base64 -d > {local_script}"],
+            timeout=120,
         )
+        if not fetch.ok:
+            raise RuntimeError(fetch.stderr or f"download failed with code {fetch.returncode}")
         os.chmod(local_script, 0o755)
 
         # Run the script non-interactively
-        proc = subprocess.run(
-            f"bash {local_script}",
-            shell=True,
-            capture_output=True,
-            text=True,
-        )
+        proc = commands.run_sync(["bash", local_script], timeout=1800, component="Drivers")
 
-        if proc.returncode == 0:
+        if proc.ok:
             write_log("Drivers", "Coral TPU driver installation completed successfully.")
             return True
         else:
@@ -97,60 +98,165 @@ def install_coral_drivers():
         return False
 
 
+def _apt_lists_age() -> float | None:
+    """Seconds since the package lists were last refreshed, or None if there are none."""
+    newest = 0.0
+    try:
+        with os.scandir(APT_LISTS_DIR) as it:
+            for entry in it:
+                if entry.name.endswith(("Release", "Packages", "Packages.lz4")):
+                    newest = max(newest, entry.stat().st_mtime)
+    except OSError:
+        return None
+    return time.time() - newest if newest else None
+
+
+def _installed_packages(packages: List[str]) -> set:
+    """Which of `packages` dpkg reports as installed (one dpkg-query call)."""
+    if not packages:
+        return set()
+    result = commands.run_sync(
+        ["dpkg-query", "-W", "-f=${Package}\t${db:Status-Abbrev}\n", *packages], timeout=30
+    )
+    # Exit code is 1 when some packages are unknown; the rest are still listed.
+    installed = set()
+    for line in result.stdout.splitlines():
+        name, _, status = line.partition("\t")
+        if status.startswith("ii"):
+            installed.add(name.split(":")[0])
+    return installed
+
+
+def plan_install(info: dict | None = None) -> dict:
+    """
+    Everything to install for the detected hardware: the packages of all
+    detected GPUs (deduplicated, minus those already installed), whether the
+    Coral installer is needed (a PCIe/M.2 Coral without /dev/apex_*; USB
+    accelerators need no kernel driver), and whether the package lists need
+    a refresh.
+    """
+    if info is None:
+        info = detect_drivers()
+    wanted = []
+    for key in GPU_KEYS:
+        if info[key]["detected"]:
+            for pkg in info[key]["recommended_packages"]:
+                if pkg not in wanted:
+                    wanted.append(pkg)
+    installed = _installed_packages(wanted)
+    packages = [p for p in wanted if p not in installed]
+    age = _apt_lists_age()
+    return {
+        "packages": packages,
+        "already_installed": [p for p in wanted if p in installed],
+        "coral": bool(info["coral"]["pci"]) and not info["coral"]["dev_nodes"],
+        "refresh_lists": bool(packages) and (age is None or age > APT_LISTS_MAX_AGE_SECONDS),
+        "lists_age_seconds": round(age) if age is not None else None,
+    }
+
+
+def _apt_progress(job: Job):
+    """
+    on_line handler for apt-get with APT::Status-Fd=1: "dlstatus:" and
+    "pmstatus:" lines drive the job's percentage (downloads are the first
+    DOWNLOAD_SHARE of it), and every line goes to the job's output.
+    """
+
+    def on_line(stream: str, line: str):
+        job.log(line)
+        kind, _, rest = line.partition(":")
+        if kind not in ("dlstatus", "pmstatus"):
+            return
+        parts = rest.split(":", 2)
+        if len(parts) < 3:
+            return
+        try:
+            percent = float(parts[1])
+        except ValueError:
+            return
+        if kind == "dlstatus":
+            done = percent * DOWNLOAD_SHARE
+        else:
+            done = 100 * DOWNLOAD_SHARE + percent * (1 - DOWNLOAD_SHARE)
+        job.update(done=round(done, 1), message=parts[2])
+
+    return on_line
+
+
 def install_drivers():
-    """Install recommended drivers for detected hardware."""
-    info = detect_drivers()
+    """
+    Install recommended drivers for all detected hardware: at most one
+    package list refresh and one apt-get transaction for every GPU package,
+    then the Coral installer, holding the "driver_install" lock (so callers
+    must not hold it already). Progress is reported as a "driver_install"
+    job; "ok" is False only if something failed. Host-side: the web API's
+    install button stays on the container stub in driver_installer.py.
+    """
+    plan = plan_install()
+    job = start_job("driver_install", unit="percent", **plan)
+    job.update(done=0, total=100)
     installed = []
+    failed = []
+    env = dict(os.environ, DEBIAN_FRONTEND="noninteractive")
 
-    # --- Coral TPU ---
-    if info["coral"]["detected"]:
-        ok = install_coral_drivers()
-        if ok:
-            installed.append("Coral TPU drivers (community installer)")
-        else:
-            write_log("Drivers", "Coral TPU installation failed or skipped.")
-
-    # --- Intel GPU ---
-    if info["intel_gpu"]["detected"]:
-        pkgs = info["intel_gpu"]["recommended_packages"]
-        write_log("Drivers", f"Installing Intel GPU packages: {', '.join(pkgs)}")
-        run_command("apt-get update")
-        for pkg in pkgs:
-            out, err, code = run_command(f"apt-get install -y {pkg}")
-            if code == 0:
-                write_log("Drivers", f"Installed {pkg} successfully.")
-                installed.append(pkg)
+    job.update(message="Waiting for the package system")
+    # Holds apt exclusively, so no update or backup runs alongside.
+    with claim("driver_install"):
+        if plan["packages"]:
+            if plan["refresh_lists"]:
+                job.update(message="Refreshing package lists")
+                result = commands.run_sync(
+                    ["apt-get", "update"], timeout=600, component="Drivers", env=env, on_line=lambda s, l: job.log(l)
+                )
+                if not result.ok:
+                    # Installing from the existing lists may still work.
+                    write_log("Drivers", f"apt-get update failed: {result.stderr or result.stdout}")
             else:
-                write_log("Drivers", f"Failed to install {pkg}: {err or out}")
-
-    # --- NVIDIA GPU ---
-    if info["nvidia_gpu"]["detected"]:
-        pkgs = info["nvidia_gpu"]["recommended_packages"]
-        write_log("Drivers", f"Installing NVIDIA GPU packages: {', '.join(pkgs)}")
-        run_command("apt-get update")
-        for pkg in pkgs:
-            out, err, code = run_command(f"apt-get install -y {pkg}")
-            if code == 0:
-                write_log("Drivers", f"Installed {pkg} successfully.")
-                installed.append(pkg)
+                write_log("Drivers", f"Package lists are {plan['lists_age_seconds']}s old; not refreshing.")
+
+            pkgs = plan["packages"]
+            write_log("Drivers", f"Installing GPU packages: {', '.join(pkgs)}")
+            job.update(message=f"Installing {len(pkgs)} packages")
+            result = commands.run_sync(
+                ["apt-get", "-y", "-o", "APT::Status-Fd=1", "-o", "Dpkg::Use-Pty=0", "install", *pkgs],
+                timeout=1800,
+                component="Drivers",
+                env=env,
+                on_line=_apt_progress(job),
+            )
+            if result.ok:
+                write_log("Drivers", f"Installed {', '.join(pkgs)} successfully.")
+                installed.extend(pkgs)
             else:
-                write_log("Drivers", f"Failed to install {pkg}: {err or out}")
-
-    # --- AMD GPU ---
-    if info["amd_gpu"]["detected"]:
-        pkgs = info["amd_gpu"]["recommended_packages"]
-        write_log("Drivers", f"Installing AMD GPU packages: {', '.join(pkgs)}")
-        run_command("apt-get update")
-        for pkg in pkgs:
-            out, err, code = run_command(f"apt-get install -y {pkg}")
-            if code == 0:
-                write_log("Drivers", f"Installed {pkg} successfully.")
-                installed.append(pkg)
+                write_log("Drivers", f"Failed to install {', '.join(pkgs)}: {result.stderr or result.stdout}")
+                failed.extend(pkgs)
+        elif plan["already_installed"]:
+            write_log("Drivers", f"GPU packages already installed: {', '.join(plan['already_installed'])}")
+
+        # --- Coral TPU ---
+        if plan["coral"]:
+            job.update(message="Running Coral installer")
+            ok = install_coral_drivers()
+            if ok:
+                installed.append("Coral TPU drivers (community installer)")
             else:
-                write_log("Drivers", f"Failed to install {pkg}: {err or out}")
+                write_log("Drivers", "Coral TPU installation failed or skipped.")
+                failed.append("Coral TPU drivers")
 
+    # Nothing to install counts as success, for the job and the caller alike.
+    ok = not failed
     if installed:
-        return {"ok": True, "installed": installed}
+        job.update(done=100)
+    elif ok and not plan["already_installed"]:
+        write_log("Drivers", "No compatible hardware detected.")
+    if ok:
+        job.finish(True, message=f"Installed: {', '.join(installed)}" if installed else "Nothing to install")
     else:
-        write_log("Drivers", "No compatible hardware detected or installation failed.")
-        return {"ok": False, "installed": []}
+        job.finish(False, error=f"Failed: {', '.join(failed)}")
+    return {
+        "ok": ok,
+        "installed": installed,
+        "failed": failed,
+        "already_installed": plan["already_installed"],
+        "job": job.id,
+    }
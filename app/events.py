@@ -0,0 +1,120 @@
+import asyncio
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from logger import write_log
+
+# Events queued per client before it is considered too slow and dropped
+# (it reconnects and catches up from the snapshot).
+CLIENT_QUEUE_SIZE = 256
+
+# Event types. Each is published as {"type", "seq", "ts", "data"}.
+BACKUP_FINISHED = "backup.finished"        # archive, ok, skipped, bytes, files, duration_seconds, error
+RESTORE_FINISHED = "restore.finished"      # archive, source (local|gdrive), ok, message
+UPLOAD_FINISHED = "upload.finished"        # archive, ok, bytes, error
+RESTART_REQUIRED = "restart.required"      # required
+UPDATE_CHECKED = "update.checked"          # ok, channel, remote_version, local_version, update_available
+JOB_PROGRESS = "job.progress"              # id, kind, state, done, total, percent, eta_seconds, message, error, details
+
+_OVERFLOW = object()
+
+
+class _Client:
+    __slots__ = ("loop", "queue", "overflowed")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.overflowed = False
+
+    def _put(self, event):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            # Make room so the reader wakes up and sees the overflow marker.
+            self.queue.get_nowait()
+            self.queue.put_nowait(_OVERFLOW)
+
+
+class EventBus:
+    """
+    In-process publish/subscribe. publish() may be called from any thread;
+    subscribers are asyncio consumers (WebSocket handlers). The latest event
+    of each type is kept for the snapshot sent to newly connected clients.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._last_seq = 0
+        self._latest: Dict[str, dict] = {}
+        self._clients: List[_Client] = []
+        self._snapshot_providers: Dict[str, Callable[[], Any]] = {}
+
+    def publish(self, event_type: str, **data) -> dict:
+        with self._lock:
+            seq = next(self._seq)
+            event = {"type": event_type, "seq": seq, "ts": round(time.time(), 3), "data": data}
+            self._last_seq = seq
+            self._latest[event_type] = event
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.loop.call_soon_threadsafe(client._put, event)
+            except RuntimeError:
+                # Loop closed; the handler's finally will unsubscribe it.
+                pass
+        return event
+
+    def add_snapshot_provider(self, name: str, func: Callable[[], Any]):
+        """Include func()'s current value under `name` in every snapshot."""
+        self._snapshot_providers[name] = func
+
+    def subscribe(self) -> _Client:
+        client = _Client(asyncio.get_running_loop())
+        with self._lock:
+            self._clients.append(client)
+        return client
+
+    def unsubscribe(self, client: _Client):
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+
+    def snapshot(self) -> dict:
+        """
+        Catch-up message for a new client: the latest event of each type and
+        the current value of each snapshot provider. Events with seq greater
+        than `seq` are delivered afterwards.
+        """
+        with self._lock:
+            seq = self._last_seq
+            latest = sorted(self._latest.values(), key=lambda e: e["seq"])
+        state = {}
+        for name, func in list(self._snapshot_providers.items()):
+            try:
+                state[name] = func()
+            except Exception as e:
+                write_log("Events", f"Snapshot provider '{name}' failed: {e}")
+        return {"type": "snapshot", "seq": seq, "ts": round(time.time(), 3), "events": latest, "state": state}
+
+    async def next_event(self, client: _Client) -> dict | None:
+        """Next event for the client, or None once it has fallen too far behind."""
+        event = await client.queue.get()
+        return None if event is _OVERFLOW else event
+
+    def client_count(self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+
+bus = EventBus()
+
+
+def publish(event_type: str, **data) -> dict:
+    return bus.publish(event_type, **data)
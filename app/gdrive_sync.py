@@ -1,26 +1,213 @@
 import os
+import random
+import threading
+import time
 from typing import Dict, Any, List
+from urllib.parse import urlparse, urlunparse
 
+import httplib2
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest, HttpRequest, MediaFileUpload, build_http
 
 from logger import write_log
-from config_manager import load_config
+from config_manager import load_config, subscribe
+from metrics import Counter, Gauge, Histogram, DURATION_BUCKETS, LAST_SUCCESS
+from tracing import span, current_span
+from events import publish, UPLOAD_FINISHED
 
 SCOPES = ["https://www.googleapis.com/auth/drive.file"]
 
+# Optional override for the Drive API root, e.g. http://127.0.0.1:8765 when
+# pointing the client at the offline fake server in bench/fake_drive.py.
+API_ENDPOINT_ENV = "GDRIVE_API_ENDPOINT"
+
+# httplib2 connections are not thread-safe, so each thread keeps its own
+# client. Bumping the generation makes every thread rebuild on next use.
+_service_local = threading.local()
+_service_generation = 0
+
+# Resumable transfers move this much per request; a failed chunk is retried
+# up to MAX_CHUNK_RETRIES times with exponential backoff.
+TRANSFER_CHUNK_SIZE = 8 * 1024 * 1024
+MAX_CHUNK_RETRIES = 5
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+API_LATENCY = Histogram(
+    "fbm_drive_api_request_duration_seconds",
+    "Drive API call latency by method.",
+    ["method", "outcome"],
+)
+TRANSFERS = Counter("fbm_drive_transfers_total", "Drive uploads/downloads by outcome.", ["direction", "outcome"])
+TRANSFER_BYTES = Counter("fbm_drive_transfer_bytes_total", "Bytes moved to/from Drive.", ["direction"])
+TRANSFER_DURATION = Histogram(
+    "fbm_drive_transfer_duration_seconds",
+    "Time taken by Drive uploads/downloads.",
+    ["direction"],
+    buckets=DURATION_BUCKETS,
+)
+TRANSFER_THROUGHPUT = Gauge(
+    "fbm_drive_last_transfer_bytes_per_second", "Throughput of the last Drive transfer.", ["direction"]
+)
+TRANSFER_RETRIES = Counter("fbm_drive_transfer_retries_total", "Retried Drive transfer chunks.", ["direction"])
+
 
 def _get_token_path() -> str:
     cfg = load_config()
     return cfg.get("GDRIVE_TOKEN_PATH", "/data/drive_token.json")
 
 
+def get_token_path() -> str:
+    return _get_token_path()
+
+
 def _is_enabled() -> bool:
     cfg = load_config()
     return bool(cfg.get("GDRIVE_ENABLED", False))
 
 
+def _get_api_endpoint() -> str | None:
+    endpoint = os.getenv(API_ENDPOINT_ENV, "").strip()
+    return endpoint.rstrip("/") or None
+
+
+class _EndpointHttp:
+    """
+    httplib2-compatible wrapper used when the API endpoint is overridden.
+
+    googleapiclient swaps only the host of media upload URLs, keeping https,
+    so requests for the overridden host are sent with the endpoint's scheme.
+    """
+
+    def __init__(self, http, endpoint: str):
+        self._http = http
+        parsed = urlparse(endpoint)
+        self._scheme = parsed.scheme
+        self._netloc = parsed.netloc
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        parsed = urlparse(uri)
+        if parsed.netloc == self._netloc and parsed.scheme != self._scheme:
+            uri = urlunparse(parsed._replace(scheme=self._scheme))
+        return self._http.request(
+            uri,
+            method=method,
+            body=body,
+            headers=headers,
+            redirections=redirections,
+            connection_type=connection_type,
+        )
+
+    def __getattr__(self, name):
+        return getattr(self._http, name)
+
+
+class _TimedHttpRequest(HttpRequest):
+    """HttpRequest that records API latency per method (e.g. drive.files.list)."""
+
+    def execute(self, http=None, num_retries=0):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = super().execute(http=http, num_retries=num_retries)
+            outcome = "ok"
+            return result
+        finally:
+            API_LATENCY.labels(self.methodId or "unknown", outcome).observe(time.perf_counter() - started)
+
+
+def next_chunk_with_retry(step, direction: str):
+    """
+    Call step() (a next_chunk() of a resumable upload or download), retrying
+    transient HTTP/network errors with exponential backoff and jitter.
+    """
+    attempt = 0
+    while True:
+        try:
+            return step()
+        except HttpError as e:
+            if int(e.resp.status) not in RETRYABLE_STATUSES or attempt >= MAX_CHUNK_RETRIES:
+                raise
+            error = e
+        except (OSError, httplib2.HttpLib2Error) as e:
+            if attempt >= MAX_CHUNK_RETRIES:
+                raise
+            error = e
+        attempt += 1
+        TRANSFER_RETRIES.labels(direction).inc()
+        current_span().add("retries", 1)
+        delay = min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+        write_log("Drive", f"{direction.capitalize()} chunk failed ({error}); retry {attempt}/{MAX_CHUNK_RETRIES} in {delay:.1f}s")
+        time.sleep(delay)
+
+
+def record_transfer(direction: str, nbytes: int, seconds: float, ok: bool):
+    TRANSFERS.labels(direction, "success" if ok else "failure").inc()
+    TRANSFER_DURATION.labels(direction).observe(seconds)
+    if ok:
+        TRANSFER_BYTES.labels(direction).inc(nbytes)
+        if seconds > 0:
+            TRANSFER_THROUGHPUT.labels(direction).set(nbytes / seconds)
+        LAST_SUCCESS.labels(direction).set(time.time())
+
+
+def get_credentials():
+    """
+    Load credentials from the token file. Returns None if it is missing.
+    """
+    token_path = _get_token_path()
+    if not os.path.exists(token_path):
+        return None
+    return Credentials.from_authorized_user_file(token_path, SCOPES)
+
+
+def build_drive_service(creds):
+    """
+    Build a Drive v3 client, honouring GDRIVE_API_ENDPOINT when set.
+    """
+    endpoint = _get_api_endpoint()
+    if not endpoint:
+        return build(
+            "drive", "v3", credentials=creds, cache_discovery=False, requestBuilder=_TimedHttpRequest
+        )
+
+    # build_http() keeps 308 (resumable upload "incomplete") from being followed as a redirect.
+    http = _EndpointHttp(AuthorizedHttp(creds, http=build_http()), endpoint)
+    return build(
+        "drive",
+        "v3",
+        http=http,
+        cache_discovery=False,
+        client_options={"api_endpoint": f"{endpoint}/drive/v3/"},
+        requestBuilder=_TimedHttpRequest,
+    )
+
+
+def new_batch_request(service, callback=None):
+    """
+    Create a batch request against the same endpoint as `service`.
+    """
+    endpoint = _get_api_endpoint()
+    if not endpoint:
+        return service.new_batch_http_request(callback=callback)
+    return BatchHttpRequest(callback=callback, batch_uri=f"{endpoint}/batch/drive/v3")
+
+
+def _reset_drive_service():
+    global _service_generation
+    _service_generation += 1
+
+
+def _on_token_path_change(changes):
+    write_log("Drive", "Token path changed; Drive client will be rebuilt.")
+    _reset_drive_service()
+
+
+subscribe(_on_token_path_change, keys=["GDRIVE_TOKEN_PATH"])
+
+
 def _get_drive_service():
     if not _is_enabled():
         raise RuntimeError("Google Drive sync is disabled in config.")
@@ -29,8 +216,13 @@ def _get_drive_service():
     if not os.path.exists(token_path):
         raise FileNotFoundError(f"Token file not found: {token_path}")
 
+    cached = getattr(_service_local, "entry", None)
+    if cached and cached[0] == _service_generation:
+        return cached[1]
+
     creds = Credentials.from_authorized_user_file(token_path, SCOPES)
-    service = build("drive", "v3", credentials=creds, cache_discovery=False)
+    service = build_drive_service(creds)
+    _service_local.entry = (_service_generation, service)
     return service
 
 
@@ -96,25 +288,34 @@ def upload_backup_to_drive(path: str) -> bool:
         return False
 
     filename = os.path.basename(path)
-    try:
-        service = _get_drive_service()
-        file_metadata = {"name": filename}
-        media = None
-        from googleapiclient.http import MediaFileUpload
-
-        media = MediaFileUpload(path, mimetype="application/gzip", resumable=True)
-        write_log("Drive", f"Uploading {filename} to Google Drive...")
-        created = (
-            service.files()
-            .create(body=file_metadata, media_body=media, fields="id")
-            .execute()
-        )
-        file_id = created.get("id")
-        write_log("Drive", f"Upload complete. File ID: {file_id}")
-        return True
-    except Exception as e:
-        write_log("Drive", f"Upload failed: {e}")
-        return False
+    size = os.path.getsize(path)
+    started = time.monotonic()
+    with span("upload_backup_to_drive", archive=filename, bytes=size) as run:
+        try:
+            with span("drive.connect"):
+                service = _get_drive_service()
+            file_metadata = {"name": filename}
+            media = MediaFileUpload(
+                path, mimetype="application/gzip", chunksize=TRANSFER_CHUNK_SIZE, resumable=True
+            )
+            write_log("Drive", f"Uploading {filename} to Google Drive...")
+            request = service.files().create(body=file_metadata, media_body=media, fields="id")
+            created = None
+            with span("drive.upload", bytes=size) as s:
+                while created is None:
+                    _, created = next_chunk_with_retry(request.next_chunk, "upload")
+                    s.add("chunks", 1)
+            record_transfer("upload", size, time.monotonic() - started, True)
+            file_id = created.get("id")
+            write_log("Drive", f"Upload complete. File ID: {file_id}")
+            publish(UPLOAD_FINISHED, archive=filename, ok=True, bytes=size, error=None)
+            return True
+        except Exception as e:
+            record_transfer("upload", 0, time.monotonic() - started, False)
+            run.fail(e)
+            write_log("Drive", f"Upload failed: {e}")
+            publish(UPLOAD_FINISHED, archive=filename, ok=False, bytes=0, error=str(e))
+            return False
 
 
 def save_token_json(token_json: str) -> bool:
@@ -126,6 +327,7 @@ def save_token_json(token_json: str) -> bool:
     try:
         with open(token_path, "w", encoding="utf-8") as f:
             f.write(token_json.strip())
+        _reset_drive_service()
         write_log("Drive", f"Token file written to {token_path}")
         return True
     except Exception as e:
@@ -0,0 +1,312 @@
+import glob
+import os
+import select
+import socket
+import threading
+import time
+from typing import Dict, List, NamedTuple
+
+from logger import write_log
+
+SYS_ROOT = "/sys"
+DEV_ROOT = "/dev"
+
+# Without netlink hotplug events (e.g. a container without the host's
+# network namespace) the buses are rescanned this often; with them, a full
+# rescan still runs now and then as a safety net.
+POLL_INTERVAL_SECONDS = 60
+RESCAN_INTERVAL_SECONDS = 900
+# Attributes of a just-added device can appear slightly after its uevent.
+SETTLE_SECONDS = 0.5
+
+NETLINK_KOBJECT_UEVENT = 15
+
+# (bus, vendor, device) of Coral Edge TPUs. The USB accelerator enumerates
+# as 1a6e:089a until its firmware is loaded, then as 18d1:9302.
+CORAL_IDS = {
+    ("pci", "1ac1", "089a"),
+    ("usb", "1a6e", "089a"),
+    ("usb", "18d1", "9302"),
+}
+# PCI vendor ID -> GPU vendor, for display-class (0x03) devices.
+GPU_VENDORS = {"8086": "intel", "10de": "nvidia", "1002": "amd"}
+PCI_CLASS_DISPLAY = 0x03
+
+# Device nodes worth reporting.
+DEV_PATTERNS = ("apex_*", "dri/renderD*", "nvidia[0-9]*")
+
+
+class Device(NamedTuple):
+    bus: str  # "pci" or "usb"
+    address: str  # sysfs name, e.g. 0000:01:00.0 or 2-1
+    vendor: str  # 4 hex digits, lowercase, no 0x
+    device: str
+    pci_class: int | None = None
+
+
+def _read_attr(path: str) -> str | None:
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _hex_id(value: str | None) -> str | None:
+    if not value:
+        return None
+    value = value.lower()
+    return value[2:] if value.startswith("0x") else value
+
+
+def _read_device(bus: str, path: str) -> Device | None:
+    name = os.path.basename(path)
+    if bus == "pci":
+        vendor = _hex_id(_read_attr(os.path.join(path, "vendor")))
+        device = _hex_id(_read_attr(os.path.join(path, "device")))
+        cls = _read_attr(os.path.join(path, "class"))
+        if not vendor or not device:
+            return None
+        try:
+            pci_class = int(cls, 16) if cls else None
+        except ValueError:
+            pci_class = None
+        return Device("pci", name, vendor, device, pci_class)
+    vendor = _hex_id(_read_attr(os.path.join(path, "idVendor")))
+    device = _hex_id(_read_attr(os.path.join(path, "idProduct")))
+    if not vendor or not device:
+        # Interfaces (2-1:1.0) and hubs' ports have no IDs of their own.
+        return None
+    return Device("usb", name, vendor, device)
+
+
+def _scan_bus(bus: str) -> Dict[str, Device]:
+    devices = {}
+    root = os.path.join(SYS_ROOT, "bus", bus, "devices")
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return devices
+    for name in names:
+        dev = _read_device(bus, os.path.join(root, name))
+        if dev:
+            devices[f"{bus}:{name}"] = dev
+    return devices
+
+
+def _scan_dev_nodes() -> List[str]:
+    nodes = []
+    for pattern in DEV_PATTERNS:
+        nodes.extend(glob.glob(os.path.join(DEV_ROOT, pattern)))
+    return sorted(nodes)
+
+
+def _parse_uevent(data: bytes) -> Dict[str, str] | None:
+    """Kernel uevent: "action@devpath\\0KEY=value\\0..." (udev's own "libudev" messages are skipped)."""
+    parts = data.split(b"\0")
+    if not parts or b"@" not in parts[0]:
+        return None
+    event = {}
+    for part in parts[1:]:
+        key, sep, value = part.partition(b"=")
+        if sep:
+            event[key.decode(errors="replace")] = value.decode(errors="replace")
+    return event if "ACTION" in event else None
+
+
+class HardwareInventory:
+    """
+    PCI/USB devices and accelerator device nodes, read from sysfs and /dev
+    and kept in memory. Hotplug uevents update it per device; lookups
+    never touch the filesystem or run commands.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devices: Dict[str, Device] = {}
+        self._dev_nodes: List[str] = []
+        self._scanned_at = None
+        self._source = None
+        self.version = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    # --- updates ---
+
+    def rescan(self):
+        devices = {**_scan_bus("pci"), **_scan_bus("usb")}
+        nodes = _scan_dev_nodes()
+        with self._lock:
+            changed = devices != self._devices or nodes != self._dev_nodes
+            self._devices, self._dev_nodes = devices, nodes
+            self._scanned_at = time.time()
+            if changed:
+                self.version += 1
+        if changed:
+            write_log("Hardware", f"Inventory: {self._describe()}")
+
+    def _ensure_scanned(self):
+        if self._scanned_at is None:
+            self.rescan()
+
+    def _apply_uevent(self, event: Dict[str, str]) -> bool:
+        """
+        Update from one uevent. Returns False when the device's attributes
+        could not be read yet and a rescan is needed.
+        """
+        subsystem = event.get("SUBSYSTEM")
+        action = event.get("ACTION")
+        changed = False
+        ok = True
+        if subsystem == "pci" or (subsystem == "usb" and event.get("DEVTYPE") == "usb_device"):
+            devpath = event.get("DEVPATH", "")
+            key = f"{subsystem}:{os.path.basename(devpath)}"
+            if action == "remove":
+                with self._lock:
+                    changed = self._devices.pop(key, None) is not None
+            elif action in ("add", "bind", "change"):
+                dev = _read_device(subsystem, os.path.join(SYS_ROOT, devpath.lstrip("/")))
+                if dev is None:
+                    ok = action != "add"
+                else:
+                    with self._lock:
+                        changed = self._devices.get(key) != dev
+                        self._devices[key] = dev
+        if "DEVNAME" in event:
+            nodes = _scan_dev_nodes()
+            with self._lock:
+                if nodes != self._dev_nodes:
+                    self._dev_nodes = nodes
+                    changed = True
+        if changed:
+            with self._lock:
+                self.version += 1
+            write_log("Hardware", f"Hotplug {action} {subsystem}: {self._describe()}")
+        return ok
+
+    # --- background thread ---
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="hardware", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _open_netlink(self) -> socket.socket | None:
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+            sock.bind((0, 1))  # group 1: kernel uevents
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024 * 1024)
+            return sock
+        except (OSError, AttributeError) as e:
+            write_log("Hardware", f"Hotplug events unavailable ({e}); rescanning every {POLL_INTERVAL_SECONDS}s.")
+            return None
+
+    def _run(self):
+        sock = self._open_netlink()
+        # Subscribe before the first scan so nothing plugged in between is missed.
+        self._source = "netlink" if sock else "polling"
+        self.rescan()
+        try:
+            if sock:
+                self._watch_netlink(sock)
+            else:
+                while not self._stop.wait(POLL_INTERVAL_SECONDS):
+                    self.rescan()
+        finally:
+            if sock:
+                sock.close()
+
+    def _watch_netlink(self, sock: socket.socket):
+        next_rescan = time.monotonic() + RESCAN_INTERVAL_SECONDS
+        settle_at = None
+        while not self._stop.is_set():
+            now = time.monotonic()
+            deadline = min(next_rescan, settle_at or next_rescan)
+            timeout = max(0.0, min(1.0, deadline - now))
+            try:
+                ready, _, _ = select.select([sock], [], [], timeout)
+            except OSError:
+                ready = []
+            if ready:
+                try:
+                    data = sock.recv(64 * 1024)
+                except BlockingIOError:
+                    data = b""
+                except OSError as e:
+                    # ENOBUFS: events were dropped; start over from sysfs.
+                    write_log("Hardware", f"Hotplug events lost ({e}); rescanning.")
+                    settle_at = time.monotonic()
+                    data = b""
+                event = _parse_uevent(data) if data else None
+                if event and not self._apply_uevent(event):
+                    settle_at = settle_at or time.monotonic() + SETTLE_SECONDS
+            now = time.monotonic()
+            if (settle_at and now >= settle_at) or now >= next_rescan:
+                self.rescan()
+                settle_at = None
+                next_rescan = now + RESCAN_INTERVAL_SECONDS
+
+    # --- reads (memory only) ---
+
+    def _describe(self) -> str:
+        s = self.summary()
+        gpus = ", ".join(f"{g['vendor']} {g['address']}" for g in s["gpus"]) or "none"
+        return f"coral={s['coral']['detected']}, gpus: {gpus}"
+
+    def devices(self) -> List[Device]:
+        self._ensure_scanned()
+        with self._lock:
+            return list(self._devices.values())
+
+    def dev_nodes(self) -> List[str]:
+        self._ensure_scanned()
+        with self._lock:
+            return list(self._dev_nodes)
+
+    def coral(self) -> dict:
+        devices, nodes = self.devices(), self.dev_nodes()
+        pci = [d.address for d in devices if (d.bus, d.vendor, d.device) in CORAL_IDS and d.bus == "pci"]
+        usb = [d.address for d in devices if (d.bus, d.vendor, d.device) in CORAL_IDS and d.bus == "usb"]
+        apex = [n for n in nodes if os.path.basename(n).startswith("apex_")]
+        # PCI/M.2 cards need the gasket/apex driver to get a /dev node; USB
+        # accelerators are used through libusb and need no kernel driver.
+        driver_loaded = bool(apex) or not pci
+        detected = bool(pci or usb or apex)
+        return {
+            "detected": detected,
+            "pci": pci,
+            "usb": usb,
+            "dev_nodes": apex,
+            "driver_loaded": driver_loaded,
+            # The one definition of a usable Coral, for every status report.
+            "ready": detected and driver_loaded,
+        }
+
+    def gpus(self) -> List[dict]:
+        return [
+            {"vendor": GPU_VENDORS[d.vendor], "address": d.address, "device_id": d.device}
+            for d in self.devices()
+            if d.bus == "pci" and d.vendor in GPU_VENDORS and d.pci_class is not None
+            and d.pci_class >> 16 == PCI_CLASS_DISPLAY
+        ]
+
+    def summary(self) -> dict:
+        self._ensure_scanned()
+        return {
+            "coral": self.coral(),
+            "gpus": sorted(self.gpus(), key=lambda g: g["address"]),
+            "dev_nodes": self.dev_nodes(),
+            "source": self._source or "on demand",
+            "scanned_at": self._scanned_at,
+            "version": self.version,
+        }
+
+
+inventory = HardwareInventory()
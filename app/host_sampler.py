@@ -0,0 +1,244 @@
+import os
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Dict
+
+import backup
+from config_manager import load_config
+from logger import write_log
+import tracing
+
+SAMPLE_INTERVAL_SECONDS = 30
+# 3 days at 30s = 8640 samples; 6 columns of 4 bytes and 2 of 8 -> ~340 KB.
+HISTORY_SAMPLES = 3 * 24 * 3600 // SAMPLE_INTERVAL_SECONDS
+MAX_EVENTS = 500
+MAX_POINTS = 2000
+
+# Sampled columns, stored as float32 except those in WIDE_FIELDS.
+FIELDS = (
+    "cpu_percent",
+    "load1",
+    "mem_used_percent",
+    "backups_free_bytes",
+    "frigate_free_bytes",
+    "disk_read_bytes_per_sec",
+    "disk_write_bytes_per_sec",
+)
+# Byte counts past 2**24 lose precision in float32 (a 4 TB disk would be
+# rounded to ~256 KB); float64 is exact up to 8 PiB and still holds NaN.
+WIDE_FIELDS = ("backups_free_bytes", "frigate_free_bytes")
+
+# Runs (root span names) shown as events on the charts.
+EVENT_RUNS = {"run_backup", "restore_backup", "restore_from_drive", "upload_backup_to_drive"}
+
+# Virtual block devices whose I/O is already counted on the disks below them.
+_SKIP_DEVICE_PREFIXES = ("loop", "ram", "zram", "dm-", "md", "sr", "nbd")
+_SECTOR_BYTES = 512
+
+
+class RingSeries:
+    """
+    Fixed-capacity time series: one uint32 timestamp array plus one float32
+    (float64 for `wide` fields) array per field, written round-robin.
+    Nothing is allocated per sample.
+    """
+
+    def __init__(self, fields, capacity: int, wide=()):
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self.times = array("I", bytes(4 * capacity))
+        self.columns = {f: array("d" if f in wide else "f", [0.0]) * capacity for f in self.fields}
+        self.head = 0  # next slot to write
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def append(self, ts: float, values: Dict[str, float]):
+        with self._lock:
+            i = self.head
+            self.times[i] = int(ts)
+            for f in self.fields:
+                v = values.get(f)
+                self.columns[f][i] = float("nan") if v is None else v
+            self.head = (i + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def _indexes(self):
+        start = (self.head - self.count) % self.capacity
+        for k in range(self.count):
+            yield (start + k) % self.capacity
+
+    def downsample(self, since: float, until: float, points: int) -> dict:
+        """
+        Average samples into `points` equal-width buckets between since and
+        until. Buckets without samples are null.
+        """
+        points = max(1, points)
+        width = max(1e-9, (until - since) / points)
+        sums = {f: [0.0] * points for f in self.fields}
+        counts = {f: [0] * points for f in self.fields}
+        with self._lock:
+            for i in self._indexes():
+                t = self.times[i]
+                if t < since or t >= until:
+                    continue
+                b = min(points - 1, int((t - since) / width))
+                for f in self.fields:
+                    v = self.columns[f][i]
+                    if v == v:  # skip NaN (probe unavailable)
+                        sums[f][b] += v
+                        counts[f][b] += 1
+        series = {
+            f: [round(s / c, 3) if c else None for s, c in zip(sums[f], counts[f])]
+            for f in self.fields
+        }
+        return {
+            "t": [int(since + width * (b + 0.5)) for b in range(points)],
+            "bucket_seconds": round(width, 3),
+            "series": series,
+        }
+
+    def nbytes(self) -> int:
+        return self.times.itemsize * self.capacity + sum(c.itemsize * self.capacity for c in self.columns.values())
+
+
+# ---- probes ----
+
+
+def _read_cpu_times():
+    with open("/proc/stat", "r") as f:
+        parts = f.readline().split()[1:]
+    values = [int(v) for v in parts]
+    idle = values[3] + (values[4] if len(values) > 4 else 0)  # idle + iowait
+    return sum(values), idle
+
+
+def _read_mem_used_percent():
+    info = {}
+    with open("/proc/meminfo", "r") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("MemTotal", "MemAvailable"):
+                info[key] = int(rest.split()[0])
+    total = info.get("MemTotal")
+    if not total or "MemAvailable" not in info:
+        return None
+    return 100.0 * (total - info["MemAvailable"]) / total
+
+
+def _read_disk_sectors():
+    read = written = 0
+    with open("/proc/diskstats", "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 10:
+                continue
+            name = parts[2]
+            if name.startswith(_SKIP_DEVICE_PREFIXES):
+                continue
+            # Whole disks only: partitions have a "partition" file in sysfs.
+            if os.path.exists(f"/sys/class/block/{name}/partition"):
+                continue
+            read += int(parts[5])
+            written += int(parts[9])
+    return read * _SECTOR_BYTES, written * _SECTOR_BYTES
+
+
+def _free_bytes(path: str):
+    try:
+        st = os.statvfs(path)
+    except OSError:
+        return None
+    return st.f_bavail * st.f_frsize
+
+
+class HostSampler:
+    """Samples host resources every SAMPLE_INTERVAL_SECONDS into a RingSeries."""
+
+    def __init__(self):
+        self.samples = RingSeries(FIELDS, HISTORY_SAMPLES, wide=WIDE_FIELDS)
+        self.events = deque(maxlen=MAX_EVENTS)
+        self._thread = None
+        self._stop = threading.Event()
+        self._prev_cpu = None
+        self._prev_disk = None
+        tracing.add_run_listener(self._on_run)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="host-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _on_run(self, run: "tracing.Span"):
+        if run.name in EVENT_RUNS:
+            self.events.append(
+                (run.name, run.start_ns / 1e9, run.end_ns / 1e9, run.status, run.attributes.get("archive"))
+            )
+
+    def sample(self) -> Dict[str, float]:
+        now = time.monotonic()
+        values = {}
+        try:
+            total, idle = _read_cpu_times()
+            if self._prev_cpu:
+                d_total = total - self._prev_cpu[0]
+                d_idle = idle - self._prev_cpu[1]
+                if d_total > 0:
+                    values["cpu_percent"] = 100.0 * (d_total - d_idle) / d_total
+            self._prev_cpu = (total, idle)
+        except (OSError, ValueError, IndexError):
+            pass
+        try:
+            values["load1"] = os.getloadavg()[0]
+        except OSError:
+            pass
+        try:
+            values["mem_used_percent"] = _read_mem_used_percent()
+        except (OSError, ValueError):
+            pass
+        values["backups_free_bytes"] = _free_bytes(backup.BACKUP_DIR)
+        values["frigate_free_bytes"] = _free_bytes(load_config().get("FRIGATE_STORAGE_PATH") or "/media/frigate")
+        try:
+            read, written = _read_disk_sectors()
+            if self._prev_disk:
+                elapsed = now - self._prev_disk[0]
+                if elapsed > 0:
+                    values["disk_read_bytes_per_sec"] = max(0, read - self._prev_disk[1]) / elapsed
+                    values["disk_write_bytes_per_sec"] = max(0, written - self._prev_disk[2]) / elapsed
+            self._prev_disk = (now, read, written)
+        except (OSError, ValueError):
+            pass
+        return values
+
+    def _run(self):
+        # Prime the delta-based probes so the first stored sample has rates.
+        self.sample()
+        while not self._stop.wait(SAMPLE_INTERVAL_SECONDS):
+            try:
+                self.samples.append(time.time(), self.sample())
+            except Exception as e:
+                write_log("Sampler", f"Host sample failed: {e}")
+
+    def history(self, seconds: float, points: int) -> dict:
+        until = time.time()
+        since = until - seconds
+        out = self.samples.downsample(since, until, min(points, MAX_POINTS))
+        out["fields"] = list(FIELDS)
+        out["interval_seconds"] = SAMPLE_INTERVAL_SECONDS
+        out["events"] = [
+            {"type": name, "start": round(start, 3), "end": round(end, 3), "status": status, "archive": archive}
+            for name, start, end, status, archive in list(self.events)
+            if end >= since
+        ]
+        return out
+
+
+sampler = HostSampler()
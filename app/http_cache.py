@@ -0,0 +1,64 @@
+import asyncio
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Hashable
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+_UNSET = object()
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    """If-None-Match check using weak comparison (W/ prefixes ignored)."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+class CachedJSON:
+    """
+    Serialized JSON body of one endpoint, rebuilt only when its version key
+    changes. The ETag is a hash of the body, so a rebuild that produces the
+    same content still answers If-None-Match with 304.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (key, etag, body), replaced as a whole so readers need no lock.
+        self._entry = (_UNSET, "", b"")
+
+    def _get(self, key: Hashable, build: Callable[[], Any]):
+        # One rebuild at a time; concurrent pollers wait and reuse it.
+        with self._lock:
+            if key != self._entry[0]:
+                body = json.dumps(
+                    build(), ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=str
+                ).encode("utf-8")
+                etag = 'W/"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+                self._entry = (key, etag, body)
+            return self._entry
+
+    async def respond(self, request: Request, key: Hashable, build: Callable[[], Any]) -> Response:
+        """
+        200 with the cached body, or 304 when If-None-Match already names it.
+        build() runs in a worker thread, and only when key has changed.
+        """
+        entry = self._entry
+        if entry[0] != key:
+            entry = await asyncio.to_thread(self._get, key, build)
+        _, etag, body = entry
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,112 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+from typing import List, NamedTuple
+
+# Event masks from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+_libc = None
+
+
+class InotifyEvent(NamedTuple):
+    wd: int
+    mask: int
+    cookie: int
+    name: str
+
+
+def _get_libc():
+    global _libc
+    if _libc is None:
+        name = ctypes.util.find_library("c") or "libc.so.6"
+        lib = ctypes.CDLL(name, use_errno=True)
+        lib.inotify_init1.argtypes = [ctypes.c_int]
+        lib.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        lib.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        _libc = lib
+    return _libc
+
+
+class Inotify:
+    """
+    Minimal ctypes wrapper around Linux inotify.
+
+    Raises OSError on construction when inotify is unavailable, so callers
+    can fall back to polling.
+    """
+
+    def __init__(self):
+        try:
+            libc = _get_libc()
+        except (OSError, AttributeError) as e:
+            raise OSError(f"inotify unavailable: {e}")
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+        self._libc = libc
+        self.fd = fd
+        self.watches = {}
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch({path}) failed: {os.strerror(err)}")
+        self.watches[wd] = path
+        return wd
+
+    def rm_watch(self, wd: int):
+        self.watches.pop(wd, None)
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self, timeout: float | None = None) -> List[InotifyEvent]:
+        """
+        Wait up to `timeout` seconds and return any pending events.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            raw_name = data[offset:offset + length]
+            offset += length
+            name = os.fsdecode(raw_name.rstrip(b"\0"))
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+            events.append(InotifyEvent(wd, mask, cookie, name))
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+            self.watches.clear()
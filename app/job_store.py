@@ -0,0 +1,193 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import List
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+
+from logger import write_log
+
+SCHEDULER_DB_PATH = "/data/scheduler.db"
+# Run-history rows kept per job; older ones are deleted as new runs finish.
+MAX_HISTORY_PER_JOB = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    next_run_time REAL,
+    job_state BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_next_run_time ON jobs (next_run_time);
+CREATE TABLE IF NOT EXISTS job_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    outcome TEXT NOT NULL,
+    duration REAL NOT NULL,
+    bytes INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS job_runs_job_started ON job_runs (job, started_at);
+"""
+
+
+class SQLiteJobStore(BaseJobStore):
+    """
+    APScheduler job store on the standard library's sqlite3, so schedules
+    and next run times survive a container restart. The same database holds
+    the job_runs history table.
+    """
+
+    def __init__(self, path: str = SCHEDULER_DB_PATH, pickle_protocol: int = pickle.HIGHEST_PROTOCOL):
+        super().__init__()
+        self.path = path
+        self.pickle_protocol = pickle_protocol
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        # Opened lazily: jobs and history are touched from several threads.
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._db().execute(sql, params)
+
+    def _query(self, sql: str, params=()) -> list:
+        with self._lock:
+            return self._db().execute(sql, params).fetchall()
+
+    # ---- BaseJobStore ----
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        with self._lock:
+            self._db()
+
+    def shutdown(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def lookup_job(self, job_id):
+        rows = self._query("SELECT job_state FROM jobs WHERE id = ?", (job_id,))
+        return self._reconstitute_job(rows[0][0]) if rows else None
+
+    def get_due_jobs(self, now):
+        return self._get_jobs("WHERE next_run_time <= ?", (datetime_to_utc_timestamp(now),))
+
+    def get_next_run_time(self):
+        rows = self._query(
+            "SELECT next_run_time FROM jobs WHERE next_run_time IS NOT NULL ORDER BY next_run_time LIMIT 1"
+        )
+        return utc_timestamp_to_datetime(rows[0][0]) if rows else None
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        try:
+            self._execute(
+                "INSERT INTO jobs (id, next_run_time, job_state) VALUES (?, ?, ?)",
+                (job.id, datetime_to_utc_timestamp(job.next_run_time), self._dump(job)),
+            )
+        except sqlite3.IntegrityError:
+            raise ConflictingIdError(job.id)
+
+    def update_job(self, job):
+        cur = self._execute(
+            "UPDATE jobs SET next_run_time = ?, job_state = ? WHERE id = ?",
+            (datetime_to_utc_timestamp(job.next_run_time), self._dump(job), job.id),
+        )
+        if cur.rowcount == 0:
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        cur = self._execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        if cur.rowcount == 0:
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        self._execute("DELETE FROM jobs")
+
+    def _dump(self, job) -> bytes:
+        return pickle.dumps(job.__getstate__(), self.pickle_protocol)
+
+    def _reconstitute_job(self, job_state: bytes) -> Job:
+        state = pickle.loads(job_state)
+        state["jobstore"] = self
+        job = Job.__new__(Job)
+        job.__setstate__(state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _get_jobs(self, where: str = "", params=()) -> List[Job]:
+        jobs, failed = [], []
+        for job_id, state in self._query(f"SELECT id, job_state FROM jobs {where} ORDER BY next_run_time", params):
+            try:
+                jobs.append(self._reconstitute_job(state))
+            except Exception as e:
+                write_log("Scheduler", f"Unable to restore job '{job_id}', removing it: {e}")
+                failed.append(job_id)
+        for job_id in failed:
+            self._execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return jobs
+
+    # ---- run history ----
+
+    def record_run(self, job: str, started_at: float, finished_at: float, outcome: str, nbytes: int | None = None, error: str | None = None):
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT INTO job_runs (job, started_at, finished_at, outcome, duration, bytes, error) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job, started_at, finished_at, outcome, round(finished_at - started_at, 3), nbytes, error),
+            )
+            db.execute(
+                "DELETE FROM job_runs WHERE job = ? AND id <= "
+                "(SELECT id FROM job_runs WHERE job = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (job, job, MAX_HISTORY_PER_JOB),
+            )
+
+    def run_history(self, job: str | None = None, limit: int = 100, since: float | None = None) -> List[dict]:
+        """Finished runs, newest first."""
+        clauses, params = [], []
+        if job:
+            clauses.append("job = ?")
+            params.append(job)
+        if since is not None:
+            clauses.append("started_at >= ?")
+            params.append(since)
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        rows = self._query(
+            f"SELECT job, started_at, finished_at, outcome, duration, bytes, error FROM job_runs {where} "
+            "ORDER BY started_at DESC LIMIT ?",
+            (*params, limit),
+        )
+        return [
+            {
+                "job": job_name,
+                "started_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(started)),
+                "started_ts": started,
+                "finished_ts": finished,
+                "outcome": outcome,
+                "duration_seconds": duration,
+                "bytes": nbytes,
+                "error": error,
+            }
+            for job_name, started, finished, outcome, duration, nbytes, error in rows
+        ]
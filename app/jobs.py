@@ -0,0 +1,150 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List
+
+from events import publish, JOB_PROGRESS
+
+# Finished jobs kept for the API, and output lines kept per job.
+MAX_JOBS = 50
+MAX_LINES = 500
+# job.progress events are published at most this often per job (plus
+# always on start and finish).
+PUBLISH_INTERVAL_SECONDS = 1.0
+
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class Job:
+    """
+    Progress of one long-running operation (backup, download, install).
+    Updated from the worker thread; readable from the API at any time.
+    """
+
+    def __init__(self, registry: "JobRegistry", job_id: str, kind: str, details: dict):
+        self._registry = registry
+        self._lock = threading.Lock()
+        self.id = job_id
+        self.kind = kind
+        self.state = RUNNING
+        self.started = time.time()
+        self.finished = None
+        self.done = 0
+        self.total = None
+        self.unit = "bytes"
+        self.eta_seconds = None
+        self.message = ""
+        self.error = None
+        self.details = dict(details)
+        self.lines = deque(maxlen=MAX_LINES)
+        self._started_mono = time.monotonic()
+        self._published = 0.0
+
+    def update(
+        self,
+        done: int | None = None,
+        total: int | None = None,
+        message: str | None = None,
+        eta_seconds: float | None = None,
+        **details,
+    ):
+        """
+        Record progress. Without an explicit eta_seconds, the ETA is
+        extrapolated from the rate so far once some work is done.
+        """
+        with self._lock:
+            if done is not None:
+                self.done = done
+            if total is not None:
+                self.total = total
+            if message is not None:
+                self.message = message
+            self.details.update(details)
+            if eta_seconds is not None:
+                self.eta_seconds = eta_seconds
+            elif done is not None and self.total and self.done:
+                elapsed = time.monotonic() - self._started_mono
+                self.eta_seconds = max(0.0, elapsed * (self.total - self.done) / self.done)
+        self._publish()
+
+    def log(self, line: str):
+        """Append a line of output (e.g. a command's progress lines)."""
+        with self._lock:
+            self.lines.append(line)
+
+    def finish(self, ok: bool, message: str | None = None, error: str | None = None):
+        with self._lock:
+            self.state = SUCCEEDED if ok else FAILED
+            self.finished = time.time()
+            self.eta_seconds = 0.0 if ok else None
+            if message is not None:
+                self.message = message
+            self.error = error
+        self._publish(force=True)
+
+    def to_dict(self, lines: bool = False) -> dict:
+        with self._lock:
+            out = {
+                "id": self.id,
+                "kind": self.kind,
+                "state": self.state,
+                "started": round(self.started, 3),
+                "finished": round(self.finished, 3) if self.finished else None,
+                "done": self.done,
+                "total": self.total,
+                "unit": self.unit,
+                "percent": round(min(100.0, self.done * 100.0 / self.total), 1) if self.total else None,
+                "eta_seconds": round(self.eta_seconds, 1) if self.eta_seconds is not None else None,
+                "message": self.message,
+                "error": self.error,
+                "details": dict(self.details),
+            }
+            if lines:
+                out["lines"] = list(self.lines)
+            return out
+
+    def _publish(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._published < PUBLISH_INTERVAL_SECONDS:
+            return
+        self._published = now
+        publish(JOB_PROGRESS, **self.to_dict())
+
+
+class JobRegistry:
+    """Running and recently finished jobs, oldest first."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    def start(self, kind: str, unit: str = "bytes", **details) -> Job:
+        with self._lock:
+            job = Job(self, f"{kind}-{next(self._ids)}", kind, details)
+            job.unit = unit
+            self._jobs[job.id] = job
+            finished = [j for j in self._jobs.values() if j.state != RUNNING]
+            for old in finished[: max(0, len(finished) - MAX_JOBS)]:
+                del self._jobs[old.id]
+        job._publish(force=True)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, kind: str | None = None) -> List[Dict]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [j.to_dict() for j in reversed(jobs) if kind is None or j.kind == kind]
+
+
+registry = JobRegistry()
+
+
+def start_job(kind: str, unit: str = "bytes", **details) -> Job:
+    return registry.start(kind, unit, **details)
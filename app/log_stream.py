@@ -0,0 +1,198 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Iterable
+
+import logger
+from inotify import (
+    Inotify,
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_MODIFY,
+    IN_MOVED_FROM,
+    IN_MOVED_TO,
+)
+
+# Fallback poll interval, also used as the inotify wait timeout so a missed
+# event delays delivery by at most this long.
+POLL_INTERVAL_SECONDS = 0.5
+# Batches buffered per client before it is considered too slow.
+SUBSCRIBER_QUEUE_SIZE = 256
+
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_CREATE | IN_MOVED_FROM | IN_MOVED_TO
+
+
+def line_component(line: str) -> str | None:
+    rec = logger.parse_log_line(line)
+    return rec["component"] if rec else None
+
+
+class Subscription:
+    """
+    One connected viewer. Lines arrive as lists on `queue`; `overflowed` is
+    set if the client fell behind and lines were dropped.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, components: Iterable[str] | None):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.components = {c.lower() for c in components} if components else None
+        self.overflowed = False
+
+    def wants(self, line: str) -> bool:
+        if self.components is None:
+            return True
+        comp = line_component(line)
+        return comp is not None and comp.lower() in self.components
+
+    def _put(self, lines):
+        try:
+            self.queue.put_nowait(lines)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def deliver(self, lines):
+        wanted = [line for line in lines if self.wants(line)]
+        if wanted:
+            self.loop.call_soon_threadsafe(self._put, wanted)
+
+
+class LogFollower:
+    """
+    Follows manager.log with a single watcher thread shared by all viewers.
+
+    The thread keeps the file open and reads only appended bytes. When the
+    writer rotates the log (manager.log renamed to manager.log.<seq>), the
+    remainder of the old file is read through the still-open handle before
+    switching to the new file, so no lines are lost across rotation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+        self._file = None
+        self._inode = None
+        self._partial = b""
+
+    def subscribe(self, components: Iterable[str] | None = None) -> Subscription:
+        sub = Subscription(asyncio.get_running_loop(), components)
+        with self._lock:
+            self._subscribers.add(sub)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-follower", daemon=True)
+                self._thread.start()
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        # The watcher thread notices the empty set and exits on its own.
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def stop(self):
+        with self._lock:
+            self._subscribers.clear()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    # ---- watcher thread ----
+
+    def _open_current(self, seek_end: bool):
+        self._close()
+        try:
+            f = open(logger.LOG_FILE, "rb")
+        except OSError:
+            return
+        st = os.fstat(f.fileno())
+        if seek_end:
+            f.seek(0, os.SEEK_END)
+        self._file = f
+        self._inode = st.st_ino
+        self._partial = b""
+
+    def _close(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+        self._file = None
+        self._inode = None
+
+    def _read_new(self):
+        if self._file is None:
+            return []
+        data = self._file.read()
+        if not data:
+            return []
+        data = self._partial + data
+        parts = data.split(b"\n")
+        self._partial = parts.pop()
+        return [p.decode("utf-8", errors="replace") for p in parts]
+
+    def _check(self):
+        lines = self._read_new()
+        try:
+            st = os.stat(logger.LOG_FILE)
+        except OSError:
+            st = None
+
+        rotated = st is not None and (self._inode != st.st_ino or st.st_size < (self._file.tell() if self._file else 0))
+        if rotated or self._file is None:
+            # Drain whatever the old handle still has, then follow the new file from its start.
+            lines += self._read_new()
+            if self._partial:
+                lines.append(self._partial.decode("utf-8", errors="replace"))
+            if st is not None:
+                self._open_current(seek_end=False)
+                lines += self._read_new()
+
+        if lines:
+            with self._lock:
+                subs = list(self._subscribers)
+            for sub in subs:
+                sub.deliver(lines)
+
+    def _run(self):
+        logger.flush_logs()
+        self._open_current(seek_end=True)
+        notifier = None
+        try:
+            os.makedirs(logger.LOG_DIR, exist_ok=True)
+            notifier = Inotify()
+            notifier.add_watch(logger.LOG_DIR, _WATCH_MASK)
+        except OSError:
+            if notifier:
+                notifier.close()
+            notifier = None
+
+        try:
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        self._release(notifier)
+                        return
+                if notifier:
+                    notifier.read_events(timeout=POLL_INTERVAL_SECONDS)
+                else:
+                    time.sleep(POLL_INTERVAL_SECONDS)
+                self._check()
+        except BaseException:
+            with self._lock:
+                self._release(notifier)
+            raise
+
+    def _release(self, notifier):
+        # Called with the lock held: the file and notifier are closed before
+        # _thread is cleared, so a thread started by the next subscribe()
+        # never has its handle closed under it.
+        if notifier:
+            notifier.close()
+        self._close()
+        self._thread = None
+
+
+follower = LogFollower()
@@ -1,92 +1,936 @@
+import atexit
+import gzip
+import json
 import os
+import queue
+import re
+import sys
+import threading
+from collections import deque
 from datetime import datetime
 
 LOG_DIR = "/logs"
 LOG_FILE = os.path.join(LOG_DIR, "manager.log")
 MAX_SIZE_BYTES = 512 * 1024  # 512 KB
-MAX_BACKUPS = 5
+
+# Rotated segments are named by a sequence number that only grows
+# (manager.log.<seq>, the newest has the highest), so a rotation renames one
+# file instead of shifting every kept one. They are gzipped in the background
+# (manager.log.<seq>.gz) and kept until they add up to LOG_RETENTION_BYTES on
+# disk. MAX_BACKUPS only bounds the number of files.
+LOG_RETENTION_BYTES = int(os.getenv("LOG_RETENTION_BYTES", str(32 * 1024 * 1024)))
+MAX_BACKUPS = 1000
+COMPRESSED_SUFFIX = ".gz"
+
+# "text" -> [ts] [component] message
+# "json" -> {"ts": ..., "component": ..., "level": ..., "msg": ..., "fields": {...}}
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").strip().lower()
+
+# Every segment gets a sidecar index (manager.log.idx, manager.log.<seq>.idx, ...)
+# with one JSON line per ~INDEX_BLOCK_BYTES of log: byte range, time span and
+# components seen. Queries use it to seek straight to candidate blocks.
+INDEX_SUFFIX = ".idx"
+INDEX_BLOCK_BYTES = 16 * 1024
+
+# The writer thread takes whatever is queued (up to BATCH_MAX_LINES), writes
+# it and flushes once per batch; bursts therefore coalesce into few syscalls.
+BATCH_MAX_LINES = 512
+
+# Log reads work backwards/forwards in blocks of this size, so memory use
+# follows the requested page, not the file.
+READ_BLOCK_SIZE = 64 * 1024
+MAX_PAGE_LINES = 2000
+
+_STOP = object()
+
+_TEXT_LINE_RE = re.compile(r"^\[([^\]]*)\] \[([^\]]*)\] ?(.*)$")
 
 
 def _ensure_log_dir():
     os.makedirs(LOG_DIR, exist_ok=True)
 
 
-def _rotate_if_needed():
-    _ensure_log_dir()
-    if not os.path.exists(LOG_FILE):
-        return
-
-    size = os.path.getsize(LOG_FILE)
-    if size < MAX_SIZE_BYTES:
-        return
-
-    # Rotate: manager.log -> manager.log.1 -> manager.log.2 ...
-    for i in range(MAX_BACKUPS, 0, -1):
-        src = f"{LOG_FILE}.{i}"
-        dst = f"{LOG_FILE}.{i+1}"
-        if os.path.exists(src):
-            if i == MAX_BACKUPS:
-                os.remove(src)
-            else:
-                os.rename(src, dst)
+_SEGMENT_SUFFIXES = ("", COMPRESSED_SUFFIX, INDEX_SUFFIX)
+
+# Held while segments are renamed, removed, or swapped for their .gz.
+_segments_lock = threading.Lock()
+# Bumped whenever the set of rotated segments changes (see segments_version()).
+_segments_version = 0
+
+
+def _rename_segment(src: str, dst: str):
+    for suffix in _SEGMENT_SUFFIXES:
+        if os.path.exists(src + suffix):
+            os.rename(src + suffix, dst + suffix)
+        elif os.path.exists(dst + suffix):
+            # Stale leftover at the destination (e.g. orphaned index).
+            os.remove(dst + suffix)
+
+
+def _remove_segment(path: str):
+    for suffix in _SEGMENT_SUFFIXES:
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def _segments_changed():
+    global _segments_version
+    _segments_version += 1
+
+
+def log_files_version():
+    """
+    Changes whenever list_log_files() could: a rotation, compression or
+    retention pass, or a write to manager.log.
+    """
+    try:
+        st = os.stat(LOG_FILE)
+        current = (st.st_size, st.st_mtime_ns)
+    except OSError:
+        current = None
+    return _segments_version, current
+
+
+def _rotated_sequences():
+    """Sorted sequence numbers N for which manager.log.N or manager.log.N.gz exists."""
+    prefix = os.path.basename(LOG_FILE) + "."
+    found = set()
+    try:
+        names = os.listdir(LOG_DIR)
+    except OSError:
+        return []
+    for name in names:
+        if not name.startswith(prefix):
+            continue
+        rest = name[len(prefix):]
+        if rest.endswith(COMPRESSED_SUFFIX):
+            rest = rest[: -len(COMPRESSED_SUFFIX)]
+        if rest.isdigit() and int(rest) > 0:
+            found.add(int(rest))
+    return sorted(found)
+
+
+def _rotated_segments():
+    """
+    (index, path) of every rotated segment, newest first. Index 1 is the
+    newest rotated segment, as the API numbers files; the path carries its
+    sequence number.
+    """
+    seqs = _rotated_sequences()
+    return [(i, f"{LOG_FILE}.{seq}") for i, seq in enumerate(reversed(seqs), 1)]
+
+
+def _segment_mtime(seq: int) -> int:
+    for suffix in ("", COMPRESSED_SUFFIX):
+        try:
+            return os.stat(f"{LOG_FILE}.{seq}{suffix}").st_mtime_ns
+        except OSError:
+            continue
+    return 0
+
+
+def _renumber_segments():
+    """
+    Number rotated segments oldest first by their last write. Segments left
+    by the old scheme (manager.log.1 newest) are otherwise read in reverse,
+    and retention would drop their newest first. A no-op once in order.
+    """
+    with _segments_lock:
+        seqs = _rotated_sequences()
+        by_age = sorted(seqs, key=lambda seq: (_segment_mtime(seq), seq))
+        if by_age == seqs:
+            return
+        # Two passes, so no new name collides with a segment not yet moved.
+        for i, seq in enumerate(by_age, 1):
+            _rename_segment(f"{LOG_FILE}.{seq}", f"{LOG_FILE}.renumber.{i}")
+        for i in range(1, len(by_age) + 1):
+            _rename_segment(f"{LOG_FILE}.renumber.{i}", f"{LOG_FILE}.{i}")
+        _segments_changed()
+
+
+def _rotate():
+    # Rotate: manager.log -> manager.log.<last seq + 1>; older segments keep
+    # their names. The index sidecar travels with the segment.
+    with _segments_lock:
+        seqs = _rotated_sequences()
+        if os.path.exists(LOG_FILE):
+            _rename_segment(LOG_FILE, f"{LOG_FILE}.{(seqs[-1] if seqs else 0) + 1}")
+            seqs.append(None)
+        elif os.path.exists(LOG_FILE + INDEX_SUFFIX):
+            os.remove(LOG_FILE + INDEX_SUFFIX)
+        for seq in seqs[: max(0, len(seqs) - MAX_BACKUPS)]:
+            _remove_segment(f"{LOG_FILE}.{seq}")
+        _segments_changed()
+    _compressor.schedule()
+
+
+def _compress_segment(path: str) -> bool:
+    """
+    Gzip one rotated segment. The copy is made without the lock; the segment
+    is then swapped for its .gz unless it was pruned (or replaced) meanwhile.
+    """
+    tmp = f"{LOG_FILE}.compress.tmp"
+    try:
+        with open(path, "rb") as src:
+            st = os.fstat(src.fileno())
+            with gzip.open(tmp, "wb", compresslevel=6) as dst:
+                while True:
+                    chunk = src.read(READ_BLOCK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+    except OSError as e:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        if os.path.exists(path):
+            print(f"[Logger] Failed to compress {path}: {e}", file=sys.stderr)
+        return False
+
+    with _segments_lock:
+        try:
+            current = os.stat(path).st_ino == st.st_ino
+        except OSError:
+            current = False
+        if current:
+            os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+            os.replace(tmp, path + COMPRESSED_SUFFIX)
+            os.remove(path)
+            _segments_changed()
+            return True
+    # Segment was pruned while we compressed it.
+    os.remove(tmp)
+    return False
+
+
+def _segment_disk_size(path: str) -> int:
+    total = 0
+    for suffix in _SEGMENT_SUFFIXES:
+        try:
+            total += os.path.getsize(path + suffix)
+        except OSError:
+            pass
+    return total
+
+
+def _apply_retention():
+    """Drop the oldest rotated segments beyond LOG_RETENTION_BYTES (always keeps the newest)."""
+    with _segments_lock:
+        total = 0
+        for i, path in _rotated_segments():
+            total += _segment_disk_size(path)
+            if i > 1 and total > LOG_RETENTION_BYTES:
+                _remove_segment(path)
+                _segments_changed()
+
+
+class _Compressor:
+    """Background thread that gzips rotated segments and enforces retention."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stopped = False
+
+    def schedule(self):
+        with self._lock:
+            if self._stopped:
+                return
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-compressor", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+        self._wake.set()
+        if thread and thread.is_alive():
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stopped:
+                return
+            try:
+                for _, path in _rotated_segments():
+                    if self._stopped:
+                        return
+                    if os.path.exists(path):
+                        _compress_segment(path)
+                _apply_retention()
+            except Exception as e:
+                print(f"[Logger] Log compression failed: {e}", file=sys.stderr)
+
+
+_compressor = _Compressor()
+
+
+def format_record(ts: datetime, component: str, message: str, level: str = "INFO", fields: dict | None = None) -> str:
+    if LOG_FORMAT == "json":
+        record = {
+            "ts": ts.isoformat(timespec="seconds"),
+            "component": component,
+            "level": level,
+            "msg": message,
+        }
+        if fields:
+            record["fields"] = fields
+        return json.dumps(record, default=str, ensure_ascii=False) + "\n"
+    return f"[{ts.strftime('%Y-%m-%d %H:%M:%S')}] [{component}] {message}\n"
+
+
+def parse_log_line(line: str) -> dict | None:
+    """
+    Parse a text or JSON log line into {ts, component, level, message, fields}.
+    Returns None for lines in neither format.
+    """
+    line = line.rstrip("\n")
+    if line.startswith("{"):
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(rec, dict):
+            return None
+        return {
+            "ts": str(rec.get("ts", "")),
+            "component": str(rec.get("component", "")),
+            "level": str(rec.get("level", "INFO")),
+            "message": str(rec.get("msg", "")),
+            "fields": rec.get("fields") or {},
+        }
+    m = _TEXT_LINE_RE.match(line)
+    if not m:
+        return None
+    return {
+        "ts": m.group(1),
+        "component": m.group(2),
+        "level": "INFO",
+        "message": m.group(3),
+        "fields": {},
+    }
+
+
+def parse_timestamp(value: str) -> float | None:
+    """Epoch seconds for a log/ISO timestamp string (local time), or None."""
+    try:
+        return datetime.fromisoformat(value.strip().replace("Z", "")).timestamp()
+    except (ValueError, AttributeError):
+        return None
+
+
+class _Control:
+    """Request for the writer thread, acknowledged through `done`."""
+
+    def __init__(self, action: str):
+        self.action = action
+        self.done = threading.Event()
+
+
+class _LogWriter:
+    """
+    Single background thread that owns manager.log.
+
+    write_log() only formats the line and puts it on an unbounded queue, so
+    callers never block on disk I/O. The writer keeps the file open, writes
+    queued lines in batches, flushes once per batch and rotates based on a
+    running byte counter instead of stat()ing the file for every line.
+    """
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+        self._file = None
+        self._path = None
+        self._size = 0
+        # Open index block: [start offset, first ts, last ts, components, lines]
+        self._block = None
+
+    # ---- caller side ----
+
+    def submit(self, record: tuple):
+        """record = (line, epoch seconds, component)"""
+        if self._stopped:
+            # After shutdown (e.g. late atexit logging) fall back to direct writes.
+            with self._lock:
+                self._write_batch([record])
+                self._close()
+            return
+        self._ensure_started()
+        self._queue.put(record)
+
+    def request(self, action: str, timeout: float = 5.0) -> bool:
+        if self._stopped:
+            return True
+        self._ensure_started()
+        ctl = _Control(action)
+        self._queue.put(ctl)
+        return ctl.done.wait(timeout)
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            thread = self._thread
+            if self._stopped:
+                return
+            self._stopped = True
+        if thread and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None and not self._stopped:
+                try:
+                    _renumber_segments()
+                except OSError as e:
+                    print(f"[Logger] Failed to renumber rotated logs: {e}", file=sys.stderr)
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+                # Pick up segments left uncompressed by a previous run.
+                _compressor.schedule()
+
+    # ---- writer thread ----
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            controls = []
+            stop = False
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, _Control):
+                    controls.append(item)
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= BATCH_MAX_LINES:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            with self._lock:
+                if batch:
+                    self._write_batch(batch)
+                for ctl in controls:
+                    if ctl.action == "rotate":
+                        self._close()
+                        self._safe_rotate()
+                    ctl.done.set()
+                if stop:
+                    self._drain()
+                    self._close()
+                    return
 
-    os.rename(LOG_FILE, f"{LOG_FILE}.1")
+    def _drain(self):
+        lines = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, _Control):
+                item.done.set()
+            elif item is not _STOP:
+                lines.append(item)
+        if lines:
+            self._write_batch(lines)
 
+    def _open(self):
+        _ensure_log_dir()
+        self._path = LOG_FILE
+        self._file = open(self._path, "ab")
+        self._size = os.fstat(self._file.fileno()).st_size
 
-def write_log(component: str, message: str):
+    def _close(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._write_index([self._finish_block()])
+        self._file = None
+        self._path = None
+        self._block = None
+
+    def _track(self, offset: int, ts: int, component: str):
+        if self._block is None:
+            self._block = [offset, ts, ts, set(), 0]
+        block = self._block
+        block[2] = ts
+        block[3].add(component)
+        block[4] += 1
+
+    def _finish_block(self) -> dict | None:
+        block, self._block = self._block, None
+        if block is None or self._size <= block[0]:
+            return None
+        start, t0, t1, comps, n = block
+        return {"start": start, "end": self._size, "t0": t0, "t1": t1, "c": sorted(comps), "n": n}
+
+    def _write_index(self, entries):
+        entries = [e for e in entries if e]
+        if not entries or self._path is None:
+            return
+        try:
+            with open(self._path + INDEX_SUFFIX, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(e) + "\n" for e in entries))
+        except Exception as e:
+            print(f"[Logger] Failed to update log index: {e}", file=sys.stderr)
+
+    def _safe_rotate(self):
+        try:
+            _rotate()
+        except Exception as e:
+            print(f"[Logger] Log rotation failed: {e}", file=sys.stderr)
+
+    def _rotate_if_needed(self, incoming: int):
+        if self._size and self._size + incoming > MAX_SIZE_BYTES:
+            self._close()
+            self._safe_rotate()
+            self._open()
+
+    def _write_batch(self, records):
+        try:
+            if self._file is None or self._path != LOG_FILE:
+                self._close()
+                self._open()
+            finished = []
+            for line, ts, component in records:
+                data = line.encode("utf-8", errors="replace")
+                self._rotate_if_needed(len(data))
+                offset = self._size
+                self._file.write(data)
+                self._size += len(data)
+                self._track(offset, int(ts), component)
+                if self._size - self._block[0] >= INDEX_BLOCK_BYTES:
+                    finished.append(self._finish_block())
+            self._file.flush()
+            # Index entries only after their bytes are in the file.
+            self._write_index(finished)
+        except Exception as e:
+            self._close()
+            print(f"[Logger] Failed to write {len(records)} log line(s): {e}", file=sys.stderr)
+
+
+_writer = _LogWriter()
+atexit.register(_writer.stop)
+
+
+def write_log(component: str, message: str, level: str = "INFO", fields: dict | None = None):
+    """
+    Queue a log line. level/fields are kept only in the JSON format
+    (LOG_FORMAT=json); text lines stay "[ts] [component] message".
+    """
+    now = datetime.now()
+    _writer.submit((format_record(now, component, message, level, fields), now.timestamp(), component))
+
+
+def flush_logs(timeout: float = 2.0) -> bool:
+    """Block until every line queued so far is on disk."""
+    return _writer.request("flush", timeout)
+
+
+def shutdown_logging(timeout: float = 5.0):
+    """Drain queued lines and stop the writer and compressor threads."""
+    _writer.stop(timeout)
+    _compressor.stop(timeout)
+
+
+def rotate_logs():
+    """Rotate manager.log now, regardless of size (scheduled job)."""
+    flush_logs()
     _ensure_log_dir()
-    _rotate_if_needed()
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    line = f"[{ts}] [{component}] {message}\n"
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(line)
+    if os.path.exists(LOG_FILE) and os.path.getsize(LOG_FILE) > 0:
+        _writer.request("rotate")
+        write_log("Logger", "Log file rotated.")
 
 
 def list_log_files():
     """
-    Return a list of available log files with index, name, and size.
+    Return a list of available log files with index, name, size (on disk)
+    and whether the file is gzip-compressed.
     index=0 -> manager.log
-    index=1 -> manager.log.1, etc.
+    index=1 -> the newest rotated segment (manager.log.<seq>[.gz]), etc.
     """
     _ensure_log_dir()
+    flush_logs()
     files = []
 
     def _add(idx: int, path: str):
-        if os.path.exists(path) and os.path.isfile(path):
+        for p, compressed in ((path, False), (path + COMPRESSED_SUFFIX, True)):
+            try:
+                size = os.path.getsize(p)
+            except OSError:
+                continue
             files.append(
                 {
                     "index": idx,
-                    "name": os.path.basename(path),
-                    "size": os.path.getsize(path),
+                    "name": os.path.basename(p),
+                    "size": size,
+                    "compressed": compressed,
                 }
             )
+            return
 
     _add(0, LOG_FILE)
-    for i in range(1, MAX_BACKUPS + 1):
-        rotated = f"{LOG_FILE}.{i}"
-        _add(i, rotated)
+    for i, path in _rotated_segments():
+        _add(i, path)
 
     return files
 
 
+def _log_path(index: int) -> str | None:
+    if index == 0:
+        return LOG_FILE
+    seqs = _rotated_sequences()
+    if 0 < index <= len(seqs):
+        return f"{LOG_FILE}.{seqs[-index]}"
+    return None
+
+
+def _segment_exists(index: int) -> bool:
+    path = _log_path(index)
+    return path is not None and (os.path.isfile(path) or os.path.isfile(path + COMPRESSED_SUFFIX))
+
+
+def _gzip_size(path: str) -> int:
+    # ISIZE trailer: uncompressed length mod 2**32 (segments are far smaller).
+    with open(path, "rb") as f:
+        f.seek(-4, os.SEEK_END)
+        return int.from_bytes(f.read(4), "little")
+
+
+def _open_segment(index: int):
+    """
+    Open segment `index` for binary reading. Returns (file, uncompressed size,
+    compressed) or None. Compressed segments are read through gzip.GzipFile,
+    which decompresses as it goes.
+    """
+    path = _log_path(index)
+    return _open_path(path) if path is not None else None
+
+
+def _open_path(path: str):
+    try:
+        f = open(path, "rb")
+        size = f.seek(0, os.SEEK_END)
+        f.seek(0)
+        return f, size, False
+    except OSError:
+        pass
+    # Plain file gone: either never existed or just replaced by its .gz.
+    try:
+        gz = path + COMPRESSED_SUFFIX
+        size = _gzip_size(gz)
+        return gzip.open(gz, "rb"), size, True
+    except OSError:
+        return None
+
+
+def _decode(raw: bytes) -> str:
+    return raw.decode("utf-8", errors="replace").rstrip("\r")
+
+
+def _read_lines_before(f, end: int, limit: int):
+    """
+    Return (lines, start) for up to `limit` lines ending at byte offset `end`,
+    reading backwards in READ_BLOCK_SIZE blocks. `start` is the offset of the
+    first returned line.
+    """
+    pos = end
+    chunks = []
+    newlines = 0
+    # limit lines need limit+1 newlines to be sure the first one is complete
+    # (the last byte before `end` is normally the previous line's newline).
+    while pos > 0 and newlines <= limit:
+        step = min(READ_BLOCK_SIZE, pos)
+        pos -= step
+        f.seek(pos)
+        chunk = f.read(step)
+        chunks.append(chunk)
+        newlines += chunk.count(b"\n")
+
+    buf = b"".join(reversed(chunks))
+    if buf.endswith(b"\n"):
+        buf = buf[:-1]
+    if not buf:
+        return [], end
+    parts = buf.split(b"\n")
+    keep = parts[-limit:]
+    dropped = parts[:-limit] if len(parts) > limit else []
+    start = pos + sum(len(p) + 1 for p in dropped)
+    return [_decode(p) for p in keep], start
+
+
+def _read_lines_after(f, start: int, limit: int):
+    """
+    Return (lines, end) for up to `limit` lines starting at byte offset `start`.
+    `end` is the offset just past the last returned line.
+    """
+    f.seek(start)
+    pos = start
+    buf = b""
+    lines = []
+    eof = False
+    while len(lines) < limit and not eof:
+        chunk = f.read(READ_BLOCK_SIZE)
+        if not chunk:
+            eof = True
+        buf += chunk
+        while len(lines) < limit:
+            nl = buf.find(b"\n")
+            if nl < 0:
+                break
+            lines.append(_decode(buf[:nl]))
+            pos += nl + 1
+            buf = buf[nl + 1:]
+    if eof and buf and len(lines) < limit:
+        # Unterminated final line
+        lines.append(_decode(buf))
+        pos += len(buf)
+    return lines, pos
+
+
+def _stream_lines_before(f, end: int, limit: int):
+    """
+    _read_lines_before for compressed segments: one forward pass keeping the
+    last `limit` lines, since seeking backwards in a gzip stream restarts it.
+    """
+    f.seek(0)
+    window = deque(maxlen=limit)
+    pos = 0
+    for raw in f:
+        if pos + len(raw) > end:
+            break
+        window.append((pos, raw))
+        pos += len(raw)
+    if not window:
+        return [], end
+    return [_decode(raw.rstrip(b"\n")) for _, raw in window], window[0][0]
+
+
+def _tail_lines(index: int, max_lines: int):
+    opened = _open_segment(index)
+    if opened is None:
+        return []
+    f, size, compressed = opened
+    with f:
+        if compressed:
+            lines, _ = _stream_lines_before(f, size, max_lines)
+        else:
+            lines, _ = _read_lines_before(f, size, max_lines)
+    return lines
+
+
+def read_log_page(index: int = 0, cursor: int | None = None, direction: str = "backward", limit: int = 200):
+    """
+    Cursor-based paging through one log file.
+
+    cursor is a byte offset into file `index`:
+      backward -> up to `limit` lines ending at cursor (default: end of file)
+      forward  -> up to `limit` lines starting at cursor (default: start of file)
+
+    Returns {file, lines, start, end, size, older, newer} where `older` /
+    `newer` are {file, cursor} for the next page in that direction (crossing
+    into manager.log.N+1 / N-1 at file boundaries), or None.
+    """
+    limit = max(1, min(int(limit or 200), MAX_PAGE_LINES))
+    if index == 0:
+        flush_logs()
+    empty = {"file": index, "lines": [], "start": 0, "end": 0, "size": 0, "older": None, "newer": None}
+    opened = _open_segment(index)
+    if opened is None:
+        return empty
+
+    f, size, compressed = opened
+    try:
+        with f:
+            if direction == "forward":
+                start = min(max(0, int(cursor or 0)), size)
+                lines, end = _read_lines_after(f, start, limit)
+            else:
+                end = size if cursor is None else min(max(0, int(cursor)), size)
+                before = _stream_lines_before if compressed else _read_lines_before
+                lines, start = before(f, end, limit)
+    except Exception:
+        return empty
+
+    older = {"file": index, "cursor": start} if start > 0 else None
+    if older is None and _segment_exists(index + 1):
+        older = {"file": index + 1, "cursor": None}
+    newer = {"file": index, "cursor": end} if end < size else None
+    if newer is None and index > 0:
+        newer = {"file": index - 1, "cursor": 0}
+
+    return {
+        "file": index,
+        "lines": lines,
+        "start": start,
+        "end": end,
+        "size": size,
+        "older": older,
+        "newer": newer,
+    }
+
+
 def read_log_file(index: int = 0, max_lines: int = 200):
     """
     Return last max_lines of the selected log file as a list of strings.
+    max_lines <= 0 returns the whole file.
     """
     _ensure_log_dir()
     if index == 0:
-        path = LOG_FILE
-    else:
-        path = f"{LOG_FILE}.{index}"
-
-    if not os.path.exists(path) or not os.path.isfile(path):
-        return []
+        flush_logs()
 
     try:
-        with open(path, "r", encoding="utf-8", errors="replace") as f:
-            lines = f.readlines()
-        if max_lines <= 0:
-            return [line.rstrip("\n") for line in lines]
-        return [line.rstrip("\n") for line in lines[-max_lines:]]
+        if max_lines > 0:
+            return _tail_lines(index, max_lines)
+        opened = _open_segment(index)
+        if opened is None:
+            return []
+        f = opened[0]
+        with f:
+            return [_decode(line.rstrip(b"\n")) for line in f]
     except Exception:
         return []
+
+
+def _load_index(path: str):
+    entries = []
+    try:
+        with open(path + INDEX_SUFFIX, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return entries
+
+
+def _candidate_ranges(entries, size: int, t_start, t_end, component):
+    """
+    Byte ranges of one segment that may hold matches, oldest first. Bytes not
+    covered by the index (the block still being written, or a log produced
+    before indexing existed) are always included.
+    """
+    ranges = []
+    pos = 0
+    for e in entries:
+        start, end = e.get("start", 0), e.get("end", 0)
+        if start < pos or end > size:
+            continue
+        if start > pos:
+            ranges.append((pos, start))
+        pos = end
+        if t_start is not None and e.get("t1", 0) < int(t_start):
+            continue
+        if t_end is not None and e.get("t0", 0) > t_end:
+            continue
+        if component and component not in {c.lower() for c in e.get("c", ())}:
+            continue
+        ranges.append((start, end))
+    if pos < size:
+        ranges.append((pos, size))
+    return ranges
+
+
+def query_logs(
+    start: str | None = None,
+    end: str | None = None,
+    component: str | None = None,
+    text: str | None = None,
+    level: str | None = None,
+    limit: int = 200,
+):
+    """
+    Search manager.log and its rotated segments, newest first.
+
+    start/end are ISO timestamps (local time); component, level and text are
+    case-insensitive (text is a substring match on the message). The sidecar
+    indexes narrow the scan to blocks whose time span and component set can
+    match. Returns up to `limit` matches in chronological order.
+    """
+    limit = max(1, min(int(limit or 200), MAX_PAGE_LINES))
+    t_start = parse_timestamp(start) if start else None
+    t_end = parse_timestamp(end) if end else None
+    component = component.strip().lower() if component else None
+    text = text.lower() if text else None
+    level = level.strip().upper() if level else None
+    flush_logs()
+
+    def _matching(f, lo, hi, index):
+        f.seek(lo)
+        for raw in f.read(hi - lo).split(b"\n"):
+            rec = parse_log_line(_decode(raw)) if raw else None
+            if rec is None:
+                continue
+            if component and rec["component"].lower() != component:
+                continue
+            if level and rec["level"].upper() != level:
+                continue
+            if text and text not in rec["message"].lower():
+                continue
+            if t_start is not None or t_end is not None:
+                ts = parse_timestamp(rec["ts"])
+                if ts is None or (t_start is not None and ts < t_start) or (t_end is not None and ts > t_end):
+                    continue
+            rec["file"] = index
+            yield rec
+
+    matches = []
+    blocks_total = blocks_selected = bytes_scanned = 0
+    truncated = False
+    for index, path in [(0, LOG_FILE)] + _rotated_segments():
+        opened = _open_path(path)
+        if opened is None:
+            continue
+        f, size, compressed = opened
+        entries = _load_index(path)
+        blocks_total += len(entries)
+        ranges = _candidate_ranges(entries, size, t_start, t_end, component)
+        blocks_selected += len(ranges)
+        bytes_scanned += sum(hi - lo for lo, hi in ranges)
+        try:
+            with f:
+                if compressed:
+                    # gzip only seeks forward cheaply: walk the blocks oldest
+                    # first and keep the newest matches.
+                    remaining = limit - len(matches)
+                    found = deque(maxlen=remaining + 1)
+                    for lo, hi in ranges:
+                        found.extend(_matching(f, lo, hi, index))
+                    matches.extend(reversed(found))
+                else:
+                    # Blocks are visited newest first so we can stop early.
+                    for lo, hi in reversed(ranges):
+                        matches.extend(reversed(list(_matching(f, lo, hi, index))))
+                        if len(matches) >= limit:
+                            break
+        except (OSError, EOFError, gzip.BadGzipFile):
+            continue
+        if len(matches) >= limit:
+            truncated = True
+            break
+
+    matches = matches[:limit]
+    matches.reverse()
+    return {
+        "matches": matches,
+        "truncated": truncated,
+        "blocks_total": blocks_total,
+        "blocks_selected": blocks_selected,
+        "bytes_scanned": bytes_scanned,
+    }
@@ -1,16 +1,43 @@
+import asyncio
 import os
-import subprocess
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 
-from fastapi import FastAPI, Request, UploadFile, File
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, Request, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
-from logger import write_log, list_log_files, read_log_file
+from logger import (
+    write_log,
+    list_log_files,
+    log_files_version,
+    read_log_file,
+    read_log_page,
+    query_logs,
+    parse_timestamp,
+    shutdown_logging,
+    MAX_PAGE_LINES,
+)
 from config_manager import load_config, save_config
-from backup import list_backups, run_backup, restore_backup
+from config_watcher import start_config_watcher, stop_config_watcher
+from change_watcher import start_change_watcher, stop_change_watcher
+from log_stream import follower as log_follower
+from status_collector import collector as status_collector
+from host_sampler import sampler as host_sampler, HISTORY_SAMPLES, SAMPLE_INTERVAL_SECONDS
+from hardware import inventory as hardware_inventory
+import commands
+import admission
+from resource_locks import aclaim, manager as lock_manager, ResourceBusy
+from jobs import registry as job_registry
+from http_cache import CachedJSON
+from events import bus as event_bus, publish, RESTART_REQUIRED
+from tracing import add_run_listener, recent_runs, MAX_RUNS
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, RequestMetricsMiddleware, render_metrics
+from scheduler import init_scheduler, shutdown_scheduler, get_run_history, get_next_run_times
+from backup import BACKUP_DIR, list_backups, retention_plan, run_backup, restore_backup
 from updater import update_os
 from driver_installer import install_coral_drivers
 from gdrive_sync import (
@@ -18,17 +45,40 @@ from gdrive_sync import (
     upload_backup_to_drive,
     list_drive_backups,
     save_token_json,
+    get_token_path,
 )
 
 from self_updater import (
     get_update_status,
+    update_check_signature,
     set_update_channel,
     get_update_channel,
     download_update,
     force_update_check,
 )
 
-app = FastAPI(title="Frigate Backup Manager")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_config_watcher()
+    hardware_inventory.start()
+    init_scheduler()
+    _register_status_probes()
+    status_collector.start()
+    host_sampler.start()
+    start_change_watcher()
+    yield
+    stop_change_watcher()
+    host_sampler.stop()
+    status_collector.stop()
+    log_follower.stop()
+    shutdown_scheduler()
+    stop_config_watcher()
+    hardware_inventory.stop()
+    shutdown_logging()
+
+
+app = FastAPI(title="Frigate Backup Manager", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -37,6 +87,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
 
 app.mount("/static", StaticFiles(directory="/app/static"), name="static")
 templates = Jinja2Templates(directory="/app/templates")
@@ -46,14 +97,9 @@ RESTART_FLAG = "/data/restart_required"
 
 def get_system_hostname() -> str:
     try:
-        result = subprocess.run(
-            ["hostnamectl", "--static"],
-            capture_output=True,
-            text=True,
-            timeout=2,
-        )
-        if result.returncode == 0:
-            return result.stdout.strip()
+        result = commands.run_sync(["hostnamectl", "--static"], timeout=2)
+        if result.ok:
+            return result.stdout
     except Exception:
         pass
     # Fallback to container hostname
@@ -77,19 +123,15 @@ def get_os_version() -> str:
 
 def get_frigate_status() -> bool:
     try:
-        result = subprocess.run(
-            ["systemctl", "is-active", "frigate"],
-            capture_output=True,
-            text=True,
-            timeout=2,
-        )
-        return result.stdout.strip() == "active"
+        result = commands.run_sync(["systemctl", "is-active", "frigate"], timeout=2)
+        return result.stdout == "active"
     except Exception:
         return False
 
 
 def get_coral_status() -> bool:
-    return os.path.exists("/dev/apex_0")
+    # A PCIe/M.2 Coral counts once its driver has created /dev/apex_*.
+    return hardware_inventory.coral()["ready"]
 
 
 def is_restart_required() -> bool:
@@ -107,6 +149,35 @@ def set_restart_required(flag: bool):
                 os.remove(RESTART_FLAG)
     except Exception as e:
         write_log("System", f"Failed to set restart flag: {e}")
+    publish(RESTART_REQUIRED, required=is_restart_required())
+
+
+def _drive_status_signature():
+    """Changes whenever the Drive status could: enabled flag, token path or token file."""
+    token_path = get_token_path()
+    try:
+        token_mtime = os.stat(token_path).st_mtime_ns
+    except OSError:
+        token_mtime = None
+    return bool(load_config().get("GDRIVE_ENABLED", False)), token_path, token_mtime
+
+
+def _register_status_probes():
+    # Intervals in seconds: hostname/OS rarely change, Frigate often does.
+    status_collector.register("hostname", get_system_hostname, interval=3600, default="unknown")
+    status_collector.register("os", get_os_version, interval=3600, default="Unknown OS")
+    status_collector.register("frigate", get_frigate_status, interval=10, default=False)
+    status_collector.register(
+        "coral", get_coral_status, interval=300, default=False, watch=lambda: hardware_inventory.version
+    )
+    status_collector.register(
+        "drive", get_drive_status, interval=900, default={}, watch=_drive_status_signature
+    )
+    # get_update_status() never waits for GitHub; the watch picks up the
+    # result of its background check as soon as it is stored.
+    status_collector.register(
+        "update", get_update_status, interval=300, default={}, watch=update_check_signature
+    )
 
 
 @app.get("/")
@@ -120,22 +191,63 @@ async def logs_page(request: Request):
     return templates.TemplateResponse("logs.html", {"request": request})
 
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus metrics (text exposition format)."""
+    body = await asyncio.to_thread(render_metrics)
+    return Response(body, media_type=METRICS_CONTENT_TYPE)
+
+
+# Serialized bodies of the polled endpoints, reused until their state changes.
+_status_cache = CachedJSON()
+_backups_cache = CachedJSON()
+_logs_list_cache = CachedJSON()
+_drive_status_cache = CachedJSON()
+
+# Drive presence in /api/backups is re-queried at least this often.
+DRIVE_INDEX_TTL_SECONDS = 300
+
+# Runs that add, remove or upload backups; each finished one invalidates /api/backups.
+_BACKUP_CATALOG_RUNS = {"run_backup", "cleanup_old_backups", "upload_backup_to_drive"}
+_backup_catalog_runs = 0
+
+
+def _on_run_finished(run):
+    global _backup_catalog_runs
+    if run.name in _BACKUP_CATALOG_RUNS:
+        _backup_catalog_runs += 1
+
+
+add_run_listener(_on_run_finished)
+
+
 @app.get("/api/status")
-async def api_status():
+async def api_status(request: Request):
+    """
+    Dashboard status, served from the background status collector.
+    `probes` reports each probe's age and last error as of `timestamp`,
+    which is when the body was last rebuilt (i.e. when something changed).
+    Supports If-None-Match.
+    """
+    key = (status_collector.version(), is_restart_required())
+    return await _status_cache.respond(request, key, _build_status)
+
+
+def _build_status():
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    value = status_collector.value
 
     system = {
-        "hostname": get_system_hostname(),
-        "os": get_os_version(),
-        "frigate_ok": get_frigate_status(),
-        "coral_ok": get_coral_status(),
+        "hostname": value("hostname"),
+        "os": value("os"),
+        "frigate_ok": value("frigate"),
+        "coral_ok": value("coral"),
         "restart_required": is_restart_required(),
     }
 
-    cfg = load_config()
-    drive_status = get_drive_status()
+    drive_status = value("drive")
 
-    update_info = get_update_status()
+    update_info = value("update") or {}
     update_available = bool(update_info.get("update_available"))
     update_channel = update_info.get("channel")
     update_remote = update_info.get("remote_version")
@@ -151,14 +263,99 @@ async def api_status():
             "remote_version": update_remote,
             "local_version": update_local,
         },
+        "probes": status_collector.probe_info(),
     }
 
 
+event_bus.add_snapshot_provider("status", _build_status)
+
+
+# --------- Live events ---------
+
+
+@app.websocket("/api/events")
+async def api_events(websocket: WebSocket):
+    """
+    Live events (backup/restore/upload results, restart flag, update checks)
+    as JSON messages. The first message is a snapshot with the latest event
+    of each type and the current /api/status body; clients fall back to
+    polling while disconnected.
+    """
+    await websocket.accept()
+    client = event_bus.subscribe()
+    receiver = asyncio.create_task(_wait_for_disconnect(websocket))
+    try:
+        await websocket.send_json(await asyncio.to_thread(event_bus.snapshot))
+        while True:
+            getter = asyncio.create_task(event_bus.next_event(client))
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if getter not in done:
+                getter.cancel()
+                break
+            event = getter.result()
+            if event is None:
+                # Too far behind; the client reconnects and gets a fresh snapshot.
+                await websocket.close(code=1013)
+                break
+            await websocket.send_json(event)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        receiver.cancel()
+        event_bus.unsubscribe(client)
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    # Clients send nothing meaningful; this only notices them going away.
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+    except (WebSocketDisconnect, RuntimeError):
+        return
+
+
 # --------- Backup APIs ---------
 
+# How long an API request queues for busy resources before answering 409,
+# and the Retry-After sent with it. Short: the client retries rather than
+# holding the request open for the length of someone else's backup.
+API_LOCK_TIMEOUT_SECONDS = 10
+API_RETRY_AFTER_SECONDS = 30
+
+
+def _busy_response(e: ResourceBusy) -> JSONResponse:
+    msg = f"Busy: {e}"
+    return JSONResponse(
+        {"ok": False, "error": msg, "message": msg, "blocked_by": e.blockers},
+        status_code=409,
+        headers={"Retry-After": str(API_RETRY_AFTER_SECONDS)},
+    )
+
+
+@app.get("/api/jobs")
+async def api_jobs(kind: str | None = None):
+    """Running and recent long operations with progress and ETA, newest first."""
+    return {"jobs": job_registry.list(kind)}
+
+
+@app.get("/api/jobs/{job_id}")
+async def api_job(job_id: str):
+    job = job_registry.get(job_id)
+    if job is None:
+        return JSONResponse({"ok": False, "error": "Unknown job."}, status_code=404)
+    return job.to_dict(lines=True)
+
+
+@app.get("/api/locks")
+async def api_locks():
+    """Resource lock holders, queued jobs and what blocks them, recent wait times."""
+    return lock_manager.status()
+
 
 @app.get("/api/backups")
-async def api_list_backups():
+async def api_list_backups(request: Request):
     """
     Return structured backup info with optional Drive presence:
     {
@@ -173,7 +370,21 @@ async def api_list_backups():
         }
       ]
     }
+    Rebuilt only after a backup, cleanup or upload run, a change to the
+    backups directory, or every DRIVE_INDEX_TTL_SECONDS while Drive is
+    enabled. Supports If-None-Match.
     """
+    try:
+        dir_mtime = os.stat(BACKUP_DIR).st_mtime_ns
+    except OSError:
+        dir_mtime = None
+    drive_enabled = bool(load_config().get("GDRIVE_ENABLED", False))
+    drive_epoch = int(time.time() // DRIVE_INDEX_TTL_SECONDS) if drive_enabled else None
+    key = (_backup_catalog_runs, dir_mtime, drive_enabled, drive_epoch)
+    return await _backups_cache.respond(request, key, _build_backup_list)
+
+
+def _build_backup_list():
     backups = list_backups()
     cfg = load_config()
     drive_enabled = bool(cfg.get("GDRIVE_ENABLED", False))
@@ -194,6 +405,31 @@ async def api_list_backups():
     return {"files": backups}
 
 
+@app.get("/api/backups/retention")
+async def api_retention_preview(
+    retention: int | None = None,
+    hourly: int | None = None,
+    daily: int | None = None,
+    weekly: int | None = None,
+    monthly: int | None = None,
+    max_total_mb: int | None = None,
+):
+    """
+    Dry run of the retention policy: which backups would be kept (and by
+    which tier) or deleted. Parameters override the saved settings, so a
+    policy can be previewed before it is saved.
+    """
+    overrides = {
+        "BACKUP_RETENTION": retention,
+        "BACKUP_KEEP_HOURLY": hourly,
+        "BACKUP_KEEP_DAILY": daily,
+        "BACKUP_KEEP_WEEKLY": weekly,
+        "BACKUP_KEEP_MONTHLY": monthly,
+        "BACKUP_MAX_TOTAL_MB": max_total_mb,
+    }
+    return await asyncio.to_thread(retention_plan, overrides)
+
+
 @app.get("/api/backups/download")
 async def api_download_backup(file: str):
     """
@@ -218,20 +454,36 @@ async def api_download_backup(file: str):
 
 
 @app.post("/api/backup/run")
-async def api_run_backup():
+async def api_run_backup(force: bool = False):
+    """Run a backup now; skipped when nothing changed since the last one unless force=true."""
     cfg = load_config()
-    path = run_backup()
-    if not path:
+    try:
+        async with aclaim("backup", timeout=API_LOCK_TIMEOUT_SECONDS):
+            result = await asyncio.to_thread(run_backup, force)
+    except ResourceBusy as e:
+        return _busy_response(e)
+    if result.refused:
+        msg = f"Backup refused: {result.error}"
+        return JSONResponse({"ok": False, "error": msg, "message": msg}, status_code=507)
+    if not result.ok:
         msg = "Backup failed. See logs for details."
         return JSONResponse({"ok": False, "error": msg, "message": msg}, status_code=500)
+    path = result.path
+    if result.skipped:
+        msg = f"No changes since last backup: {path}"
+        return {"ok": True, "path": path, "skipped": True, "message": msg}
 
     drive_msg = ""
     if cfg.get("GDRIVE_ENABLED", False):
-        uploaded = upload_backup_to_drive(path)
+        try:
+            async with aclaim("upload", timeout=API_LOCK_TIMEOUT_SECONDS):
+                uploaded = await asyncio.to_thread(upload_backup_to_drive, path)
+        except ResourceBusy:
+            uploaded = False
         drive_msg = " and uploaded to Google Drive" if uploaded else " (Drive upload failed or disabled)"
 
     msg = f"Backup completed: {path}{drive_msg}"
-    return {"ok": True, "path": path, "message": msg}
+    return {"ok": True, "path": path, "skipped": False, "message": msg}
 
 
 @app.post("/api/restore")
@@ -242,7 +494,11 @@ async def api_restore(request: Request):
         msg = "No filename provided."
         return JSONResponse({"ok": False, "error": msg, "message": msg}, status_code=400)
 
-    success = restore_backup(filename)
+    try:
+        async with aclaim("restore", timeout=API_LOCK_TIMEOUT_SECONDS):
+            success = await asyncio.to_thread(restore_backup, filename)
+    except ResourceBusy as e:
+        return _busy_response(e)
     if success:
         set_restart_required(True)
     msg = (
@@ -253,13 +509,62 @@ async def api_restore(request: Request):
     return {"ok": success, "message": msg}
 
 
+@app.get("/api/traces")
+async def api_traces(limit: int = 20, name: str | None = None):
+    """
+    Recent backup / restore / upload runs with their spans: time and bytes
+    per phase and per BACKUP_PATHS entry. Newest first.
+    """
+    return {"runs": recent_runs(limit=max(1, min(limit, MAX_RUNS)), name=name)}
+
+
+@app.get("/api/scheduler/history")
+async def api_scheduler_history(job: str | None = None, limit: int = 100, days: float | None = None):
+    """
+    Scheduled job runs (start, end, outcome, duration, bytes), newest first,
+    with per-job averages. Filter by job name and/or the last N days.
+    """
+    since = time.time() - days * 86400 if days else None
+    history = await asyncio.to_thread(get_run_history, job, max(1, min(limit, 1000)), since)
+    history["next_runs"] = get_next_run_times()
+    return history
+
+
+@app.get("/api/scheduler/admission")
+async def api_scheduler_admission():
+    """Load, I/O pressure and Frigate disk busy readings against the admission thresholds."""
+    return await asyncio.to_thread(admission.status)
+
+
+@app.get("/api/host/history")
+async def api_host_history(seconds: int = 86400, points: int = 288):
+    """
+    Host CPU, load, memory, free space and disk I/O over the last `seconds`,
+    averaged into `points` buckets, with backup/restore/upload runs as events.
+    """
+    seconds = max(SAMPLE_INTERVAL_SECONDS, min(seconds, HISTORY_SAMPLES * SAMPLE_INTERVAL_SECONDS))
+    # Bucketing up to HISTORY_SAMPLES samples is CPU work; keep it off the loop.
+    return await asyncio.to_thread(host_sampler.history, seconds, max(1, points))
+
+
 # --------- Google Drive config APIs ---------
 
 
 @app.get("/api/gdrive/status")
-async def api_gdrive_status():
-    status = get_drive_status()
-    return status
+async def api_gdrive_status(request: Request):
+    """
+    Drive status from the status collector's "drive" probe, which refreshes
+    when the config or token file changes. Supports If-None-Match.
+    """
+    key = status_collector.version("drive")
+    return await _drive_status_cache.respond(request, key, lambda: status_collector.value("drive"))
+
+
+async def _refresh_drive_status():
+    """Wait for a fresh Drive probe so the next status poll reflects a config change."""
+    future = status_collector.refresh("drive")
+    if future is not None:
+        await asyncio.wrap_future(future)
 
 
 @app.post("/api/gdrive/config")
@@ -275,7 +580,7 @@ async def api_gdrive_config(request: Request):
     enabled = bool(body.get("enabled", False))
     token_json = body.get("token_json")
 
-    cfg = load_config()
+    cfg = dict(load_config())
     cfg["GDRIVE_ENABLED"] = enabled
 
     if token_json:
@@ -287,6 +592,7 @@ async def api_gdrive_config(request: Request):
             )
 
     save_config(cfg)
+    await _refresh_drive_status()
     return {"ok": True, "message": "Google Drive configuration updated."}
 
 
@@ -304,9 +610,10 @@ async def api_gdrive_upload_token(file: UploadFile = File(...)):
             status_code=500,
         )
 
-    cfg = load_config()
+    cfg = dict(load_config())
     cfg["GDRIVE_ENABLED"] = True
     save_config(cfg)
+    await _refresh_drive_status()
 
     return {"ok": True, "message": "Token uploaded and Drive enabled."}
 
@@ -316,14 +623,34 @@ async def api_gdrive_upload_token(file: UploadFile = File(...)):
 
 @app.post("/api/system/update_os")
 async def api_update_os():
-    ok = update_os()
+    try:
+        async with aclaim("os_update", timeout=API_LOCK_TIMEOUT_SECONDS):
+            ok = await update_os()
+    except ResourceBusy as e:
+        return _busy_response(e)
     msg = "OS update completed." if ok else "OS update failed. Check logs."
     return {"ok": ok, "message": msg}
 
 
+@app.get("/api/hardware")
+async def api_hardware():
+    """Coral TPUs, GPUs and accelerator device nodes from the in-memory hardware inventory."""
+    return hardware_inventory.summary()
+
+
 @app.post("/api/system/install_drivers")
 async def api_install_drivers():
-    ok = install_coral_drivers()
+    """
+    Container build: calls the driver_installer stub, since apt and the Coral
+    kernel driver belong to the host. drivers.install_drivers (the host-side
+    planner) takes the "driver_install" lock itself; call it through
+    asyncio.to_thread without this aclaim, or the two claims deadlock.
+    """
+    try:
+        async with aclaim("driver_install", timeout=API_LOCK_TIMEOUT_SECONDS):
+            ok = await asyncio.to_thread(install_coral_drivers)
+    except ResourceBusy as e:
+        return _busy_response(e)
     msg = (
         "Coral driver installation requested (stub only in container)."
         if ok
@@ -338,14 +665,15 @@ async def api_restart_frigate():
     cmd = cfg.get("FRIGATE_RESTART_CMD", "systemctl restart frigate")
     try:
         write_log("System", f"Restarting Frigate with command: {cmd}")
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        if result.returncode != 0:
+        result = await commands.run(cmd, shell=True, timeout=300, component="System")
+        if not result.ok:
             write_log("System", f"Frigate restart failed: {result.stderr}")
             msg = f"Frigate restart failed: {result.stderr}"
             return {"ok": False, "error": result.stderr, "message": msg}
         write_log("System", "Frigate restart command completed.")
         # Clear restart-required flag on success
         set_restart_required(False)
+        status_collector.refresh("frigate")
         return {"ok": True, "message": "Frigate restart command completed."}
     except Exception as e:
         write_log("System", f"Frigate restart exception: {e}")
@@ -357,7 +685,9 @@ async def api_restart_frigate():
 async def api_reboot():
     try:
         write_log("System", "Reboot requested via API.")
-        subprocess.Popen(["reboot"])
+        result = await commands.run(["reboot"], timeout=60)
+        if not result.ok:
+            raise RuntimeError(result.stderr or f"reboot exited with code {result.returncode}")
         return {"ok": True, "message": "Reboot command issued."}
     except Exception as e:
         write_log("System", f"Reboot failed: {e}")
@@ -379,7 +709,9 @@ async def api_set_hostname(request: Request):
             msg = "Invalid hostname format. Use letters, numbers, and hyphens only."
             return {"ok": False, "error": msg, "message": msg}
 
-        os.system(f"hostnamectl set-hostname {new_name}")
+        result = await commands.run(["hostnamectl", "set-hostname", new_name], timeout=30)
+        if not result.ok:
+            raise RuntimeError(result.stderr or f"hostnamectl exited with code {result.returncode}")
 
         try:
             with open("/etc/hosts", "r", encoding="utf-8") as f:
@@ -394,6 +726,7 @@ async def api_set_hostname(request: Request):
             write_log("System", f"Failed to update /etc/hosts: {e}")
 
         write_log("System", f"Hostname changed to: {new_name}")
+        status_collector.refresh("hostname")
         msg = f"Hostname changed to {new_name}. Reboot required."
         return {"ok": True, "hostname": new_name, "reboot_required": True, "message": msg}
     except Exception as e:
@@ -406,22 +739,106 @@ async def api_set_hostname(request: Request):
 
 
 @app.get("/api/logs/list")
-async def api_logs_list():
-    """Return list of available log files."""
-    files = list_log_files()
-    return {"files": files}
+async def api_logs_list(request: Request):
+    """Return list of available log files. Supports If-None-Match."""
+    return await _logs_list_cache.respond(request, log_files_version(), lambda: {"files": list_log_files()})
 
 
 @app.get("/api/logs/content")
 async def api_logs_content(file: int = 0, max_lines: int = 200):
     """
     Return last N lines of the selected log file.
-    file=0 -> manager.log, file=1 -> manager.log.1, etc.
+    file=0 -> manager.log, file=1 -> the newest rotated segment, etc.
+    max_lines is capped at MAX_PAGE_LINES; use /api/logs/page to go further back.
     """
-    lines = read_log_file(index=file, max_lines=max_lines)
+    if max_lines <= 0 or max_lines > MAX_PAGE_LINES:
+        max_lines = MAX_PAGE_LINES
+    lines = await asyncio.to_thread(read_log_file, index=file, max_lines=max_lines)
     return {"lines": lines}
 
 
+@app.get("/api/logs/page")
+async def api_logs_page(
+    file: int = 0,
+    cursor: int | None = None,
+    direction: str = "backward",
+    limit: int = 200,
+):
+    """
+    Page through a log file by byte offset.
+    direction=backward returns lines ending at cursor (default: end of file),
+    direction=forward returns lines starting at cursor.
+    The response's `older` / `newer` give {file, cursor} for the next page,
+    continuing into rotated files at file boundaries.
+    """
+    if direction not in ("backward", "forward"):
+        return JSONResponse(
+            {"ok": False, "message": "direction must be 'backward' or 'forward'"},
+            status_code=400,
+        )
+    return await asyncio.to_thread(read_log_page, index=file, cursor=cursor, direction=direction, limit=limit)
+
+
+@app.get("/api/logs/query")
+async def api_logs_query(
+    start: str | None = None,
+    end: str | None = None,
+    component: str | None = None,
+    q: str | None = None,
+    level: str | None = None,
+    limit: int = 200,
+):
+    """
+    Search all log files by time range (ISO timestamps), component, level
+    and message text. Uses the per-file block indexes to skip unrelated parts
+    of manager.log and manager.log.N.
+    """
+    for name, value in (("start", start), ("end", end)):
+        if value and parse_timestamp(value) is None:
+            return JSONResponse(
+                {"ok": False, "message": f"Invalid {name} timestamp: {value}"},
+                status_code=400,
+            )
+    return await asyncio.to_thread(
+        query_logs, start=start, end=end, component=component, text=q, level=level, limit=limit
+    )
+
+
+@app.get("/api/logs/stream")
+async def api_logs_stream(request: Request, component: str = ""):
+    """
+    Server-Sent Events stream of new manager.log lines.
+    component=Backup,Drive limits the stream to those components.
+    All viewers share one file watcher; each only receives lines written
+    after it connected.
+    """
+    components = [c.strip() for c in component.split(",") if c.strip()] or None
+    sub = log_follower.subscribe(components)
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    lines = await asyncio.wait_for(sub.queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if sub.overflowed:
+                    sub.overflowed = False
+                    yield "event: overflow\ndata: lines dropped; reload to resync\n\n"
+                for line in lines:
+                    yield f"data: {line}\n\n"
+        finally:
+            log_follower.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # --------- Self-updater APIs ---------
 
 
@@ -447,6 +864,7 @@ async def api_update_channel(request: Request):
         return JSONResponse({"ok": False, "message": msg}, status_code=400)
 
     status = get_update_status()
+    status_collector.refresh("update")
     status["message"] = msg
     return status
 
@@ -454,10 +872,11 @@ async def api_update_channel(request: Request):
 @app.post("/api/update/download")
 async def api_update_download():
     """
-    Download the latest update zip into /data/updates.
+    Download the latest update zip into /data/updates (resumed after an
+    interruption, skipped when unchanged). Progress is reported as a job.
     Does NOT apply the update; use update.sh on the host.
     """
-    result = download_update()
+    result = await asyncio.to_thread(download_update)
     code = 200 if result.get("ok") else 500
     return JSONResponse(result, status_code=code)
 
@@ -467,6 +886,7 @@ async def api_update_check_now():
     """
     Force a GitHub update check immediately (bypasses cache).
     """
-    result = force_update_check()
+    result = await asyncio.to_thread(force_update_check)
+    status_collector.refresh("update")
     code = 200 if result.get("ok") else 500
     return JSONResponse(result, status_code=code)
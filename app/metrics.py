@@ -0,0 +1,267 @@
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Prometheus text exposition format, version 0.0.4.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Default buckets (seconds) for request/API latency.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Buckets for long-running operations such as backups and transfers.
+DURATION_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    value = float(value)
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+        with _registry_lock:
+            _registry.append(self)
+
+    def labels(self, *values, **kwargs):
+        """Child series for the given label values (cached; cheap to call repeatedly)."""
+        if kwargs:
+            values = tuple(str(kwargs[n]) for n in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _default(self):
+        # Unlabelled metrics act as their own single child.
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, labels, extra)} {_format_value(value)}")
+        return lines
+
+
+class _Value:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def _samples(self):
+        for labels, child in list(self._children.items()):
+            yield "", labels, "", child.value
+
+
+class Gauge(_Metric):
+    """
+    Gauge set by callers, or computed at scrape time with set_function(),
+    which keeps values like disk usage entirely off the hot path.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._default().dec(amount)
+
+    def set_function(self, func: Callable[[], object]):
+        """
+        func() returns a number, or for labelled gauges a mapping of
+        label-value tuples to numbers.
+        """
+        self._function = func
+
+    def _samples(self):
+        if self._function is not None:
+            try:
+                result = self._function()
+            except Exception:
+                return
+            if isinstance(result, dict):
+                for labels, value in result.items():
+                    labels = labels if isinstance(labels, tuple) else (labels,)
+                    yield "", tuple(str(v) for v in labels), "", value
+            elif result is not None:
+                yield "", (), "", result
+            return
+        for labels, child in list(self._children.items()):
+            yield "", labels, "", child.value
+
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum", "lock")
+
+    def __init__(self, upper_bounds):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.upper_bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def _samples(self):
+        for labels, child in list(self._children.items()):
+            with child.lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield "_bucket", labels, f'le="{_format_value(bound)}"', cumulative
+            yield "_count", labels, "", cumulative
+            yield "_sum", labels, "", total
+
+
+def render_metrics() -> str:
+    """All registered metrics in Prometheus text format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---- metrics shared by several modules ----
+
+LAST_SUCCESS = Gauge(
+    "fbm_last_success_timestamp_seconds",
+    "Unix time of the last successful operation.",
+    ["operation"],
+)
+RESTORES = Counter("fbm_restores_total", "Restores by source and outcome.", ["source", "outcome"])
+RESTORE_DURATION = Histogram(
+    "fbm_restore_duration_seconds",
+    "Time taken by restores, including any download.",
+    ["source"],
+    buckets=DURATION_BUCKETS,
+)
+
+HTTP_LATENCY = Histogram(
+    "fbm_http_request_duration_seconds",
+    "HTTP request latency by route.",
+    ["method", "route", "status"],
+)
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware timing each HTTP request. Requests are labelled with
+    the matched route template (e.g. /api/logs/page), not the raw path, to
+    keep the number of series bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_LATENCY.labels(scope["method"], path, f"{status[0] // 100}xx").observe(
+                time.perf_counter() - started
+            )
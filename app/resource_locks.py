@@ -0,0 +1,281 @@
+import asyncio
+import bisect
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List
+
+from logger import write_log
+
+SHARED = "shared"
+EXCLUSIVE = "exclusive"
+
+# Lower runs first: a user waiting in the UI goes ahead of scheduled work.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_SCHEDULED = 10
+
+# Resources each job type needs:
+#   config  - the BACKUP_PATHS tree (read by backups, replaced by restores)
+#   backups - the backups directory
+#   apt     - the package system; backups hold it shared so upgrades, which
+#             restart services and load the disk, wait for the archive.
+JOB_RESOURCES: Dict[str, Dict[str, str]] = {
+    "backup": {"config": SHARED, "backups": EXCLUSIVE, "apt": SHARED},
+    "restore": {"config": EXCLUSIVE, "backups": SHARED},
+    "upload": {"backups": SHARED},
+    "cleanup": {"backups": EXCLUSIVE},
+    "security_updates": {"apt": EXCLUSIVE},
+    "os_update": {"apt": EXCLUSIVE},
+    "driver_install": {"apt": EXCLUSIVE},
+    "log_rotation": {},
+}
+
+# Concurrent runs allowed per job type (default 1).
+MAX_INSTANCES = {"upload": 2}
+
+# Waits at least this long are logged.
+LOG_WAIT_SECONDS = 1.0
+MAX_RECENT = 100
+
+
+class ResourceBusy(Exception):
+    """Raised when a claim is not granted within its timeout."""
+
+    def __init__(self, job: str, waited: float, blockers: List[str]):
+        self.job = job
+        self.waited = waited
+        self.blockers = blockers
+        super().__init__(f"'{job}' still waiting after {waited:.0f}s for: {', '.join(blockers) or 'a free slot'}")
+
+
+class _Request:
+    __slots__ = ("job", "resources", "priority", "seq", "enqueued", "granted")
+
+    def __init__(self, job: str, priority: int, seq: int):
+        self.job = job
+        self.resources = JOB_RESOURCES.get(job, {})
+        self.priority = priority
+        self.seq = seq
+        self.enqueued = time.monotonic()
+        self.granted = None
+
+    def __lt__(self, other: "_Request"):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def conflicts(self, other: "_Request") -> bool:
+        for name, mode in self.resources.items():
+            other_mode = other.resources.get(name)
+            if other_mode and EXCLUSIVE in (mode, other_mode):
+                return True
+        return False
+
+
+class Lease:
+    """A granted claim; release() (or leaving the `with` block) frees it."""
+
+    def __init__(self, manager: "LockManager", request: _Request, waited: float):
+        self._manager = manager
+        self._request = request
+        self.job = request.job
+        self.waited = waited
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._manager._release(self._request, self.waited)
+
+
+class LockManager:
+    """
+    Named resource locks (shared/exclusive) with a priority queue and a
+    per-job-type instance limit. A waiting request is granted only when no
+    request ahead of it in the queue conflicts, so a steady stream of shared
+    holders cannot starve an exclusive one.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting: List[_Request] = []
+        self._holding: List[_Request] = []
+        self._recent = deque(maxlen=MAX_RECENT)
+        self._stats: Dict[str, dict] = {}
+        # Wake-up callbacks of async waiters (see aclaim), run on every change.
+        self._wakers = set()
+
+    def _running(self, job: str) -> int:
+        return sum(1 for r in self._holding if r.job == job)
+
+    def _blockers(self, request: _Request) -> List[str]:
+        out = [f"{r.job} (running)" for r in self._holding if r.conflicts(request)]
+        if self._running(request.job) >= MAX_INSTANCES.get(request.job, 1):
+            out.append(f"{request.job} (max instances)")
+        for r in self._waiting:
+            if r is request:
+                break
+            if r.conflicts(request):
+                out.append(f"{r.job} (queued ahead)")
+        return out
+
+    def _grantable(self, request: _Request) -> bool:
+        if self._running(request.job) >= MAX_INSTANCES.get(request.job, 1):
+            return False
+        if any(r.conflicts(request) for r in self._holding):
+            return False
+        for r in self._waiting:
+            if r is request:
+                return True
+            if r.conflicts(request):
+                return False
+        return True
+
+    def _notify(self):
+        # Called with _cond held.
+        self._cond.notify_all()
+        for wake in self._wakers:
+            wake()
+
+    def _enqueue(self, job: str, priority: int) -> _Request:
+        request = _Request(job, priority, next(self._seq))
+        bisect.insort(self._waiting, request)
+        return request
+
+    def _dequeue(self, request: _Request, granted: bool):
+        self._waiting.remove(request)
+        if granted:
+            request.granted = time.monotonic()
+            self._holding.append(request)
+        # Our leaving the queue may unblock requests behind us.
+        self._notify()
+
+    def _lease(self, request: _Request, blockers: List[str] | None) -> Lease:
+        waited = request.granted - request.enqueued
+        if waited >= LOG_WAIT_SECONDS:
+            write_log("Locks", f"'{request.job}' waited {waited:.1f}s for: {', '.join(blockers or [])}")
+        return Lease(self, request, waited)
+
+    def acquire(self, job: str, priority: int = PRIORITY_SCHEDULED, timeout: float | None = None) -> Lease:
+        with self._cond:
+            request = self._enqueue(job, priority)
+            deadline = None if timeout is None else request.enqueued + timeout
+            blockers = None
+            granted = False
+            try:
+                while not self._grantable(request):
+                    if blockers is None:
+                        blockers = self._blockers(request)
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise ResourceBusy(job, time.monotonic() - request.enqueued, self._blockers(request))
+                    self._cond.wait(remaining)
+                granted = True
+            finally:
+                self._dequeue(request, granted)
+        return self._lease(request, blockers)
+
+    async def acquire_async(self, job: str, priority: int = PRIORITY_INTERACTIVE, timeout: float | None = None) -> Lease:
+        """
+        acquire() for the event loop: the request queues like any other, but
+        waits on an asyncio.Event woken through call_soon_threadsafe instead
+        of blocking a thread.
+        """
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+
+        def wake():
+            loop.call_soon_threadsafe(changed.set)
+
+        with self._cond:
+            request = self._enqueue(job, priority)
+            self._wakers.add(wake)
+        deadline = None if timeout is None else request.enqueued + timeout
+        blockers = None
+        granted = False
+        try:
+            while True:
+                changed.clear()
+                with self._cond:
+                    if self._grantable(request):
+                        granted = True
+                        break
+                    if blockers is None:
+                        blockers = self._blockers(request)
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise ResourceBusy(job, time.monotonic() - request.enqueued, self._blockers(request))
+                try:
+                    await asyncio.wait_for(changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                self._wakers.discard(wake)
+                self._dequeue(request, granted)
+        return self._lease(request, blockers)
+
+    def _release(self, request: _Request, waited: float):
+        held = time.monotonic() - request.granted
+        with self._cond:
+            self._holding.remove(request)
+            self._recent.append(
+                {
+                    "job": request.job,
+                    "priority": request.priority,
+                    "waited_seconds": round(waited, 3),
+                    "held_seconds": round(held, 3),
+                    "finished_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                }
+            )
+            s = self._stats.setdefault(request.job, {"claims": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0})
+            s["claims"] += 1
+            s["total_wait_seconds"] = round(s["total_wait_seconds"] + waited, 3)
+            s["max_wait_seconds"] = round(max(s["max_wait_seconds"], waited), 3)
+            self._notify()
+
+    def status(self) -> dict:
+        """Holders, queued requests (with what blocks them), recent claims and wait totals."""
+        now = time.monotonic()
+        with self._cond:
+            return {
+                "holding": [
+                    {"job": r.job, "resources": r.resources, "held_seconds": round(now - r.granted, 1)}
+                    for r in self._holding
+                ],
+                "waiting": [
+                    {
+                        "job": r.job,
+                        "priority": r.priority,
+                        "waiting_seconds": round(now - r.enqueued, 1),
+                        "blocked_by": self._blockers(r),
+                    }
+                    for r in self._waiting
+                ],
+                "recent": list(reversed(self._recent)),
+                "wait_stats": {job: dict(s) for job, s in self._stats.items()},
+            }
+
+
+manager = LockManager()
+
+
+@contextmanager
+def claim(job: str, priority: int = PRIORITY_SCHEDULED, timeout: float | None = None):
+    """Hold the resources of `job` for the block. Raises ResourceBusy on timeout."""
+    lease = manager.acquire(job, priority, timeout)
+    try:
+        yield lease
+    finally:
+        lease.release()
+
+
+@asynccontextmanager
+async def aclaim(job: str, priority: int = PRIORITY_INTERACTIVE, timeout: float | None = None):
+    """claim() for async handlers; the wait is on the event loop, not a thread."""
+    lease = await manager.acquire_async(job, priority, timeout)
+    try:
+        yield lease
+    finally:
+        lease.release()
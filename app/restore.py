@@ -1,11 +1,21 @@
 import os
 import tarfile
 import tempfile
-from googleapiclient.discovery import build
+import time
 from googleapiclient.http import MediaIoBaseDownload
 from logger import write_log
-from gdrive_sync import get_credentials, get_token_path
+from gdrive_sync import (
+    get_credentials,
+    build_drive_service,
+    next_chunk_with_retry,
+    record_transfer,
+    TRANSFER_CHUNK_SIZE,
+)
 from config_manager import load_config
+from metrics import LAST_SUCCESS, RESTORES, RESTORE_DURATION
+from backup import extract_archive
+from tracing import span
+from events import publish, RESTORE_FINISHED
 
 BACKUP_DIR = os.getenv("BACKUP_DIR", "/backups")
 CONFIG_DIR = os.getenv("CONFIG_DIR", "/config")
@@ -28,10 +38,25 @@ def _list_drive_backups():
         creds = get_credentials()
         if not creds:
             return []
-        service = build("drive", "v3", credentials=creds)
+        service = build_drive_service(creds)
         query = "name contains 'frigate_config_' and trashed = false"
-        result = service.files().list(q=query, fields="files(id, name, modifiedTime)").execute()
-        files = sorted(result.get("files", []), key=lambda x: x["modifiedTime"], reverse=True)
+        files = []
+        page_token = None
+        while True:
+            result = (
+                service.files()
+                .list(
+                    q=query,
+                    fields="nextPageToken, files(id, name, modifiedTime)",
+                    pageToken=page_token,
+                )
+                .execute()
+            )
+            files.extend(result.get("files", []))
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                break
+        files.sort(key=lambda x: x["modifiedTime"], reverse=True)
         return [f["name"] for f in files]
     except Exception as e:
         write_log("Restore", f"Failed to list Drive backups: {e}")
@@ -45,53 +70,80 @@ def list_backups(source: str = "local"):
     return _list_local_backups()
 
 
+def _finished(filename: str, source: str, result: dict) -> dict:
+    publish(RESTORE_FINISHED, archive=filename, source=source, ok=result["ok"], message=result["message"])
+    return result
+
+
 def restore_local(filename: str):
     """Restore from a local backup file."""
     path = os.path.join(BACKUP_DIR, filename)
     if not os.path.exists(path):
-        return {"ok": False, "message": "Backup file not found."}
+        return _finished(filename, "local", {"ok": False, "message": "Backup file not found."})
 
+    started = time.monotonic()
     try:
         write_log("Restore", f"Restoring local backup: {filename}")
         with tarfile.open(path, "r:gz") as tar:
             tar.extractall(CONFIG_DIR)
+        RESTORE_DURATION.labels("local").observe(time.monotonic() - started)
+        RESTORES.labels("local", "success").inc()
+        LAST_SUCCESS.labels("restore").set(time.time())
         write_log("Restore", "Local restore complete.")
-        return {"ok": True, "message": f"Restored {filename}"}
+        return _finished(filename, "local", {"ok": True, "message": f"Restored {filename}"})
     except Exception as e:
+        RESTORES.labels("local", "failure").inc()
         write_log("Restore", f"Restore failed: {e}")
-        return {"ok": False, "message": str(e)}
+        return _finished(filename, "local", {"ok": False, "message": str(e)})
 
 
 def restore_from_drive(filename: str):
     """Restore backup directly from Google Drive."""
-    try:
-        creds = get_credentials()
-        if not creds:
-            return {"ok": False, "message": "Drive not configured."}
-
-        service = build("drive", "v3", credentials=creds)
-        query = f"name='{filename}' and trashed=false"
-        result = service.files().list(q=query, fields="files(id, name)").execute()
-        files = result.get("files", [])
-        if not files:
-            return {"ok": False, "message": "File not found on Drive."}
-
-        file_id = files[0]["id"]
-        request = service.files().get_media(fileId=file_id)
-
-        tmpfile = tempfile.NamedTemporaryFile(delete=False)
-        downloader = MediaIoBaseDownload(tmpfile, request)
-        done = False
-        while not done:
-            status, done = downloader.next_chunk()
-        tmpfile.close()
-
-        write_log("Restore", f"Downloaded {filename} from Drive; restoring...")
-        with tarfile.open(tmpfile.name, "r:gz") as tar:
-            tar.extractall(CONFIG_DIR)
-        os.unlink(tmpfile.name)
-        write_log("Restore", "Drive restore complete.")
-        return {"ok": True, "message": f"Restored {filename} from Google Drive"}
-    except Exception as e:
-        write_log("Restore", f"Drive restore failed: {e}")
-        return {"ok": False, "message": str(e)}
+    started = time.monotonic()
+    download_started = None
+    with span("restore_from_drive", archive=filename, target=CONFIG_DIR) as run:
+        try:
+            creds = get_credentials()
+            if not creds:
+                return _finished(filename, "gdrive", {"ok": False, "message": "Drive not configured."})
+
+            with span("drive.lookup"):
+                service = build_drive_service(creds)
+                query = f"name='{filename}' and trashed=false"
+                result = service.files().list(q=query, fields="files(id, name)").execute()
+            files = result.get("files", [])
+            if not files:
+                return _finished(filename, "gdrive", {"ok": False, "message": "File not found on Drive."})
+
+            file_id = files[0]["id"]
+            request = service.files().get_media(fileId=file_id)
+
+            tmpfile = tempfile.NamedTemporaryFile(delete=False)
+            downloader = MediaIoBaseDownload(tmpfile, request, chunksize=TRANSFER_CHUNK_SIZE)
+            download_started = time.monotonic()
+            with span("drive.download") as s:
+                done = False
+                while not done:
+                    status, done = next_chunk_with_retry(downloader.next_chunk, "download")
+                    s.add("chunks", 1)
+                size = tmpfile.tell()
+                s.set("bytes", size)
+            tmpfile.close()
+            record_transfer("download", size, time.monotonic() - download_started, True)
+            download_started = None
+
+            write_log("Restore", f"Downloaded {filename} from Drive; restoring...")
+            extract_archive(tmpfile.name, CONFIG_DIR)
+            os.unlink(tmpfile.name)
+            RESTORE_DURATION.labels("gdrive").observe(time.monotonic() - started)
+            RESTORES.labels("gdrive", "success").inc()
+            LAST_SUCCESS.labels("restore").set(time.time())
+            write_log("Restore", "Drive restore complete.")
+            return _finished(filename, "gdrive", {"ok": True, "message": f"Restored {filename} from Google Drive"})
+        except Exception as e:
+            if download_started is not None:
+                record_transfer("download", 0, time.monotonic() - download_started, False)
+            RESTORES.labels("gdrive", "failure").inc()
+            run.fail(e)
+            write_log("Restore", f"Drive restore failed: {e}")
+            return _finished(filename, "gdrive", {"ok": False, "message": str(e)})
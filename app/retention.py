@@ -0,0 +1,210 @@
+import bisect
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple
+
+from config_manager import DEFAULT_CONFIG
+
+# Retention settings (config keys, defaults in DEFAULT_CONFIG). A tier set to
+# 0 is off; BACKUP_RETENTION keeps the newest N regardless of age and, as
+# before the tiers existed, falls back to its default when 0 or unset.
+TIERS = (
+    ("last", "BACKUP_RETENTION"),
+    ("hourly", "BACKUP_KEEP_HOURLY"),
+    ("daily", "BACKUP_KEEP_DAILY"),
+    ("weekly", "BACKUP_KEEP_WEEKLY"),
+    ("monthly", "BACKUP_KEEP_MONTHLY"),
+)
+SIZE_CAP_KEY = "BACKUP_MAX_TOTAL_MB"
+SETTINGS = tuple(key for _, key in TIERS) + (SIZE_CAP_KEY,)
+
+# Period each tier keeps one backup per (the newest in that period);
+# "last" keeps the newest backups whatever their age.
+_PERIODS: Dict[str, Callable[[datetime], tuple]] = {
+    "hourly": lambda dt: (dt.year, dt.month, dt.day, dt.hour),
+    "daily": lambda dt: (dt.year, dt.month, dt.day),
+    "weekly": lambda dt: dt.isocalendar()[:2],
+    "monthly": lambda dt: (dt.year, dt.month),
+}
+
+
+class Entry(NamedTuple):
+    # Sort order of the catalog: by time, then name for same-second archives.
+    timestamp: datetime
+    filename: str
+    size_bytes: int
+
+
+def policy_from_config(cfg: dict) -> Dict[str, int]:
+    policy = {}
+    for key in SETTINGS:
+        try:
+            policy[key] = max(0, int(cfg.get(key, DEFAULT_CONFIG[key]) or 0))
+        except (TypeError, ValueError):
+            policy[key] = DEFAULT_CONFIG[key]
+    if not policy["BACKUP_RETENTION"]:
+        policy["BACKUP_RETENTION"] = DEFAULT_CONFIG["BACKUP_RETENTION"]
+    return policy
+
+
+def plan(entries: List[Entry], policy: Dict[str, int], reserve_bytes: int = 0) -> dict:
+    """
+    Decide which backups to keep. `entries` must be sorted newest first.
+    reserve_bytes counts against the size cap ahead of every existing
+    backup (room for an archive about to be written).
+
+    Each tier keeps the newest backup of each of its most recent N periods
+    (hours, days, ISO weeks, months); a backup kept by any tier is kept.
+    Then, newest first, kept backups are dropped once the kept total would
+    exceed BACKUP_MAX_TOTAL_MB. The newest backup is always kept.
+    One pass over the entries per tier plus one for the size cap: O(n).
+    """
+    reasons: Dict[str, List[str]] = {}
+    for tier, key in TIERS:
+        count = policy.get(key, 0)
+        if not count:
+            continue
+        period = _PERIODS.get(tier)
+        last_period = None
+        for entry in entries:
+            if period is not None:
+                p = period(entry.timestamp)
+                if p == last_period:
+                    continue
+                last_period = p
+            reasons.setdefault(entry.filename, []).append(tier)
+            count -= 1
+            if not count:
+                break
+
+    if entries:
+        # Never leave the directory without a backup.
+        reasons.setdefault(entries[0].filename, ["newest"])
+
+    cap = policy.get(SIZE_CAP_KEY, 0) * 1024 * 1024
+    keep, delete = [], []
+    kept_bytes = reserve_bytes
+    for i, entry in enumerate(entries):
+        tiers = reasons.get(entry.filename)
+        if tiers and cap and i and kept_bytes + entry.size_bytes > cap:
+            delete.append(_describe(entry, ["size cap"]))
+            continue
+        if tiers:
+            keep.append(_describe(entry, tiers))
+            kept_bytes += entry.size_bytes
+        else:
+            delete.append(_describe(entry, []))
+
+    return {
+        "policy": dict(policy),
+        "keep": keep,
+        "delete": delete,
+        "kept_bytes": kept_bytes - reserve_bytes,
+        "freed_bytes": sum(d["size_bytes"] for d in delete),
+    }
+
+
+def _describe(entry: Entry, reasons: List[str]) -> dict:
+    return {
+        "filename": entry.filename,
+        "timestamp": entry.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+        "size_bytes": entry.size_bytes,
+        "reasons": reasons,
+    }
+
+
+class BackupCatalog:
+    """
+    Archives in the backups directory, kept sorted in memory. Backups made
+    or removed by this process update it in place; the directory is only
+    rescanned when its mtime shows that something else changed it.
+    """
+
+    def __init__(self, directory: Callable[[], str], parse: Callable[[str], datetime | None], suffix: str = ".tar.gz"):
+        self._directory = directory
+        self._parse = parse
+        self._suffix = suffix
+        self._lock = threading.Lock()
+        self._entries: List[Entry] = []  # oldest first
+        self._by_name: Dict[str, Entry] = {}
+        self._dir_mtime = None
+        self._dir = None
+
+    def _entry(self, filename: str, st: os.stat_result) -> Entry:
+        ts = self._parse(filename) or datetime.fromtimestamp(st.st_mtime)
+        return Entry(ts, filename, st.st_size)
+
+    def _dir_signature(self, directory: str):
+        try:
+            return os.stat(directory).st_mtime_ns
+        except OSError:
+            return None
+
+    def _rescan(self, directory: str):
+        entries = []
+        try:
+            with os.scandir(directory) as it:
+                for e in it:
+                    if not e.name.endswith(self._suffix):
+                        continue
+                    try:
+                        if e.is_file():
+                            entries.append(self._entry(e.name, e.stat()))
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        entries.sort()
+        self._entries = entries
+        self._by_name = {e.filename: e for e in entries}
+
+    def _sync(self) -> str:
+        directory = self._directory()
+        signature = self._dir_signature(directory)
+        if directory != self._dir or signature != self._dir_mtime or signature is None:
+            self._rescan(directory)
+            self._dir, self._dir_mtime = directory, signature
+        return directory
+
+    def _loaded(self) -> str:
+        # For our own changes the mtime is expected to move: only load the
+        # catalog if it has never been read (or the directory changed).
+        directory = self._directory()
+        if directory != self._dir:
+            self._rescan(directory)
+            self._dir = directory
+        return directory
+
+    def entries(self) -> List[Entry]:
+        """Newest first."""
+        with self._lock:
+            self._sync()
+            return self._entries[::-1]
+
+    def added(self, filename: str):
+        """Record an archive this process has just finished writing."""
+        with self._lock:
+            directory = self._loaded()
+            try:
+                st = os.stat(os.path.join(directory, filename))
+            except OSError:
+                return
+            old = self._by_name.pop(filename, None)
+            if old is not None:
+                self._entries.remove(old)
+            entry = self._entry(filename, st)
+            bisect.insort(self._entries, entry)
+            self._by_name[filename] = entry
+            self._dir_mtime = self._dir_signature(directory)
+
+    def removed(self, filename: str):
+        """Record an archive this process has just deleted."""
+        with self._lock:
+            directory = self._loaded()
+            entry = self._by_name.pop(filename, None)
+            if entry is not None:
+                i = bisect.bisect_left(self._entries, entry)
+                if i < len(self._entries) and self._entries[i] == entry:
+                    del self._entries[i]
+            self._dir_mtime = self._dir_signature(directory)
@@ -1,62 +1,243 @@
+import os
+import time
+from apscheduler.events import EVENT_JOB_MISSED
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime
 from logger import write_log
-from backup import run_backup
+from backup import run_backup, BackupResult
 from update import check_for_updates, run_security_updates
 from logger import rotate_logs
-from config_manager import load_config
+from config_manager import load_config, subscribe
 from cron_utils import describe_cron
+from job_store import SQLiteJobStore, SCHEDULER_DB_PATH
+import admission
+from resource_locks import claim, PRIORITY_SCHEDULED
 
-scheduler = BackgroundScheduler()
+# Jobs and their next run times live in SQLite, so runs missed while the
+# container was down are caught up (within each job's grace period) on start.
+job_store = SQLiteJobStore(SCHEDULER_DB_PATH)
+scheduler = BackgroundScheduler(jobstores={"default": job_store})
 jobs = {}
+_job_crons = {}
+_subscribed = False
 
+# job name -> (config key holding its cron expression, job function)
+JOB_DEFINITIONS = {
+    "backup": ("BACKUP_CRON", run_backup),
+    "security_updates": ("SECURITY_UPDATE_CRON", run_security_updates),
+    "log_rotation": ("LOG_ROTATION_CRON", rotate_logs),
+}
 
-def add_job(name: str, cron_expr: str, func):
-    """Register or update a scheduled job."""
+# Jobs held by the admission controller until the host is quiet enough.
+ADMITTED_JOBS = {"backup", "security_updates"}
+
+# Per-job misfire handling: a run later than misfire_grace_time seconds is
+# skipped (recorded as "missed"); coalesce runs several missed firings once.
+JOB_POLICIES = {
+    "backup": {"misfire_grace_time": 6 * 3600, "coalesce": True},
+    "security_updates": {"misfire_grace_time": 12 * 3600, "coalesce": True},
+    "log_rotation": {"misfire_grace_time": 3600, "coalesce": True},
+}
+
+
+def _run_job(name: str, jitter: bool = True):
+    """
+    Scheduled entry point for every job (stored by reference in SQLite).
+    Waits for admission and the job's resource locks, runs the job function
+    and records the run in the history table.
+    """
+    _, func = JOB_DEFINITIONS[name]
+    if name in ADMITTED_JOBS and not admission.wait_for_admission(name, jitter=jitter):
+        write_log("Scheduler", f"Job '{name}' cancelled while waiting for admission (shutting down)")
+        return None
+    with claim(name, priority=PRIORITY_SCHEDULED):
+        started = time.time()
+        outcome, error, nbytes = "success", None, None
+        try:
+            result = func()
+            # run_backup returns a BackupResult; update jobs return a bool.
+            if isinstance(result, BackupResult):
+                if not result.ok:
+                    outcome, error = "refused" if result.refused else "failure", result.error
+                elif result.skipped:
+                    outcome = "skipped"
+                elif os.path.isfile(result.path):
+                    nbytes = os.path.getsize(result.path)
+            elif result is False:
+                outcome = "failure"
+            return result
+        except Exception as e:
+            outcome, error = "failure", str(e)
+            raise
+        finally:
+            try:
+                job_store.record_run(name, started, time.time(), outcome, nbytes, error)
+            except Exception as e:
+                write_log("Scheduler", f"Failed to record run of '{name}': {e}")
+
+
+def run_job_now(name: str, reason: str):
+    """
+    Run a job immediately in the calling thread, outside its cron schedule
+    (e.g. a backup triggered by changes). Goes through admission (without
+    jitter), locks and run history like a scheduled run.
+    """
+    write_log("Scheduler", f"Running job '{name}' now: {reason}")
+    return _run_job(name, jitter=False)
+
+
+def _on_job_missed(event):
+    scheduled = event.scheduled_run_time.timestamp()
+    write_log("Scheduler", f"Job '{event.job_id}' missed its run at {event.scheduled_run_time} (past grace period)")
     try:
-        if name in jobs:
-            scheduler.remove_job(jobs[name].id)
+        job_store.record_run(event.job_id, scheduled, scheduled, "missed")
+    except Exception as e:
+        write_log("Scheduler", f"Failed to record missed run of '{event.job_id}': {e}")
+
+
+scheduler.add_listener(_on_job_missed, EVENT_JOB_MISSED)
+
 
+def add_job(name: str, cron_expr: str):
+    """
+    Register or update a scheduled job. A stored job with the same schedule
+    is kept, so its next run time (and a run missed while down) survives.
+    """
+    if name in jobs and _job_crons.get(name) == cron_expr:
+        return
+    policy = JOB_POLICIES.get(name, {})
+    try:
         trigger = CronTrigger.from_crontab(cron_expr)
-        job = scheduler.add_job(func, trigger, id=name, replace_existing=True)
+        existing = scheduler.get_job(name)
+        if existing is not None and str(existing.trigger) == str(trigger):
+            changes = {k: v for k, v in policy.items() if getattr(existing, k) != v}
+            if changes:
+                existing.modify(**changes)
+            jobs[name] = existing
+            _job_crons[name] = cron_expr
+            write_log("Scheduler", f"Kept stored job '{name}' ({cron_expr})")
+            return
+
+        job = scheduler.add_job(
+            _run_job, trigger, args=[name], id=name, name=name, replace_existing=True, **policy
+        )
         jobs[name] = job
+        _job_crons[name] = cron_expr
         write_log("Scheduler", f"Added job '{name}' ({cron_expr})")
     except Exception as e:
         write_log("Scheduler", f"Failed to add job '{name}': {e}")
 
 
+def remove_job(name: str):
+    """Remove a scheduled job (in memory or only in the store) if present."""
+    jobs.pop(name, None)
+    _job_crons.pop(name, None)
+    if scheduler.get_job(name) is None:
+        return
+    try:
+        scheduler.remove_job(name)
+        write_log("Scheduler", f"Removed job '{name}'")
+    except Exception:
+        pass
+
+
+def reschedule_job(name: str, cfg=None):
+    """Apply the configured cron expression for a single job."""
+    if cfg is None:
+        cfg = load_config()
+    key, _ = JOB_DEFINITIONS[name]
+    cron_expr = str(cfg.get(key) or "").strip()
+    if not cron_expr:
+        if name in jobs or scheduler.get_job(name) is not None:
+            remove_job(name)
+        else:
+            write_log("Scheduler", f"No {key} configured; job '{name}' not scheduled.")
+        return
+    add_job(name, cron_expr)
+
+
+def _on_config_change(changes):
+    """Reschedule only the jobs whose cron key changed."""
+    keys = {c.key for c in changes}
+    cfg = load_config()
+    for name, (key, _) in JOB_DEFINITIONS.items():
+        if key in keys:
+            reschedule_job(name, cfg)
+
+
 def init_scheduler():
     """Initialise scheduler with current configuration."""
+    global _subscribed
+    starting = not scheduler.running
+    if starting:
+        admission.reset()
+        # Paused until stored jobs are reconciled with the config, so a job
+        # removed from the config cannot fire from the store first.
+        scheduler.start(paused=True)
+        for job in scheduler.get_jobs():
+            if job.id not in JOB_DEFINITIONS:
+                scheduler.remove_job(job.id)
+                write_log("Scheduler", f"Removed unknown stored job '{job.id}'")
+
     cfg = load_config()
-    add_job("backup", cfg["BACKUP_CRON"], run_backup)
-    add_job("security_updates", cfg["SECURITY_UPDATE_CRON"], run_security_updates)
-    add_job("log_rotation", cfg["LOG_ROTATION_CRON"], rotate_logs)
+    for name in JOB_DEFINITIONS:
+        reschedule_job(name, cfg)
+
+    if not _subscribed:
+        subscribe(_on_config_change, keys=[key for key, _ in JOB_DEFINITIONS.values()])
+        _subscribed = True
 
-    if not scheduler.running:
-        scheduler.start()
+    if starting:
+        scheduler.resume()
         write_log("Scheduler", "Background scheduler started.")
 
 
 def reload_scheduler():
-    """Reload scheduler when config is updated."""
+    """Re-apply cron settings; unchanged jobs are left untouched."""
     write_log("Scheduler", "Reloading scheduler...")
-    for job_id in list(jobs.keys()):
-        try:
-            scheduler.remove_job(jobs[job_id].id)
-            del jobs[job_id]
-        except Exception:
-            pass
     init_scheduler()
 
 
+def shutdown_scheduler():
+    admission.stop()
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+
+
 def get_next_run_times():
     """Return dictionary of next run times and descriptions."""
     out = {}
-    for name, job in jobs.items():
-        next_run = job.next_run_time
+    for name in list(jobs):
+        job = scheduler.get_job(name)
+        next_run = job.next_run_time if job else None
         out[name] = {
             "next": next_run.strftime("%Y-%m-%d %H:%M:%S") if next_run else "—",
-            "in": describe_cron(job.trigger),
+            "in": describe_cron(_job_crons.get(name, "")),
         }
     return out
+
+
+def get_run_history(job: str | None = None, limit: int = 100, since: float | None = None) -> dict:
+    """
+    Recorded runs (newest first) plus per-job totals and duration / size
+    averages, for trending backup times.
+    """
+    runs = job_store.run_history(job=job, limit=limit, since=since)
+    summary = {}
+    for run in runs:
+        s = summary.setdefault(
+            run["job"], {"runs": 0, "success": 0, "skipped": 0, "refused": 0, "failure": 0, "missed": 0, "_durations": [], "_bytes": []}
+        )
+        s["runs"] += 1
+        s[run["outcome"]] = s.get(run["outcome"], 0) + 1
+        if run["outcome"] == "success":
+            s["_durations"].append(run["duration_seconds"])
+            if run["bytes"] is not None:
+                s["_bytes"].append(run["bytes"])
+    for s in summary.values():
+        durations, sizes = s.pop("_durations"), s.pop("_bytes")
+        s["avg_duration_seconds"] = round(sum(durations) / len(durations), 3) if durations else None
+        s["max_duration_seconds"] = max(durations) if durations else None
+        s["avg_bytes"] = int(sum(sizes) / len(sizes)) if sizes else None
+    return {"runs": runs, "summary": summary}
@@ -1,18 +1,37 @@
+import hashlib
 import os
 import json
+import threading
+import time
+import zipfile
 import requests
 from datetime import datetime, timedelta
 
 from logger import write_log
 from config_manager import load_config, save_config
+from events import publish, UPDATE_CHECKED
+from jobs import Job, start_job
 
 REPO_OWNER = "ShepC260"
 REPO_NAME = "frigate-backup-manager"
 
-# Cache state
-_LAST_UPDATE_CHECK = None
-_CACHED_UPDATE_DATA = None
+# The last check is persisted with GitHub's ETag, so restarts (and other
+# workers) reuse it and an unchanged answer comes back as a free 304.
+UPDATE_CHECK_CACHE = "/data/update_check.json"
 _CHECK_INTERVAL = timedelta(days=1)  # once per day
+# After a failed check, wait this long before asking GitHub again.
+_ERROR_RETRY_INTERVAL = timedelta(hours=1)
+
+_cache_lock = threading.Lock()
+_cache = {"mtime": None, "record": None}
+_refreshing = threading.Lock()
+
+UPDATES_DIR = "/data/updates"
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+# (connect, read) timeouts; a stalled read is retried with a Range request.
+DOWNLOAD_TIMEOUT = (10, 60)
+DOWNLOAD_ATTEMPTS = 5
+DOWNLOAD_RETRY_SECONDS = 2
 
 
 def _get_channel_url(channel: str) -> str:
@@ -30,88 +49,174 @@ def _get_channel_url(channel: str) -> str:
         return f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/commits/main"
 
 
-def _perform_real_update_check() -> dict:
+def _load_record() -> dict | None:
+    """The persisted check, re-read only when the file changed on disk."""
+    try:
+        mtime = os.stat(UPDATE_CHECK_CACHE).st_mtime_ns
+    except OSError:
+        return _cache["record"]
+    with _cache_lock:
+        if mtime != _cache["mtime"]:
+            _cache["record"] = _read_json(UPDATE_CHECK_CACHE) or None
+            _cache["mtime"] = mtime
+        return _cache["record"]
+
+
+def _save_record(record: dict):
+    with _cache_lock:
+        _cache["record"] = record
+        try:
+            os.makedirs(os.path.dirname(UPDATE_CHECK_CACHE), exist_ok=True)
+            _write_json(UPDATE_CHECK_CACHE, record)
+            _cache["mtime"] = os.stat(UPDATE_CHECK_CACHE).st_mtime_ns
+        except OSError as e:
+            write_log("Updater", f"Failed to save update check: {e}")
+
+
+def _perform_real_update_check(channel: str, record: dict | None) -> dict:
     """
-    Actually hit GitHub and get latest version info.
+    Ask GitHub for the latest version of `channel`, conditionally on the
+    ETag of the previous answer for the same channel. Returns the new
+    record to persist.
     """
-    cfg = load_config()
-    channel = cfg.get("UPDATE_CHANNEL", "main")
-
     url = _get_channel_url(channel)
+    now = time.time()
+    same_channel = bool(record) and record.get("channel") == channel
+    headers = {"Accept": "application/vnd.github+json"}
+    if same_channel and record.get("etag"):
+        headers["If-None-Match"] = record["etag"]
 
     write_log("Updater", f"Checking for updates from: {url}")
 
     try:
-        r = requests.get(url, timeout=10)
+        r = requests.get(url, headers=headers, timeout=10)
+        if r.status_code == 304:
+            write_log("Updater", "Update check: not modified")
+            return dict(record, checked_at=now, error=None, error_at=None)
         r.raise_for_status()
+        data = r.json()
     except Exception as e:
         write_log("Updater", f"GitHub request error: {e}")
-        return {
-            "ok": False,
-            "error": str(e),
-            "channel": channel,
-            "checked_at": datetime.utcnow().isoformat(),
-        }
+        base = record if same_channel else {"channel": channel, "etag": None, "remote_version": None, "checked_at": None}
+        return dict(base, error=str(e), error_at=now)
 
-    data = r.json()
-    remote_version = None
+    remote_version = data.get("tag_name") if channel == "releases" else data.get("sha")
+    return {
+        "channel": channel,
+        "etag": r.headers.get("ETag"),
+        "remote_version": remote_version,
+        "checked_at": now,
+        "error": None,
+        "error_at": None,
+    }
 
-    if channel == "releases":
-        remote_version = data.get("tag_name")
-    else:
-        remote_version = data.get("sha")
 
-    local_version = cfg.get("LOCAL_VERSION", "unknown")
+def _check_due(record: dict | None, channel: str) -> bool:
+    if not record or record.get("channel") != channel:
+        return True
+    now = time.time()
+    if record.get("error_at"):
+        return now - record["error_at"] >= _ERROR_RETRY_INTERVAL.total_seconds()
+    return not record.get("checked_at") or now - record["checked_at"] >= _CHECK_INTERVAL.total_seconds()
+
+
+def _iso(ts: float | None) -> str | None:
+    return datetime.utcfromtimestamp(ts).isoformat() if ts else None
+
 
-    result = {
+def _result(record: dict) -> dict:
+    """Public view of a record; update_available follows the current LOCAL_VERSION."""
+    local_version = load_config().get("LOCAL_VERSION", "unknown")
+    if record.get("error"):
+        return {
+            "ok": False,
+            "error": record["error"],
+            "channel": record["channel"],
+            "remote_version": record.get("remote_version"),
+            "local_version": local_version,
+            "checked_at": _iso(record.get("error_at")),
+        }
+    return {
         "ok": True,
-        "channel": channel,
-        "remote_version": remote_version,
+        "channel": record["channel"],
+        "remote_version": record.get("remote_version"),
         "local_version": local_version,
-        "update_available": remote_version != local_version,
-        "checked_at": datetime.utcnow().isoformat(),
+        "update_available": record.get("remote_version") != local_version,
+        "checked_at": _iso(record.get("checked_at")),
     }
 
+
+def _publish_update(result: dict):
+    publish(
+        UPDATE_CHECKED,
+        ok=result.get("ok", False),
+        channel=result.get("channel"),
+        remote_version=result.get("remote_version"),
+        local_version=result.get("local_version"),
+        update_available=bool(result.get("update_available")),
+    )
+
+
+def _check(channel: str) -> dict:
+    record = _perform_real_update_check(channel, _load_record())
+    _save_record(record)
+    result = _result(record)
+    _publish_update(result)
     return result
 
 
-def get_update_status() -> dict:
-    """
-    Return cached update info unless last check >1 day old.
-    """
-    global _LAST_UPDATE_CHECK, _CACHED_UPDATE_DATA
+def _refresh_in_background(channel: str):
+    if not _refreshing.acquire(blocking=False):
+        return  # a check is already running
 
-    now = datetime.utcnow()
+    def run():
+        try:
+            _check(channel)
+        except Exception as e:
+            write_log("Updater", f"Background update check failed: {e}")
+        finally:
+            _refreshing.release()
 
-    # Serve cached result
-    if _LAST_UPDATE_CHECK and _CACHED_UPDATE_DATA:
-        if now - _LAST_UPDATE_CHECK < _CHECK_INTERVAL:
-            return _CACHED_UPDATE_DATA
+    threading.Thread(target=run, name="update-check", daemon=True).start()
 
-    # Otherwise perform real check
-    result = _perform_real_update_check()
 
-    # Cache it
-    _LAST_UPDATE_CHECK = now
-    _CACHED_UPDATE_DATA = result
+def update_check_signature():
+    """Changes whenever a new check result is stored (for the status probe's watch)."""
+    _load_record()
+    with _cache_lock:
+        return _cache["mtime"], id(_cache["record"])
 
-    return result
+
+def get_update_status() -> dict:
+    """
+    Return the last update check without waiting for GitHub. A check is
+    started in the background when the stored one is older than a day
+    (an hour after a failure) or was made for another channel.
+    """
+    channel = load_config().get("UPDATE_CHANNEL", "main")
+    record = _load_record()
+    if _check_due(record, channel):
+        _refresh_in_background(channel)
+    if not record or record.get("channel") != channel:
+        return {
+            "ok": False,
+            "pending": True,
+            "error": "Update check in progress",
+            "channel": channel,
+            "remote_version": None,
+            "local_version": load_config().get("LOCAL_VERSION", "unknown"),
+            "checked_at": None,
+        }
+    return _result(record)
 
 
 def force_update_check() -> dict:
     """
     Manual override for "Check Now" button.
-    Bypasses cache and performs real request.
+    Bypasses the age check (still conditional on the ETag) and waits for the answer.
     """
-    global _LAST_UPDATE_CHECK, _CACHED_UPDATE_DATA
-
-    result = _perform_real_update_check()
-
-    # Refresh cache completely
-    _LAST_UPDATE_CHECK = datetime.utcnow()
-    _CACHED_UPDATE_DATA = result
-
-    return result
+    with _refreshing:
+        return _check(load_config().get("UPDATE_CHANNEL", "main"))
 
 
 def get_update_channel() -> str:
@@ -124,7 +229,7 @@ def set_update_channel(channel: str) -> (bool, str):
     if channel not in ["main", "releases", "dev"]:
         return False, "Invalid channel. Use: main, releases, or dev."
 
-    cfg = load_config()
+    cfg = dict(load_config())
     cfg["UPDATE_CHANNEL"] = channel
     save_config(cfg)
 
@@ -132,36 +237,182 @@ def set_update_channel(channel: str) -> (bool, str):
     return True, f"Update channel set to {channel}."
 
 
-def download_update() -> dict:
+def _read_json(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path: str, data: dict):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(path + ".tmp", path)
+
+
+def _remove(*paths: str):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _file_sha256(path: str):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h
+
+
+def _verify_zip(path: str):
+    """Check every member's CRC; raises ValueError on a corrupt archive."""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            bad = zf.testzip()
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"not a valid zip: {e}")
+    if bad is not None:
+        raise ValueError(f"CRC mismatch in {bad}")
+
+
+def _zip_url(channel: str) -> str:
+    if channel == "releases":
+        return f"https://github.com/{REPO_OWNER}/{REPO_NAME}/archive/refs/tags/latest.zip"
+    if channel == "dev":
+        return f"https://github.com/{REPO_OWNER}/{REPO_NAME}/archive/refs/heads/dev.zip"
+    return f"https://github.com/{REPO_OWNER}/{REPO_NAME}/archive/refs/heads/main.zip"
+
+
+def _fetch(url: str, dest: str, meta: dict, job: Job) -> dict:
+    """
+    Stream url into dest + ".part", resuming a previous partial download
+    with Range/If-Range when the server still has the same version.
+    Returns the new metadata, or {"unchanged": True} when the server
+    answers 304 for the complete file's ETag.
     """
-    Downloads repo ZIP for the selected channel into /data/updates/.
+    part, part_meta_path = dest + ".part", dest + ".part.json"
+    headers = {}
+    if meta.get("etag") and os.path.isfile(dest):
+        headers["If-None-Match"] = meta["etag"]
+
+    part_meta = _read_json(part_meta_path)
+    offset = os.path.getsize(part) if os.path.isfile(part) else 0
+    if offset and part_meta.get("url") == url and part_meta.get("etag"):
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = part_meta["etag"]
+    else:
+        offset = 0
+
+    with requests.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as r:
+        if r.status_code == 304:
+            return {"unchanged": True}
+        if r.status_code == 416:
+            _remove(part, part_meta_path)
+            raise requests.exceptions.RetryError("partial download no longer valid; starting over")
+        r.raise_for_status()
+        etag = r.headers.get("ETag")
+        length = r.headers.get("Content-Length")
+        if r.status_code == 206:
+            total = r.headers.get("Content-Range", "").rpartition("/")[2]
+            expected = int(total) if total.isdigit() else None
+            digest = _file_sha256(part)
+            write_log("Updater", f"Resuming download at {offset} bytes")
+            mode = "ab"
+        else:
+            # New version, or no range support: start over.
+            offset = 0
+            expected = int(length) if length and length.isdigit() else None
+            digest = hashlib.sha256()
+            mode = "wb"
+        _write_json(part_meta_path, {"url": url, "etag": etag})
+
+        done = offset
+        job.update(done=done, total=expected, message=f"Downloading {os.path.basename(dest)}")
+        with open(part, mode) as f:
+            for chunk in r.iter_content(DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                digest.update(chunk)
+                done += len(chunk)
+                job.update(done=done)
+            f.flush()
+            os.fsync(f.fileno())
+
+    if expected is not None and done != expected:
+        raise requests.exceptions.ChunkedEncodingError(f"incomplete download: {done} of {expected} bytes")
+    return {"url": url, "etag": etag, "size": done, "sha256": digest.hexdigest()}
+
+
+def download_update(sha256: str | None = None) -> dict:
+    """
+    Download the repo ZIP for the selected channel to
+    /data/updates/update_<channel>.zip. The file is streamed to a .part
+    file and renamed into place once its size, zip CRCs and (when given)
+    sha256 check out. A dropped connection resumes where it stopped; an
+    unchanged ETag skips the download. Progress is reported as an
+    "update_download" job.
     """
     cfg = load_config()
     channel = cfg.get("UPDATE_CHANNEL", "main")
+    zip_url = _zip_url(channel)
 
-    if channel == "releases":
-        zip_url = f"https://github.com/{REPO_OWNER}/{REPO_NAME}/archive/refs/tags/latest.zip"
-    elif channel == "dev":
-        zip_url = f"https://github.com/{REPO_OWNER}/{REPO_NAME}/archive/refs/heads/dev.zip"
-    else:
-        zip_url = f"https://github.com/{REPO_OWNER}/{REPO_NAME}/archive/refs/heads/main.zip"
-
-    os.makedirs("/data/updates", exist_ok=True)
-    dest = f"/data/updates/update_{channel}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.zip"
+    os.makedirs(UPDATES_DIR, exist_ok=True)
+    dest = os.path.join(UPDATES_DIR, f"update_{channel}.zip")
+    meta_path = dest + ".json"
+    meta = _read_json(meta_path) if os.path.isfile(dest) else {}
+    job = start_job("update_download", channel=channel, url=zip_url)
 
     write_log("Updater", f"Downloading update from {zip_url}")
 
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            result = _fetch(zip_url, dest, meta, job)
+        except requests.RequestException as e:
+            if attempt >= DOWNLOAD_ATTEMPTS or (e.response is not None and e.response.status_code < 500):
+                return _download_failed(job, dest, e)
+            write_log("Updater", f"Download interrupted ({e}); retrying ({attempt}/{DOWNLOAD_ATTEMPTS})")
+            time.sleep(DOWNLOAD_RETRY_SECONDS * attempt)
+            continue
+        except Exception as e:
+            return _download_failed(job, dest, e)
+        if not result.get("unchanged"):
+            break
+        if os.path.getsize(dest) == meta.get("size"):
+            msg = f"Already up to date: {dest}"
+            write_log("Updater", msg)
+            job.finish(True, message=msg)
+            return {"ok": True, "file": dest, "unchanged": True, "job": job.id, "message": msg}
+        # Local copy damaged: fetch it again without the ETag.
+        write_log("Updater", f"{dest} does not match its recorded size; downloading again")
+        _remove(meta_path)
+        meta = {}
+
+    part = dest + ".part"
     try:
-        r = requests.get(zip_url, timeout=20)
-        r.raise_for_status()
+        if sha256 and result["sha256"] != sha256.lower():
+            raise ValueError(f"sha256 mismatch: got {result['sha256']}")
+        _verify_zip(part)
+    except Exception as e:
+        # Corrupt, not resumable: drop the partial file.
+        _remove(part, dest + ".part.json")
+        return _download_failed(job, dest, e)
 
-        with open(dest, "wb") as f:
-            f.write(r.content)
+    os.replace(part, dest)
+    _write_json(meta_path, dict(result, downloaded_at=datetime.utcnow().isoformat()))
+    _remove(dest + ".part.json")
 
-        write_log("Updater", f"Update downloaded to {dest}")
+    msg = f"Downloaded to {dest}"
+    write_log("Updater", f"Update downloaded to {dest} ({result['size']} bytes, sha256 {result['sha256']})")
+    job.finish(True, message=msg)
+    return {"ok": True, "file": dest, "sha256": result["sha256"], "size": result["size"], "job": job.id, "message": msg}
 
-        return {"ok": True, "file": dest, "message": f"Downloaded to {dest}"}
 
-    except Exception as e:
-        write_log("Updater", f"Update download failed: {e}")
-        return {"ok": False, "error": str(e), "message": f"Download failed: {e}"}
+def _download_failed(job: Job, dest: str, e: Exception) -> dict:
+    write_log("Updater", f"Update download failed: {e}")
+    job.finish(False, error=str(e))
+    resumable = os.path.isfile(dest + ".part")
+    return {"ok": False, "error": str(e), "resumable": resumable, "job": job.id, "message": f"Download failed: {e}"}
@@ -29,80 +29,7 @@ async function loadStatus() {
   try {
     const res = await fetch("/api/status");
     if (!res.ok) throw new Error("HTTP " + res.status);
-    const data = await res.json();
-    const sys = data.system || {};
-    const drive = data.drive || {};
-    const upd = data.update || {};
-
-    const systemEl = document.getElementById("systemStatusContainer");
-    const timeEl = document.getElementById("statusTime");
-
-    const frigateIcon = sys.frigate_ok
-      ? '<span class="badge badge-green">Frigate ✓</span>'
-      : '<span class="badge badge-red">Frigate ✖</span>';
-
-    const coralIcon = sys.coral_ok
-      ? '<span class="badge badge-green">Coral ✓</span>'
-      : '<span class="badge badge-red">Coral ✖</span>';
-
-    let driveBadge = "";
-    if (!drive.enabled) {
-      driveBadge = '<span class="badge badge-grey">Drive: Off</span>';
-    } else if (!drive.configured) {
-      driveBadge = '<span class="badge badge-yellow">Drive: Not configured</span>';
-    } else {
-      driveBadge = '<span class="badge badge-green">Drive: Connected</span>';
-    }
-
-    let updateBadge = "";
-    if (upd.available) {
-      updateBadge = '<span class="badge badge-yellow">Update available</span>';
-    } else {
-      updateBadge = '<span class="badge badge-green">Up to date</span>';
-    }
-
-    const restartBadge = sys.restart_required
-      ? '<span class="badge badge-yellow">Restart recommended</span>'
-      : "";
-
-    systemEl.innerHTML = `
-      <div class="system-row">
-        <span class="system-label">Hostname</span>
-        <span class="system-value">${sys.hostname || "-"}</span>
-      </div>
-      <div class="system-row">
-        <span class="system-label">OS</span>
-        <span class="system-value">${sys.os || "-"}</span>
-      </div>
-      <div class="system-row">
-        <span class="system-label">Frigate</span>
-        <span class="system-value">${frigateIcon}</span>
-      </div>
-      <div class="system-row">
-        <span class="system-label">Coral</span>
-        <span class="system-value">${coralIcon}</span>
-      </div>
-      <div class="system-row">
-        <span class="system-label">Google Drive</span>
-        <span class="system-value">${driveBadge}</span>
-      </div>
-      <div class="system-row">
-        <span class="system-label">Updates</span>
-        <span class="system-value">${updateBadge}</span>
-      </div>
-      <div class="system-row">
-        <span class="system-label">Status</span>
-        <span class="system-value">${restartBadge || "-"}</span>
-      </div>
-    `;
-
-    timeEl.textContent = "Updated: " + (data.timestamp || "");
-
-    // Sync header toggle with current Drive enabled state
-    const toggle = document.getElementById("gdriveToggle");
-    if (toggle) {
-      toggle.checked = !!drive.enabled;
-    }
+    renderStatus(await res.json());
   } catch (e) {
     console.error(e);
     document.getElementById("systemStatusContainer").innerHTML =
@@ -110,6 +37,82 @@ async function loadStatus() {
   }
 }
 
+function renderStatus(data) {
+  const sys = data.system || {};
+  const drive = data.drive || {};
+  const upd = data.update || {};
+
+  const systemEl = document.getElementById("systemStatusContainer");
+  const timeEl = document.getElementById("statusTime");
+
+  const frigateIcon = sys.frigate_ok
+    ? '<span class="badge badge-green">Frigate ✓</span>'
+    : '<span class="badge badge-red">Frigate ✖</span>';
+
+  const coralIcon = sys.coral_ok
+    ? '<span class="badge badge-green">Coral ✓</span>'
+    : '<span class="badge badge-red">Coral ✖</span>';
+
+  let driveBadge = "";
+  if (!drive.enabled) {
+    driveBadge = '<span class="badge badge-grey">Drive: Off</span>';
+  } else if (!drive.configured) {
+    driveBadge = '<span class="badge badge-yellow">Drive: Not configured</span>';
+  } else {
+    driveBadge = '<span class="badge badge-green">Drive: Connected</span>';
+  }
+
+  let updateBadge = "";
+  if (upd.available) {
+    updateBadge = '<span class="badge badge-yellow">Update available</span>';
+  } else {
+    updateBadge = '<span class="badge badge-green">Up to date</span>';
+  }
+
+  const restartBadge = sys.restart_required
+    ? '<span class="badge badge-yellow">Restart recommended</span>'
+    : "";
+
+  systemEl.innerHTML = `
+    <div class="system-row">
+      <span class="system-label">Hostname</span>
+      <span class="system-value">${sys.hostname || "-"}</span>
+    </div>
+    <div class="system-row">
+      <span class="system-label">OS</span>
+      <span class="system-value">${sys.os || "-"}</span>
+    </div>
+    <div class="system-row">
+      <span class="system-label">Frigate</span>
+      <span class="system-value">${frigateIcon}</span>
+    </div>
+    <div class="system-row">
+      <span class="system-label">Coral</span>
+      <span class="system-value">${coralIcon}</span>
+    </div>
+    <div class="system-row">
+      <span class="system-label">Google Drive</span>
+      <span class="system-value">${driveBadge}</span>
+    </div>
+    <div class="system-row">
+      <span class="system-label">Updates</span>
+      <span class="system-value">${updateBadge}</span>
+    </div>
+    <div class="system-row">
+      <span class="system-label">Status</span>
+      <span class="system-value">${restartBadge || "-"}</span>
+    </div>
+  `;
+
+  timeEl.textContent = "Updated: " + (data.timestamp || "");
+
+  // Sync header toggle with current Drive enabled state
+  const toggle = document.getElementById("gdriveToggle");
+  if (toggle) {
+    toggle.checked = !!drive.enabled;
+  }
+}
+
 // -------- Backups --------
 
 function formatSize(bytes) {
@@ -232,13 +235,90 @@ async function runSystemAction(action) {
   }
 }
 
+// -------- Live events --------
+
+let eventsConnected = false;
+let eventsSeq = 0;
+let eventsRetryMs = 1000;
+
+function handleEvent(ev) {
+  const d = ev.data || {};
+  switch (ev.type) {
+    case "backup.finished":
+      if (d.skipped) {
+        updateLastOutput(`No changes since last backup: ${d.archive}`);
+      } else {
+        updateLastOutput(d.ok ? `Backup finished: ${d.archive}` : `Backup failed: ${d.error || d.archive}`);
+      }
+      loadBackups();
+      break;
+    case "upload.finished":
+      updateLastOutput(d.ok ? `Uploaded to Google Drive: ${d.archive}` : `Drive upload failed: ${d.error || d.archive}`);
+      loadBackups();
+      break;
+    case "restore.finished":
+      updateLastOutput(d.ok ? `Restore finished: ${d.archive}` : `Restore failed: ${d.message || d.archive}`);
+      loadStatus();
+      break;
+    case "job.progress":
+      if (d.state === "running" && d.total) {
+        const eta = d.eta_seconds != null ? `, about ${Math.ceil(d.eta_seconds)}s left` : "";
+        updateLastOutput(`${d.message || d.kind}: ${d.percent}%${eta}`);
+      }
+      break;
+    case "restart.required":
+    case "update.checked":
+      loadStatus();
+      break;
+  }
+}
+
+function connectEvents() {
+  const proto = location.protocol === "https:" ? "wss:" : "ws:";
+  let ws;
+  try {
+    ws = new WebSocket(`${proto}//${location.host}/api/events`);
+  } catch (e) {
+    setTimeout(connectEvents, eventsRetryMs);
+    return;
+  }
+  ws.onopen = () => {
+    eventsConnected = true;
+    eventsRetryMs = 1000;
+  };
+  ws.onmessage = (msg) => {
+    const ev = JSON.parse(msg.data);
+    if (ev.type === "snapshot") {
+      eventsSeq = ev.seq;
+      if (ev.state && ev.state.status) renderStatus(ev.state.status);
+      loadBackups();
+      return;
+    }
+    // Events already covered by the snapshot can arrive once more right after it.
+    if (ev.seq <= eventsSeq) return;
+    eventsSeq = ev.seq;
+    handleEvent(ev);
+  };
+  ws.onclose = () => {
+    eventsConnected = false;
+    setTimeout(connectEvents, eventsRetryMs);
+    eventsRetryMs = Math.min(eventsRetryMs * 2, 60000);
+  };
+}
+
 // -------- Init --------
 
 loadStatus();
 loadBackups();
+connectEvents();
 
-// Check system status every 5 minutes
+// Frigate / Coral / Drive health is not pushed; refresh it every 5 minutes.
 setInterval(loadStatus, 300000);
 
-// Refresh backups list every 5 minutes
-setInterval(loadBackups, 300000);
+// Fallback polling while the event socket is down.
+setInterval(() => {
+  if (!eventsConnected) {
+    loadStatus();
+    loadBackups();
+  }
+}, 30000);
@@ -127,6 +127,10 @@ async function loadUpdateModal() {
     const data = await res.json();
     const body = document.getElementById("updateModalBody");
 
+    if (data.pending) {
+      body.innerHTML = `<p>Checking for updates...</p>`;
+      return;
+    }
     if (!data.ok) {
       body.innerHTML = `<p class="error">Update check failed: ${data.error || "Unknown error"}</p>`;
       return;
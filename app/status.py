@@ -1,14 +1,17 @@
-import subprocess
 import platform
 from datetime import datetime
+import commands
+from hardware import inventory
 from logger import write_log
 
 
 def get_os_version():
     """Return OS version string."""
     try:
-        out = subprocess.getoutput("lsb_release -ds")
-        return out.strip().replace('"', "")
+        result = commands.run_sync(["lsb_release", "-ds"], timeout=5)
+        if not result.ok:
+            return platform.platform()
+        return result.stdout.replace('"', "")
     except Exception:
         return platform.platform()
 
@@ -16,7 +19,9 @@ def get_os_version():
 def get_frigate_version():
     """Detect Frigate version via Docker image or CLI."""
     try:
-        out = subprocess.getoutput("docker ps --filter 'name=frigate' --format '{{.Image}}'")
+        out = commands.run_sync(
+            ["docker", "ps", "--filter", "name=frigate", "--format", "{{.Image}}"], timeout=10
+        ).stdout
         if not out:
             return "Not running"
         image = out.strip()
@@ -28,11 +33,13 @@ def get_frigate_version():
 
 
 def get_coral_status():
-    """Detect if Coral TPU is available."""
+    """Detect if Coral TPU is available (PCIe/M.2 cards only with their driver loaded)."""
     try:
-        out = subprocess.getoutput("ls /dev/apex* 2>/dev/null")
-        if out.strip():
+        coral = inventory.coral()
+        if coral["ready"]:
             return "Detected"
+        if coral["detected"]:
+            return "Driver not loaded"
         return "Not detected"
     except Exception:
         return "Unknown"
@@ -0,0 +1,186 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from logger import write_log
+
+# Worker threads for probe refreshes; a slow probe (Drive) never delays the
+# others beyond this.
+MAX_WORKERS = 4
+# How often `watch` functions are polled for changes.
+WATCH_INTERVAL_SECONDS = 1.0
+
+_UNSET = object()
+
+
+class Probe:
+    """
+    One status source. `func` produces the value; it is re-run every
+    `interval` seconds and whenever `watch()` returns something different
+    from last time (e.g. a token file's mtime).
+    """
+
+    def __init__(self, name: str, func: Callable[[], Any], interval: float, default: Any = None, watch: Callable[[], Any] | None = None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.default = default
+        self.watch = watch
+        self.watch_value = _UNSET
+        self.value = default
+        self.updated_at = None  # monotonic time of last success
+        self.updated_wall = None
+        self.last_error = None
+        self.last_error_at = None
+        self.duration_ms = None
+        self.next_due = 0.0
+        self.pending = None  # Future of the in-flight refresh
+        self.dirty = False  # watch changed while a refresh was running
+        self.version = 0  # bumped when value or last_error changes
+
+
+class StatusCollector:
+    """
+    Refreshes registered probes in the background and serves the latest
+    values from memory. Concurrent refresh requests for the same probe share
+    a single in-flight run.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._probes: Dict[str, Probe] = {}
+        self._executor = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def register(self, name: str, func: Callable[[], Any], interval: float, default: Any = None, watch: Callable[[], Any] | None = None):
+        with self._lock:
+            self._probes[name] = Probe(name, func, interval, default, watch)
+        self._wake.set()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="status-probe")
+            self._thread = threading.Thread(target=self._run, name="status-collector", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # ---- reading ----
+
+    def value(self, name: str) -> Any:
+        probe = self._probes.get(name)
+        return probe.value if probe else None
+
+    def version(self, name: str | None = None):
+        """
+        Change counter of one probe, or a tuple covering all probes. Cheap
+        enough to use as a cache key for responses built from the values.
+        """
+        if name is not None:
+            probe = self._probes.get(name)
+            return probe.version if probe else 0
+        return tuple(p.version for p in list(self._probes.values()))
+
+    def probe_info(self) -> Dict[str, dict]:
+        """Age, refresh duration and last error of every probe."""
+        now = time.monotonic()
+        out = {}
+        for name, p in list(self._probes.items()):
+            out[name] = {
+                "age_seconds": round(now - p.updated_at, 1) if p.updated_at is not None else None,
+                "updated_at": p.updated_wall,
+                "interval_seconds": p.interval,
+                "duration_ms": p.duration_ms,
+                "refreshing": p.pending is not None,
+                "last_error": p.last_error,
+                "last_error_at": p.last_error_at,
+            }
+        return out
+
+    # ---- refreshing ----
+
+    def refresh(self, name: str | None = None) -> Future | None:
+        """
+        Start a refresh of one probe (or all when name is None) unless one is
+        already running, and return its Future.
+        """
+        if name is None:
+            for probe_name in list(self._probes):
+                self.refresh(probe_name)
+            return None
+        with self._lock:
+            probe = self._probes.get(name)
+            if probe is None or self._executor is None:
+                return None
+            if probe.pending is None:
+                probe.pending = self._executor.submit(self._refresh_probe, probe)
+            return probe.pending
+
+    def _refresh_probe(self, probe: Probe):
+        started = time.monotonic()
+        try:
+            value = probe.func()
+        except Exception as e:
+            with self._lock:
+                if probe.last_error != str(e):
+                    probe.version += 1
+                probe.last_error = str(e)
+                probe.last_error_at = time.strftime("%Y-%m-%d %H:%M:%S")
+            write_log("Status", f"Probe '{probe.name}' failed: {e}")
+        else:
+            with self._lock:
+                if value != probe.value or probe.last_error is not None:
+                    probe.version += 1
+                probe.value = value
+                probe.updated_at = time.monotonic()
+                probe.updated_wall = time.strftime("%Y-%m-%d %H:%M:%S")
+                probe.last_error = None
+        finally:
+            with self._lock:
+                probe.duration_ms = round((time.monotonic() - started) * 1000, 1)
+                probe.next_due = 0.0 if probe.dirty else time.monotonic() + probe.interval
+                probe.dirty = False
+                probe.pending = None
+            self._wake.set()
+
+    def _watch_changed(self, probe: Probe) -> bool:
+        try:
+            current = probe.watch()
+        except Exception:
+            return False
+        previous, probe.watch_value = probe.watch_value, current
+        return previous is not _UNSET and previous != current
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            wait = WATCH_INTERVAL_SECONDS
+            for probe in list(self._probes.values()):
+                due = now >= probe.next_due
+                if probe.watch and self._watch_changed(probe):
+                    due = True
+                    if probe.pending is not None:
+                        # The running refresh may have read the old state.
+                        probe.dirty = True
+                if due:
+                    self.refresh(probe.name)
+                elif probe.pending is None:
+                    wait = min(wait, probe.next_due - now)
+            self._wake.wait(max(0.05, wait))
+            self._wake.clear()
+
+
+collector = StatusCollector()
@@ -0,0 +1,251 @@
+import contextvars
+import os
+import queue
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+import requests
+
+from logger import write_log
+
+# Completed top-level runs (a root span and its children) kept for the API.
+MAX_RUNS = 50
+# Spans per run beyond this are dropped (counted in `dropped_spans`).
+MAX_SPANS_PER_RUN = 500
+
+# Optional OTLP/HTTP (JSON) export, e.g. http://127.0.0.1:4318 for a local
+# OpenTelemetry collector. Uses the standard OpenTelemetry variable names.
+OTLP_ENDPOINT_ENV = "OTEL_EXPORTER_OTLP_ENDPOINT"
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "frigate-backup-manager")
+
+_current = contextvars.ContextVar("current_span", default=None)
+_runs = deque(maxlen=MAX_RUNS)
+_runs_lock = threading.Lock()
+_run_listeners: List[Callable[["Span"], None]] = []
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent", "start_ns", "end_ns", "attributes", "status", "error", "_trace")
+
+    def __init__(self, name: str, parent: "Span | None", attributes: Dict[str, Any]):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes)
+        self.status = "ok"
+        self.error = None
+        # Shared by every span of one run: {"spans": [...], "dropped": n}
+        self._trace = parent._trace if parent else {"spans": [], "dropped": 0}
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def add(self, key: str, amount: float):
+        """Accumulate a numeric attribute (bytes moved, seconds in a phase, ...)."""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def fail(self, error: Any):
+        self.status = "error"
+        self.error = str(error)
+
+    @property
+    def duration_ms(self) -> float | None:
+        if self.end_ns is None:
+            return None
+        return round((self.end_ns - self.start_ns) / 1e6, 3)
+
+    def to_dict(self, origin_ns: int) -> dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "offset_ms": round((self.start_ns - origin_ns) / 1e6, 3),
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": dict(self.attributes),
+        }
+
+
+class _NoopSpan:
+    """Returned by current_span() outside any span, so callers need no checks."""
+
+    def set(self, key, value):
+        pass
+
+    def add(self, key, amount):
+        pass
+
+    def fail(self, error):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def current_span():
+    return _current.get() or _NOOP
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a block as a span. Nested calls become children; when the outermost
+    span ends, the whole run is stored (and exported when configured).
+    Exceptions mark the span as failed and propagate.
+    """
+    parent = _current.get()
+    s = Span(name, parent, attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.fail(e)
+        raise
+    finally:
+        s.end_ns = time.time_ns()
+        _current.reset(token)
+        trace = s._trace
+        if len(trace["spans"]) < MAX_SPANS_PER_RUN:
+            trace["spans"].append(s)
+        else:
+            trace["dropped"] += 1
+        if parent is None:
+            _finish_run(s, trace)
+
+
+def add_run_listener(callback: Callable[[Span], None]):
+    """Call callback(root_span) whenever a top-level run finishes."""
+    _run_listeners.append(callback)
+
+
+def _finish_run(root: Span, trace: dict):
+    spans = sorted(trace["spans"], key=lambda sp: sp.start_ns)
+    with _runs_lock:
+        _runs.append((root, spans, trace["dropped"]))
+    for callback in list(_run_listeners):
+        try:
+            callback(root)
+        except Exception as e:
+            write_log("Tracing", f"Run listener failed: {e}")
+    _exporter.submit(spans)
+
+
+def recent_runs(limit: int = 20, name: str | None = None) -> List[dict]:
+    """Most recent runs first, each with its spans in start order."""
+    with _runs_lock:
+        runs = list(_runs)
+    out = []
+    for root, spans, dropped in reversed(runs):
+        if name and root.name != name:
+            continue
+        out.append(
+            {
+                "trace_id": root.trace_id,
+                "name": root.name,
+                "started_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(root.start_ns / 1e9)),
+                "duration_ms": root.duration_ms,
+                "status": root.status,
+                "error": root.error,
+                "attributes": dict(root.attributes),
+                "spans": [sp.to_dict(root.start_ns) for sp in spans],
+                "dropped_spans": dropped,
+            }
+        )
+        if len(out) >= limit:
+            break
+    return out
+
+
+# ---- OTLP export ----
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_payload(spans: List[Span]) -> dict:
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "frigate-backup-manager"},
+                        "spans": [
+                            {
+                                "traceId": sp.trace_id,
+                                "spanId": sp.span_id,
+                                "parentSpanId": sp.parent.span_id if sp.parent else "",
+                                "name": sp.name,
+                                "kind": 1,  # SPAN_KIND_INTERNAL
+                                "startTimeUnixNano": str(sp.start_ns),
+                                "endTimeUnixNano": str(sp.end_ns),
+                                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in sp.attributes.items()],
+                                "status": {"code": 2, "message": sp.error or ""} if sp.status == "error" else {"code": 1},
+                            }
+                            for sp in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class _Exporter:
+    """Posts finished runs to an OTLP/HTTP collector from a background thread."""
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=100)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._warned = False
+
+    def _endpoint(self) -> str | None:
+        endpoint = os.getenv(OTLP_ENDPOINT_ENV, "").strip().rstrip("/")
+        return f"{endpoint}/v1/traces" if endpoint else None
+
+    def submit(self, spans: List[Span]):
+        if not self._endpoint():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            pass
+
+    def _run(self):
+        while True:
+            spans = self._queue.get()
+            url = self._endpoint()
+            if not url:
+                continue
+            try:
+                r = requests.post(url, json=_otlp_payload(spans), timeout=5)
+                r.raise_for_status()
+                self._warned = False
+            except Exception as e:
+                # Log once per outage, not once per run.
+                if not self._warned:
+                    write_log("Tracing", f"OTLP export to {url} failed: {e}")
+                    self._warned = True
+
+
+_exporter = _Exporter()
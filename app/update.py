@@ -1,13 +1,17 @@
-import subprocess
 from datetime import datetime
 from logger import write_log
+from jobs import start_job
+import commands
 
 
-def run_command(cmd: str):
-    """Run a shell command and return (stdout, stderr, returncode)."""
+def run_command(cmd: str, timeout: float = commands.DEFAULT_TIMEOUT, component: str | None = None, on_line=None):
+    """
+    Run a shell command and return (stdout, stderr, returncode).
+    Blocking; for scheduler jobs and other worker threads.
+    """
     try:
-        proc = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        return proc.stdout.strip(), proc.stderr.strip(), proc.returncode
+        result = commands.run_sync(cmd, shell=True, timeout=timeout, component=component, on_line=on_line)
+        return result.stdout, result.stderr, result.returncode
     except Exception as e:
         return "", str(e), 1
 
@@ -30,32 +34,46 @@ def check_for_updates():
 
 
 def run_security_updates():
-    """Install only security updates automatically."""
+    """Install only security updates automatically. apt output goes to a "security_updates" job."""
     write_log("Update", "Running automatic security updates...")
-    out, err, code = run_command("apt-get update")
+    job = start_job("security_updates", unit="lines")
+    job.update(message="Refreshing package lists")
+    out, err, code = run_command("apt-get update", on_line=lambda s, l: job.log(l))
     if code != 0:
         write_log("Update", f"Failed to update package list: {err or out}")
+        job.finish(False, error=f"apt-get update failed: {err or out}")
         return False
 
     # Use unattended-upgrades for security packages
-    out, err, code = run_command("unattended-upgrade -v")
+    job.update(message="Installing security updates")
+    out, err, code = run_command(
+        "unattended-upgrade -v", timeout=3600, component="Update", on_line=lambda s, l: job.log(l)
+    )
     if code == 0:
         write_log("Update", "Security updates applied successfully.")
+        job.finish(True, message="Security updates applied")
         return True
     else:
         write_log("Update", f"Security update failed: {err or out}")
+        job.finish(False, error=err or out)
         return False
 
 
 def run_full_update():
-    """Run a full OS upgrade manually (user-initiated)."""
+    """Run a full OS upgrade manually (user-initiated). apt output goes to an "os_update" job."""
     write_log("Update", "Performing full system update...")
-    out, err, code = run_command("apt-get update && apt-get upgrade -y")
+    job = start_job("os_update", unit="lines")
+    job.update(message="apt-get update && apt-get upgrade -y")
+    out, err, code = run_command(
+        "apt-get update && apt-get upgrade -y", timeout=3600, component="Update", on_line=lambda s, l: job.log(l)
+    )
     if code == 0:
         write_log("Update", "System updated successfully.")
+        job.finish(True, message="System updated")
         return True
     else:
         write_log("Update", f"Full update failed: {err or out}")
+        job.finish(False, error=err or out)
         return False
 
 
@@ -70,7 +88,7 @@ def update_frigate():
     image_name = out.strip()
     write_log("Update", f"Found Frigate container image: {image_name}")
     write_log("Update", "Pulling latest image...")
-    pull_out, pull_err, pull_code = run_command(f"docker pull {image_name}")
+    pull_out, pull_err, pull_code = run_command(f"docker pull {image_name}", timeout=1800)
     if pull_code != 0:
         write_log("Update", f"Failed to pull image: {pull_err or pull_out}")
         return False
@@ -1,25 +1,32 @@
-import subprocess
-
+import commands
+from jobs import start_job
 from logger import write_log
 
 
-def update_os() -> bool:
+async def update_os() -> bool:
     """
     Run an OS update inside the container.
     NOTE: This updates the container image runtime, not Debian on the host.
+    apt output is streamed into the log and an "os_update" job as it runs.
     """
+    job = start_job("os_update", unit="lines")
     try:
         write_log("Update", "Starting OS update (apt-get update && apt-get -y upgrade)...")
-        result = subprocess.run(
+        job.update(message="apt-get update && apt-get -y upgrade")
+        result = await commands.run(
             ["bash", "-lc", "apt-get update && apt-get -y upgrade"],
-            capture_output=True,
-            text=True,
+            timeout=3600,
+            component="Update",
+            on_line=lambda s, l: job.log(l),
         )
-        if result.returncode != 0:
+        if not result.ok:
             write_log("Update", f"OS update failed: {result.stderr}")
+            job.finish(False, error=result.stderr or result.stdout)
             return False
         write_log("Update", "OS update completed successfully.")
+        job.finish(True, message="OS update completed")
         return True
     except Exception as e:
         write_log("Update", f"Exception during OS update: {e}")
+        job.finish(False, error=str(e))
         return False
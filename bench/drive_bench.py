@@ -0,0 +1,272 @@
+"""
+End-to-end Drive benchmark against the offline fake server.
+
+Runs the real gdrive_sync / restore code (no mocks) against bench/fake_drive.py
+and reports throughput, request counts and tail latency for upload, listing
+and restore.
+
+    python bench/drive_bench.py --files 10 --size 4M --latency 0.03 --bandwidth 8M
+    python bench/drive_bench.py --error-rate 0.05 --json
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tarfile
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "app"))
+sys.path.insert(0, HERE)
+
+from fake_drive import FakeDriveServer, _percentile  # noqa: E402
+
+
+def _parse_size(value: str) -> int:
+    value = value.strip().upper()
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def _configure_sandbox(root: str, endpoint: str):
+    """
+    Point the app modules at a throwaway directory tree and the fake server.
+    """
+    import config_manager
+    import logger
+    import backup
+    import restore
+
+    data_dir = os.path.join(root, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    config_manager.CONFIG_PATH = os.path.join(data_dir, "config.json")
+    logger.LOG_DIR = os.path.join(root, "logs")
+    logger.LOG_FILE = os.path.join(logger.LOG_DIR, "manager.log")
+    backup.BACKUP_DIR = os.path.join(root, "backups")
+    restore.BACKUP_DIR = backup.BACKUP_DIR
+    restore.CONFIG_DIR = os.path.join(root, "restored")
+
+    token_path = os.path.join(data_dir, "drive_token.json")
+    with open(token_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "token": "bench-token",
+                "refresh_token": "bench-refresh",
+                "client_id": "bench-client",
+                "client_secret": "bench-secret",
+                "expiry": "2099-01-01T00:00:00Z",
+            },
+            f,
+        )
+
+    cfg = dict(config_manager.load_config())
+    cfg["GDRIVE_ENABLED"] = True
+    cfg["GDRIVE_TOKEN_PATH"] = token_path
+    cfg["BACKUP_PATHS"] = [restore.CONFIG_DIR]
+    config_manager.save_config(cfg)
+    os.environ["GDRIVE_API_ENDPOINT"] = endpoint
+
+
+def _make_backup(path: str, size: int):
+    """Write a valid tar.gz holding `size` bytes of incompressible data."""
+    payload = os.urandom(size)
+    with tarfile.open(path, "w:gz", compresslevel=1) as tar:
+        info = tarfile.TarInfo("config/payload.bin")
+        info.size = len(payload)
+        tar.addfile(info, io.BytesIO(payload))
+
+
+def _summarize(name: str, latencies: list, nbytes: int, failures: int) -> dict:
+    total = sum(latencies)
+    return {
+        "operation": name,
+        "count": len(latencies),
+        "failures": failures,
+        "bytes": nbytes,
+        "throughput_mb_s": round(nbytes / total / (1024 * 1024), 3) if total and nbytes else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def _batch_presence(gdrive_sync, names: list):
+    """Presence check for `names` using a single Drive batch request."""
+    found = {}
+
+    def _collect(request_id, response, exception):
+        if exception is None:
+            found[request_id] = bool(response.get("files"))
+
+    try:
+        service = gdrive_sync._get_drive_service()
+        batch = gdrive_sync.new_batch_request(service, callback=_collect)
+        for name in names:
+            q = f"name = '{name}' and trashed = false"
+            batch.add(service.files().list(q=q, fields="files(id,name)", pageSize=1), request_id=name)
+        batch.execute()
+        return found
+    except Exception:
+        return None
+
+
+def run_bench(args) -> dict:
+    server = FakeDriveServer(
+        latency=args.latency,
+        jitter=args.jitter,
+        bandwidth=args.bandwidth,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    ).start()
+
+    with tempfile.TemporaryDirectory(prefix="drive-bench-") as root:
+        _configure_sandbox(root, server.url)
+
+        import backup
+        import gdrive_sync
+        import logger
+        import restore
+
+        os.makedirs(backup.BACKUP_DIR, exist_ok=True)
+        results = {}
+        server_stats = {}
+
+        # ---- upload ----
+        names = []
+        for i in range(args.files):
+            name = f"frigate_config_2025-01-01_00-00-{i:02d}.tar.gz"
+            _make_backup(os.path.join(backup.BACKUP_DIR, name), args.size)
+            names.append(name)
+
+        latencies, nbytes, failures = [], 0, 0
+        for name in names:
+            path = os.path.join(backup.BACKUP_DIR, name)
+            ok, elapsed = _timed(gdrive_sync.upload_backup_to_drive, path)
+            latencies.append(elapsed)
+            if ok:
+                nbytes += os.path.getsize(path)
+            else:
+                failures += 1
+        results["upload"] = _summarize("upload", latencies, nbytes, failures)
+        server_stats["upload"] = server.state.stats()
+        server.state.reset_stats()
+
+        # ---- listing ----
+        for i in range(args.extra_remote):
+            server.state.add_file(f"frigate_config_2024-06-01_00-00-{i:04d}.tar.gz", b"")
+
+        latencies, failures = [], 0
+        for _ in range(args.list_rounds):
+            index, elapsed = _timed(gdrive_sync.list_drive_backups, names)
+            latencies.append(elapsed)
+            if sum(1 for v in index.values() if v) < len(names) - results["upload"]["failures"]:
+                failures += 1
+        results["presence_check"] = _summarize("presence_check", latencies, 0, failures)
+
+        latencies, failures = [], 0
+        expected = args.files - results["upload"]["failures"] + args.extra_remote
+        for _ in range(args.list_rounds):
+            listed, elapsed = _timed(restore.list_backups, "gdrive")
+            latencies.append(elapsed)
+            if len(listed) != expected:
+                failures += 1
+        results["full_listing"] = _summarize("full_listing", latencies, 0, failures)
+
+        latencies, failures = [], 0
+        for _ in range(args.list_rounds):
+            found, elapsed = _timed(_batch_presence, gdrive_sync, names)
+            latencies.append(elapsed)
+            if found is None:
+                failures += 1
+        results["batch_presence"] = _summarize("batch_presence", latencies, 0, failures)
+        server_stats["listing"] = server.state.stats()
+        server.state.reset_stats()
+
+        # ---- restore ----
+        latencies, nbytes, failures = [], 0, 0
+        uploaded = [n for n in names if os.path.exists(os.path.join(backup.BACKUP_DIR, n))]
+        for name in uploaded[: args.restores]:
+            result, elapsed = _timed(restore.restore_from_drive, name)
+            latencies.append(elapsed)
+            if result.get("ok"):
+                nbytes += os.path.getsize(os.path.join(backup.BACKUP_DIR, name))
+            else:
+                failures += 1
+        results["restore"] = _summarize("restore", latencies, nbytes, failures)
+        server_stats["restore"] = server.state.stats()
+        # The log writer and compressor threads hold files under `root`.
+        logger.shutdown_logging()
+
+    server.stop()
+    return {
+        "params": {
+            "files": args.files,
+            "size": args.size,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "bandwidth": args.bandwidth,
+            "error_rate": args.error_rate,
+            "extra_remote": args.extra_remote,
+        },
+        "results": results,
+        "server": server_stats,
+    }
+
+
+def _print_report(report: dict):
+    print("Drive benchmark")
+    print("  " + ", ".join(f"{k}={v}" for k, v in report["params"].items()))
+    print()
+    header = f"{'operation':<16}{'count':>7}{'fail':>6}{'MB/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in report["results"].values():
+        print(
+            f"{r['operation']:<16}{r['count']:>7}{r['failures']:>6}{r['throughput_mb_s']:>10}"
+            f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['max_ms']:>10}"
+        )
+    print()
+    for phase, stats in report["server"].items():
+        print(f"server [{phase}]: {stats['requests']} requests, "
+              f"{stats['bytes_in']} B in, {stats['bytes_out']} B out, "
+              f"injected={stats['injected_errors'] or 0}")
+        for route, r in stats["routes"].items():
+            print(f"    {route:<28}{r['count']:>6}  p50={r['p50_ms']}ms p95={r['p95_ms']}ms p99={r['p99_ms']}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Drive sync against a local fake Drive server.")
+    parser.add_argument("--files", type=int, default=5, help="backups to upload")
+    parser.add_argument("--size", type=_parse_size, default=_parse_size("1M"), help="payload size per backup")
+    parser.add_argument("--extra-remote", type=int, default=250, help="extra remote files for listing")
+    parser.add_argument("--list-rounds", type=int, default=5)
+    parser.add_argument("--restores", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="per-request latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency (s)")
+    parser.add_argument("--bandwidth", type=_parse_size, default=0, help="bytes/s, 0 = unlimited")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="emit JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    report = run_bench(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
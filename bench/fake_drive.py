@@ -0,0 +1,510 @@
+"""
+Local stand-in for the parts of the Google Drive v3 API used by the manager.
+
+Supports:
+  - GET    /drive/v3/about
+  - GET    /drive/v3/files                  (files.list with q / pageSize / pageToken)
+  - POST   /drive/v3/files                  (metadata-only create)
+  - GET    /drive/v3/files/{id}[?alt=media] (get / get_media with Range)
+  - DELETE /drive/v3/files/{id}
+  - POST   /upload/drive/v3/files?uploadType=resumable  + PUT chunks
+  - POST   /batch/drive/v3                  (multipart/mixed batch)
+
+Latency, bandwidth and error injection are configurable so the real client
+code in gdrive_sync / restore can be benchmarked offline:
+
+    server = FakeDriveServer(latency=0.05, bandwidth=2 * 1024 * 1024, error_rate=0.01)
+    server.start()
+    os.environ["GDRIVE_API_ENDPOINT"] = server.url
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API_PREFIX = "/drive/v3"
+UPLOAD_PREFIX = "/upload/drive/v3/files"
+BATCH_PATH = "/batch/drive/v3"
+IO_CHUNK = 64 * 1024
+
+_Q_CLAUSE = re.compile(r"^\s*(\w+)\s*(=|!=|contains)\s*(.+?)\s*$")
+
+
+def _now_rfc3339() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def _percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+class _Response:
+    def __init__(self, status: int, body: bytes = b"", headers: dict | None = None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+
+def _json(status: int, obj, headers: dict | None = None) -> _Response:
+    hdrs = {"Content-Type": "application/json; charset=UTF-8"}
+    hdrs.update(headers or {})
+    return _Response(status, json.dumps(obj).encode("utf-8"), hdrs)
+
+
+def _error(status: int, message: str, reason: str = "backendError") -> _Response:
+    return _json(
+        status,
+        {"error": {"code": status, "message": message, "errors": [{"reason": reason, "message": message}]}},
+    )
+
+
+class DriveState:
+    """
+    In-memory file store plus request statistics.
+    """
+
+    def __init__(self, email: str = "bench@example.com"):
+        self.email = email
+        self.files = {}
+        self.uploads = {}
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.in_flight = 0
+        self.request_counts = defaultdict(int)
+        self.request_latency = defaultdict(list)
+        self.injected_errors = defaultdict(int)
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def add_file(self, name: str, data: bytes, mime_type: str = "application/gzip") -> dict:
+        with self.lock:
+            file_id = uuid.uuid4().hex
+            meta = {
+                "id": file_id,
+                "name": name,
+                "mimeType": mime_type,
+                "modifiedTime": _now_rfc3339(),
+                "size": str(len(data)),
+                "trashed": False,
+            }
+            self.files[file_id] = {"meta": meta, "data": data}
+            return dict(meta)
+
+    def _wait_idle(self, timeout: float = 5.0):
+        # Stats are recorded after the response is written; let in-flight
+        # requests finish so they are attributed to the right phase.
+        self.idle.wait_for(lambda: self.in_flight == 0, timeout=timeout)
+
+    def reset_stats(self):
+        with self.lock:
+            self._wait_idle()
+            self.request_counts.clear()
+            self.request_latency.clear()
+            self.injected_errors.clear()
+            self.bytes_in = 0
+            self.bytes_out = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            self._wait_idle()
+            routes = {}
+            for route, count in sorted(self.request_counts.items()):
+                lat = self.request_latency.get(route, [])
+                routes[route] = {
+                    "count": count,
+                    "p50_ms": round(_percentile(lat, 50) * 1000, 2),
+                    "p95_ms": round(_percentile(lat, 95) * 1000, 2),
+                    "p99_ms": round(_percentile(lat, 99) * 1000, 2),
+                }
+            return {
+                "requests": sum(self.request_counts.values()),
+                "routes": routes,
+                "injected_errors": dict(self.injected_errors),
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "files": len(self.files),
+            }
+
+    # ---- query handling ----
+
+    def _matches(self, meta: dict, q: str) -> bool:
+        if not q:
+            return True
+        for clause in re.split(r"\s+and\s+", q, flags=re.IGNORECASE):
+            m = _Q_CLAUSE.match(clause)
+            if not m:
+                continue
+            field, op, raw = m.groups()
+            value = raw.strip()
+            if value.startswith("'") and value.endswith("'"):
+                value = value[1:-1].replace("\\'", "'")
+            elif value.lower() in ("true", "false"):
+                value = value.lower() == "true"
+            actual = meta.get(field)
+            if op == "contains":
+                if not isinstance(actual, str) or str(value) not in actual:
+                    return False
+            elif op == "=":
+                if actual != value:
+                    return False
+            elif actual == value:
+                return False
+        return True
+
+    def list_files(self, q: str, page_size: int, page_token: str | None, order_by: str) -> dict:
+        with self.lock:
+            metas = [f["meta"] for f in self.files.values() if self._matches(f["meta"], q)]
+        if order_by:
+            key, _, direction = order_by.split(",")[0].strip().partition(" ")
+            metas.sort(key=lambda m: m.get(key) or "", reverse=direction.lower() == "desc")
+        start = int(page_token or 0)
+        page = metas[start:start + page_size]
+        out = {"kind": "drive#fileList", "files": [dict(m) for m in page]}
+        if start + page_size < len(metas):
+            out["nextPageToken"] = str(start + page_size)
+        return out
+
+
+class FakeDriveServer:
+    """
+    Threaded HTTP server emulating Drive v3.
+
+    latency:     fixed delay added to every request (seconds)
+    jitter:      extra uniform random delay in [0, jitter] (seconds)
+    bandwidth:   bytes/second for request and response bodies (0 = unlimited)
+    error_rate:  probability [0..1] of answering a request with an injected error
+    error_statuses: status codes to choose injected errors from
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        bandwidth: int = 0,
+        error_rate: float = 0.0,
+        error_statuses=(500, 503, 429),
+        seed: int | None = None,
+    ):
+        self.state = DriveState()
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._forced_errors = []
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-drive", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def fail_next(self, count: int = 1, status: int = 503):
+        """Force the next `count` requests to fail with `status`."""
+        with self._rng_lock:
+            self._forced_errors.extend([status] * count)
+
+    # ---- hooks used by the handler ----
+
+    def _delay(self):
+        delay = self.latency
+        if self.jitter:
+            with self._rng_lock:
+                delay += self._rng.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _pick_error(self) -> int | None:
+        with self._rng_lock:
+            if self._forced_errors:
+                return self._forced_errors.pop(0)
+            if self.error_rate and self._rng.random() < self.error_rate:
+                return self._rng.choice(self.error_statuses)
+        return None
+
+    def _throttle(self, nbytes: int, started: float):
+        if not self.bandwidth or nbytes <= 0:
+            return
+        expected = started + nbytes / float(self.bandwidth)
+        remaining = expected - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    # ---- request dispatch (shared by the socket handler and batch parts) ----
+
+    def dispatch(self, method: str, raw_path: str, headers, body: bytes) -> tuple[str, _Response]:
+        parsed = urlparse(raw_path)
+        path = parsed.path
+        query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+
+        if path == f"{API_PREFIX}/about" and method == "GET":
+            return "about.get", _json(200, {"user": {"emailAddress": self.state.email, "displayName": "Bench"}})
+
+        if path == f"{API_PREFIX}/files":
+            if method == "GET":
+                page_size = max(1, min(1000, int(query.get("pageSize", 100))))
+                result = self.state.list_files(
+                    query.get("q", ""), page_size, query.get("pageToken"), query.get("orderBy", "")
+                )
+                return "files.list", _json(200, result)
+            if method == "POST":
+                meta = json.loads(body or b"{}")
+                created = self.state.add_file(meta.get("name", "untitled"), b"", meta.get("mimeType", ""))
+                return "files.create", _json(200, created)
+
+        if path.startswith(f"{API_PREFIX}/files/"):
+            file_id = path[len(f"{API_PREFIX}/files/"):]
+            with self.state.lock:
+                entry = self.state.files.get(file_id)
+            if entry is None:
+                return "files.get", _error(404, f"File not found: {file_id}", "notFound")
+            if method == "DELETE":
+                with self.state.lock:
+                    self.state.files.pop(file_id, None)
+                return "files.delete", _Response(204)
+            if method == "GET" and query.get("alt") == "media":
+                return "files.get_media", self._media_response(entry["data"], headers.get("Range") or headers.get("range"))
+            if method == "GET":
+                return "files.get", _json(200, dict(entry["meta"]))
+
+        if path == UPLOAD_PREFIX:
+            return self._upload(method, query, headers, body)
+
+        if path == BATCH_PATH and method == "POST":
+            return "batch", self._batch(headers, body)
+
+        return "unknown", _error(404, f"No route for {method} {path}", "notFound")
+
+    def _media_response(self, data: bytes, range_header: str | None) -> _Response:
+        total = len(data)
+        if not range_header:
+            return _Response(200, data, {"Content-Type": "application/octet-stream"})
+        m = re.match(r"bytes=(\d+)-(\d*)", range_header)
+        if not m:
+            return _error(416, "Invalid range")
+        start = int(m.group(1))
+        end = int(m.group(2)) if m.group(2) else total - 1
+        end = min(end, total - 1)
+        if start >= total and total > 0:
+            return _Response(416, b"", {"Content-Range": f"bytes */{total}"})
+        chunk = data[start:end + 1]
+        return _Response(
+            206,
+            chunk,
+            {"Content-Type": "application/octet-stream", "Content-Range": f"bytes {start}-{end}/{total}"},
+        )
+
+    def _upload(self, method: str, query: dict, headers, body: bytes) -> tuple[str, _Response]:
+        if query.get("uploadType") != "resumable":
+            return "files.create", _error(400, "Only resumable uploads are emulated", "badRequest")
+
+        upload_id = query.get("upload_id")
+        if method == "POST" and not upload_id:
+            meta = json.loads(body or b"{}")
+            upload_id = uuid.uuid4().hex
+            with self.state.lock:
+                self.state.uploads[upload_id] = {"meta": meta, "data": bytearray()}
+            host = headers.get("Host") or headers.get("host")
+            location = f"http://{host}{UPLOAD_PREFIX}?uploadType=resumable&upload_id={upload_id}"
+            return "files.create.initiate", _Response(200, b"", {"Location": location})
+
+        with self.state.lock:
+            upload = self.state.uploads.get(upload_id)
+        if upload is None:
+            return "files.create.chunk", _error(404, "Unknown upload session", "notFound")
+
+        content_range = headers.get("Content-Range") or headers.get("content-range") or ""
+        m = re.match(r"bytes (\d+)-(\d+)/(\d+|\*)", content_range)
+        status_only = re.match(r"bytes \*/(\d+|\*)", content_range)
+        data = upload["data"]
+        if m:
+            start, total = int(m.group(1)), m.group(3)
+            if start != len(data):
+                del data[start:]
+            data.extend(body)
+        elif status_only:
+            total = status_only.group(1)
+        else:
+            data.extend(body)
+            total = str(len(data))
+
+        if total != "*" and len(data) >= int(total):
+            meta = upload["meta"]
+            created = self.state.add_file(meta.get("name", "untitled"), bytes(data), meta.get("mimeType", "application/gzip"))
+            with self.state.lock:
+                self.state.uploads.pop(upload_id, None)
+            return "files.create.chunk", _json(200, {"id": created["id"], "name": created["name"]})
+
+        hdrs = {"Range": f"bytes=0-{len(data) - 1}"} if data else {}
+        return "files.create.chunk", _Response(308, b"", hdrs)
+
+    def _batch(self, headers, body: bytes) -> _Response:
+        content_type = headers.get("Content-Type") or headers.get("content-type") or ""
+        m = re.search(r'boundary="?([^";]+)"?', content_type)
+        if not m:
+            return _error(400, "Missing multipart boundary", "badRequest")
+        boundary = m.group(1).encode()
+        out_boundary = "batch_" + uuid.uuid4().hex
+        parts_out = []
+
+        for part in body.split(b"--" + boundary):
+            part = part.strip(b"\r\n")
+            if not part or part == b"--":
+                continue
+            outer_headers, inner = _split_headers(part)
+            content_id = outer_headers.get("content-id", "<unknown + 0>")
+            req_headers, req_body = _split_headers(inner, request_line=True)
+            req_line = req_headers.pop(":request-line", "GET / HTTP/1.1")
+            sub_method, sub_path = req_line.split(" ")[:2]
+            route, resp = self.dispatch(sub_method, sub_path, req_headers, req_body)
+            with self.state.lock:
+                self.state.request_counts[f"batch:{route}"] += 1
+            response_id = "<response-" + content_id.strip("<>") + ">"
+            lines = [f"HTTP/1.1 {resp.status} {_reason(resp.status)}"]
+            for k, v in resp.headers.items():
+                lines.append(f"{k}: {v}")
+            parts_out.append(
+                (
+                    f"--{out_boundary}\r\nContent-Type: application/http\r\n"
+                    f"Content-ID: {response_id}\r\n\r\n" + "\r\n".join(lines) + "\r\n\r\n"
+                ).encode("utf-8")
+                + resp.body
+                + b"\r\n"
+            )
+
+        payload = b"".join(parts_out) + f"--{out_boundary}--\r\n".encode("utf-8")
+        return _Response(200, payload, {"Content-Type": f"multipart/mixed; boundary={out_boundary}"})
+
+
+def _reason(status: int) -> str:
+    return BaseHTTPRequestHandler.responses.get(status, ("",))[0]
+
+
+def _split_headers(blob: bytes, request_line: bool = False) -> tuple[dict, bytes]:
+    """Split an RFC822-style blob into (lower-cased headers, body)."""
+    head, _, body = _partition(blob)
+    headers = {}
+    lines = head.decode("utf-8", errors="replace").splitlines()
+    if request_line and lines:
+        headers[":request-line"] = lines.pop(0).strip()
+    key = None
+    for line in lines:
+        if line[:1] in (" ", "\t") and key:
+            # Folded continuation of the previous header
+            headers[key] += line.rstrip()
+        elif ":" in line:
+            k, v = line.split(":", 1)
+            key = k.strip().lower()
+            headers[key] = v.strip()
+    return headers, body
+
+
+def _partition(blob: bytes) -> tuple[bytes, bytes, bytes]:
+    m = re.search(rb"\r?\n\r?\n", blob)
+    if not m:
+        return blob, b"", b""
+    return blob[:m.start()], blob[m.start():m.end()], blob[m.end():]
+
+
+def _make_handler(server: FakeDriveServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, fmt, *args):
+            return
+
+        def _read_body(self) -> bytes:
+            length = int(self.headers.get("Content-Length") or 0)
+            started = time.monotonic()
+            chunks = []
+            remaining = length
+            while remaining > 0:
+                chunk = self.rfile.read(min(IO_CHUNK, remaining))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                remaining -= len(chunk)
+                server._throttle(length - remaining, started)
+            return b"".join(chunks)
+
+        def _send(self, resp: _Response):
+            self.send_response(resp.status)
+            for k, v in resp.headers.items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(resp.body)))
+            self.end_headers()
+            started = time.monotonic()
+            sent = 0
+            view = memoryview(resp.body)
+            while sent < len(view):
+                self.wfile.write(view[sent:sent + IO_CHUNK])
+                sent = min(len(view), sent + IO_CHUNK)
+                server._throttle(sent, started)
+
+        def _handle(self):
+            started = time.monotonic()
+            state = server.state
+            with state.lock:
+                state.in_flight += 1
+            body = self._read_body()
+            server._delay()
+            injected = server._pick_error()
+            if injected is not None:
+                route = "injected"
+                resp = _error(injected, "Injected error", "rateLimitExceeded" if injected == 429 else "backendError")
+                if injected == 429:
+                    resp.headers["Retry-After"] = "1"
+            else:
+                try:
+                    route, resp = server.dispatch(self.command, self.path, self.headers, body)
+                except Exception as e:
+                    route, resp = "error", _error(500, f"Fake server error: {e}")
+            try:
+                self._send(resp)
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+                    state.idle.notify_all()
+            elapsed = time.monotonic() - started
+            with state.lock:
+                state.request_counts[route] += 1
+                state.request_latency[route].append(elapsed)
+                state.bytes_in += len(body)
+                state.bytes_out += len(resp.body)
+                if injected is not None:
+                    state.injected_errors[str(injected)] += 1
+
+        do_GET = _handle
+        do_POST = _handle
+        do_PUT = _handle
+        do_DELETE = _handle
+        do_PATCH = _handle
+
+    return Handler